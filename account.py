@@ -0,0 +1,103 @@
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+# Исполнение (частичное или полное) ордера из ORDER_TRADE_UPDATE / executionReport
+@dataclass(slots=True)
+class Fill:
+    symbol: str
+    order_id: int
+    side: str
+    quantity: float
+    price: float
+    commission: float
+    commission_asset: str
+    realized: float = 0.0
+    time: int = 0
+    position_side: str = 'BOTH'
+
+
+# Балансы и исполнения в памяти. Балансы загружаются через REST один раз и затем
+# обновляются событиями ACCOUNT_UPDATE (фьючерсы) / outboundAccountPosition (спот).
+# REST-сверка - после переподключения потока и не реже раза в reconcile_interval секунд.
+class AccountLedger:
+    def __init__(self, load_balances, reconcile_interval=300, max_orders=1000):
+        self.load_balances = load_balances
+        self.reconcile_interval = reconcile_interval
+        self.max_orders = max_orders
+        self.connected = False
+        self.balances = {}
+
+        self._loaded_at = 0.0
+        self._fills = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_message(self, msg) -> None:
+        event = msg.get('e')
+        if event == 'ACCOUNT_UPDATE':
+            for entry in msg['a']['B']:
+                self.balances[entry['a']] = float(entry['wb'])
+        elif event == 'outboundAccountPosition':
+            for entry in msg['B']:
+                self.balances[entry['a']] = float(entry['f'])
+        elif event == 'ORDER_TRADE_UPDATE':
+            order = msg['o']
+            if order['x'] == 'TRADE':
+                self._add(Fill(order['s'], order['i'], order['S'], float(order['l']), float(order['L']), float(order.get('n', 0)), order.get('N'), float(order.get('rp', 0)), order.get('T', msg.get('T', 0)), order.get('ps', 'BOTH')))
+        elif event == 'executionReport':
+            if msg['x'] == 'TRADE':
+                self._add(Fill(msg['s'], msg['i'], msg['S'], float(msg['l']), float(msg['L']), float(msg['n']), msg.get('N'), time=msg.get('T', 0)))
+
+    def on_connect(self) -> None:
+        self.connected = True
+        # События за время обрыва потеряны: при следующем чтении балансы берутся через REST
+        self._loaded_at = 0.0
+
+    def on_disconnect(self) -> None:
+        self.connected = False
+
+    def _add(self, fill) -> None:
+        with self._lock:
+            key = (fill.symbol, fill.order_id)
+            self._fills.setdefault(key, []).append(fill)
+            self._fills.move_to_end(key)
+            while len(self._fills) > self.max_orders:
+                self._fills.popitem(last=False)
+
+    def reconcile(self) -> None:
+        self.balances.update(self.load_balances())
+        self._loaded_at = time.monotonic()
+
+    # Баланс из памяти; REST - только при первом чтении, без потока или после reconcile_interval
+    def balance(self, asset) -> float:
+        if not self.connected or time.monotonic() - self._loaded_at > self.reconcile_interval:
+            self.reconcile()
+        return self.balances.get(asset, 0.0)
+
+    # Исполнения ордеров цикла. Прочитанные исполнения удаляются
+    def take_fills(self, symbol, order_ids) -> list:
+        fills = []
+        with self._lock:
+            for order_id in order_ids:
+                fills += self._fills.pop((symbol, order_id), [])
+        return fills
+
+
+# PnL цикла по исполнениям: (результат сделок, комиссии в fee_asset).
+# Для фьючерсов берётся реализованный PnL биржи, для спота - цена исполнения
+# относительно start_price (как в расчёте PNL без комиссии). None, если исполнений нет.
+def cycle_pnl(fills, fee_asset, start_price=None) -> tuple:
+    if not fills:
+        return None, None
+    fees = sum(fill.commission for fill in fills if fill.commission_asset == fee_asset)
+    if start_price is None:
+        return sum(fill.realized for fill in fills), fees
+    pnl = 0.0
+    for fill in fills:
+        if fill.side == 'SELL':
+            pnl += (fill.price - start_price) * fill.quantity
+        else:
+            pnl += (start_price - fill.price) * fill.quantity
+    return pnl, fees
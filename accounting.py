@@ -0,0 +1,228 @@
+import os
+import glob
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from dataclasses import dataclass
+
+import numpy as np
+
+from account import Fill
+
+
+TRADES_DIR = 'trades'
+
+# Колонки журнала сделок. Файл сегмента - .npz с отдельным массивом на колонку
+COLUMNS = {
+    'time': np.int64,
+    'cycle': np.int64,
+    'symbol': 'U16',
+    'order_id': np.int64,
+    'side': np.int8,
+    'quantity': np.float64,
+    'price': np.float64,
+    'realized': np.float64,
+    'fee': np.float64,
+}
+
+
+# Итоги по циклу, символу или сессии
+@dataclass(slots=True)
+class Totals:
+    realized: float = 0.0
+    fees: float = 0.0
+    volume: float = 0.0
+    trades: int = 0
+
+    @property
+    def net(self) -> float:
+        return self.realized - self.fees
+
+    def add(self, realized, fee, volume) -> None:
+        self.realized += realized
+        self.fees += fee
+        self.volume += volume
+        self.trades += 1
+
+
+# Позиция по средней цене: quantity со знаком (+ лонг, - шорт)
+@dataclass(slots=True)
+class Position:
+    quantity: float = 0.0
+    price: float = 0.0
+
+    # Применение сделки; возвращает реализованный результат закрытой части
+    def apply(self, signed, price) -> float:
+        realized = 0.0
+        if self.quantity and (self.quantity > 0) != (signed > 0):
+            closed = min(abs(signed), abs(self.quantity))
+            realized = closed * (price - self.price) * (1 if self.quantity > 0 else -1)
+            self.quantity += closed if signed > 0 else -closed
+            signed += -closed if signed > 0 else closed
+            if not self.quantity:
+                self.price = 0.0
+        if signed:
+            self.price = (abs(self.quantity) * self.price + abs(signed) * price) / (abs(self.quantity) + abs(signed))
+            self.quantity += signed
+        return realized
+
+    def unrealized(self, price) -> float:
+        return self.quantity * (price - self.price)
+
+
+# Исполнение из REST: futures_account_trades (userTrades) или get_my_trades (спот)
+def fill_from_trade(trade) -> Fill:
+    side = trade['side'] if 'side' in trade else 'BUY' if trade['isBuyer'] else 'SELL'
+    return Fill(
+        trade['symbol'], trade['orderId'], side, float(trade['qty']), float(trade['price']),
+        float(trade['commission']), trade['commissionAsset'], float(trade.get('realizedPnl', 0)),
+        trade['time'], trade.get('positionSide', 'BOTH'),
+    )
+
+
+def _month(ms) -> str:
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime('%Y%m')
+
+
+# Учёт сделок: реализованный/нереализованный PnL и комиссии по циклам, символам и сессии.
+# Каждое исполнение обновляет итоги за O(1). Исполнения копятся в памяти и сбрасываются
+# в колоночные сегменты directory/YYYYMM-*.npz; query() агрегирует историю по ним.
+# exchange_realized=True - брать реализованный PnL биржи (фьючерсы), иначе считать по средней цене.
+class TradeBook:
+    def __init__(self, directory, quote_asset, exchange_realized=False, flush_size=1000, history=1000):
+        self.directory = directory
+        self.quote_asset = quote_asset
+        self.exchange_realized = exchange_realized
+        self.flush_size = flush_size
+        self.history = history
+        self.session = Totals()
+        self.symbols = {}
+        self.cycles = OrderedDict()
+        self.positions = {}
+
+        self._rows = []
+        self._lock = threading.Lock()
+
+    # Комиссия в валюте котировки; комиссия в базовом активе пересчитывается по цене сделки,
+    # в сторонних активах (BNB) не учитывается
+    def _fee(self, fill) -> float:
+        quote = self.quote_asset(fill.symbol)
+        if fill.commission_asset == quote:
+            return fill.commission
+        if fill.commission_asset == fill.symbol[:-len(quote)]:
+            return fill.commission * fill.price
+        return 0.0
+
+    # Учёт одного исполнения; возвращает (реализованный результат, комиссия, объём)
+    def add(self, fill, cycle=None) -> tuple:
+        signed = fill.quantity if fill.side == 'BUY' else -fill.quantity
+        fee = self._fee(fill)
+        volume = fill.quantity * fill.price
+        with self._lock:
+            position = self.positions.setdefault((fill.symbol, fill.position_side), Position())
+            realized = position.apply(signed, fill.price)
+            if self.exchange_realized:
+                realized = fill.realized
+
+            self.session.add(realized, fee, volume)
+            self.symbols.setdefault(fill.symbol, Totals()).add(realized, fee, volume)
+            if cycle is not None:
+                if cycle not in self.cycles:
+                    self.cycles[cycle] = Totals()
+                    while len(self.cycles) > self.history:
+                        self.cycles.popitem(last=False)
+                self.cycles[cycle].add(realized, fee, volume)
+
+            self._rows.append((fill.time or int(time.time() * 1000), -1 if cycle is None else cycle, fill.symbol, fill.order_id, 1 if fill.side == 'BUY' else -1, fill.quantity, fill.price, realized, fee))
+            flush = len(self._rows) >= self.flush_size
+        if flush:
+            self.flush()
+        return realized, fee, volume
+
+    # Итоги переданных исполнений (например, всех исполнений цикла)
+    def add_fills(self, fills, cycle=None) -> Totals:
+        totals = Totals()
+        for fill in fills:
+            totals.add(*self.add(fill, cycle))
+        return totals
+
+    def cycle(self, number) -> Totals:
+        return self.cycles.get(number, Totals())
+
+    def unrealized(self, symbol, price) -> float:
+        return sum(position.unrealized(price) for (name, _), position in self.positions.items() if name == symbol)
+
+    @staticmethod
+    def _columns(rows) -> dict:
+        values = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+        return {name: np.array(column, dtype=dtype) for (name, dtype), column in zip(COLUMNS.items(), values)}
+
+    # Запись накопленных исполнений: по одному сегменту на месяц
+    def flush(self) -> None:
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        columns = self._columns(rows)
+        months = np.array([_month(ms) for ms in columns['time']])
+        for month in np.unique(months):
+            mask = months == month
+            path = os.path.join(self.directory, f'{month}-{time.time_ns()}.npz')
+            np.savez(path, **{name: column[mask] for name, column in columns.items()})
+
+    # Сегменты месяцев в диапазоне [start, end] (YYYYMM)
+    def segments(self, start=None, end=None) -> list:
+        paths = []
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.npz'))):
+            month = os.path.basename(path)[:6]
+            if (start is None or month >= start) and (end is None or month <= end):
+                paths.append(path)
+        return paths
+
+    # Объединение сегментов месяца в один файл
+    def compact(self, month) -> None:
+        paths = self.segments(month, month)
+        if len(paths) < 2:
+            return
+        parts = [np.load(path) for path in paths]
+        merged = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+        np.savez(os.path.join(self.directory, f'{month}-{time.time_ns()}.npz'), **merged)
+        for part, path in zip(parts, paths):
+            part.close()
+            os.remove(path)
+
+    # Итоги за период (время в мс) по всем символам или по одному; by_symbol=True - словарь по символам.
+    # Загружаются только нужные колонки сегментов нужных месяцев
+    def query(self, start=None, end=None, symbol=None, by_symbol=False):
+        names = ('time', 'symbol', 'quantity', 'price', 'realized', 'fee')
+        chunks = {name: [] for name in names}
+        with self._lock:
+            buffer = self._columns(self._rows)
+        for path in self.segments(start and _month(start), end and _month(end)):
+            with np.load(path) as part:
+                for name in names:
+                    chunks[name].append(part[name])
+        for name in names:
+            chunks[name].append(buffer[name])
+        data = {name: np.concatenate(chunks[name]) for name in names}
+
+        mask = np.ones(len(data['time']), dtype=bool)
+        if start is not None:
+            mask &= data['time'] >= start
+        if end is not None:
+            mask &= data['time'] <= end
+        if symbol is not None:
+            mask &= data['symbol'] == symbol
+        data = {name: column[mask] for name, column in data.items()}
+        volume = data['quantity'] * data['price']
+
+        if not by_symbol:
+            return Totals(float(data['realized'].sum()), float(data['fee'].sum()), float(volume.sum()), int(len(volume)))
+        keys, index = np.unique(data['symbol'], return_inverse=True)
+        realized = np.bincount(index, data['realized'], len(keys))
+        fees = np.bincount(index, data['fee'], len(keys))
+        volumes = np.bincount(index, volume, len(keys))
+        trades = np.bincount(index, minlength=len(keys))
+        return {str(key): Totals(float(realized[i]), float(fees[i]), float(volumes[i]), int(trades[i])) for i, key in enumerate(keys)}
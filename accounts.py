@@ -0,0 +1,63 @@
+import os
+import tomllib
+from dataclasses import dataclass
+
+
+# Счёт (или суб-счёт) Binance. Ключи не хранятся в файле: key_env и secret_env -
+# имена переменных окружения (.env), как API_KEY_BINANCE_FUTURE у основного счёта
+@dataclass(frozen=True)
+class Account:
+    name: str
+    market: str
+    key_env: str
+    secret_env: str
+    # Доля минутного лимита веса запросов (лимит общий на IP); None - поровну между счетами
+    weight_share: float = None
+
+    @property
+    def api_key(self) -> str:
+        return os.getenv(self.key_env)
+
+    @property
+    def api_secret(self) -> str:
+        return os.getenv(self.secret_env)
+
+
+# Реестр счетов из TOML: таблицы [[account]] с полями name, market, key_env, secret_env, weight_share
+class AccountRegistry:
+    def __init__(self, accounts=()):
+        self.accounts = {}
+        for account in accounts:
+            self.add(account)
+
+    @classmethod
+    def load(cls, path) -> 'AccountRegistry':
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+        return cls(Account(**entry) for entry in data.get('account', []))
+
+    def add(self, account) -> None:
+        if account.name in self.accounts:
+            raise ValueError(f'Счёт {account.name} уже есть в реестре')
+        if account.market not in ('futures', 'spot'):
+            raise ValueError(f'Счёт {account.name}: market должен быть futures или spot')
+        self.accounts[account.name] = account
+
+    def for_market(self, market) -> list:
+        return [account for account in self.accounts.values() if account.market == market]
+
+    # Адаптеры счетов рынка поверх основного адаптера модуля (futures.adapter / spot.adapter).
+    # Каждый счёт получает свой клиент с пулом соединений, ограничитель веса со своей долей
+    # лимита, поток пользовательских данных и журналы; символы, стаканы и цены общие с основным
+    def adapters(self, primary) -> dict:
+        accounts = self.for_market(primary.name)
+        default_share = 1 / (len(accounts) + 1)
+        # Основной счёт тоже делит лимит IP с суб-счетами
+        primary.governor.set_share(default_share)
+        adapters = {'main': primary}
+        for account in accounts:
+            if account.name in adapters:
+                raise ValueError(f'Имя счёта {account.name} занято основным счётом')
+            share = account.weight_share if account.weight_share is not None else default_share
+            adapters[account.name] = type(primary)(primary.testnet, primary.simulator, account=account, share=share, market_data=primary)
+        return adapters
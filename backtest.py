@@ -0,0 +1,249 @@
+import os
+import argparse
+from dataclasses import dataclass
+
+import numpy as np
+
+from strategy import StraddleSettings, leg_prices, activation_price, next_lot
+
+
+MAKER_FEE = 0.0002
+TAKER_FEE = 0.0004
+
+# Начальный размер окна поиска пересечения; окно удваивается, пока пересечение не найдено
+SEARCH_CHUNK = 4096
+
+
+# Ряд цен для бэктеста. Для aggTrades high == low == close
+@dataclass
+class PriceSeries:
+    times: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+
+def _has_header(path) -> bool:
+    with open(path, encoding='utf-8') as f:
+        first = f.readline()
+    return not first[:1].isdigit()
+
+
+# Загрузка aggTrades или 1s klines в формате data.binance.vision (CSV) либо Parquet.
+# Рядом с CSV сохраняется .npz, чтобы повторные прогоны не разбирали текст заново.
+# Каталог символа из recorder.py (market_data/futures/BTCUSDT) читается по сегментам
+def load_prices(path) -> PriceSeries:
+    if os.path.isdir(path):
+        from recorder import load_series
+
+        return load_series(path)
+    cache = path + '.npz'
+    if path.endswith('.npz'):
+        cache = path
+    if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+        data = np.load(cache)
+        return PriceSeries(data['times'], data['high'], data['low'], data['close'])
+
+    if path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path)
+        columns = {name: table.column(name).to_numpy() for name in table.column_names}
+        if 'high' in columns:
+            series = PriceSeries(columns['open_time'].astype(np.int64), columns['high'].astype(np.float64), columns['low'].astype(np.float64), columns['close'].astype(np.float64))
+        else:
+            price = columns['price'].astype(np.float64)
+            series = PriceSeries(columns['transact_time'].astype(np.int64), price, price, price)
+    else:
+        skip = 1 if _has_header(path) else 0
+        with open(path, encoding='utf-8') as f:
+            for _ in range(skip):
+                f.readline()
+            width = len(f.readline().split(','))
+        # aggTrades: id, price, qty, first_id, last_id, time, is_buyer_maker[, best_match]
+        # klines: open_time, open, high, low, close, volume, close_time, ...
+        if width >= 11:
+            times, high, low, close = np.loadtxt(path, delimiter=',', skiprows=skip, usecols=(0, 2, 3, 4), unpack=True)
+            series = PriceSeries(times.astype(np.int64), high, low, close)
+        else:
+            price, times = np.loadtxt(path, delimiter=',', skiprows=skip, usecols=(1, 5), unpack=True)
+            series = PriceSeries(times.astype(np.int64), price, price, price)
+
+    np.savez(cache, times=series.times, high=series.high, low=series.low, close=series.close)
+    return series
+
+
+# Первый индекс начиная со start, где values >= level (above) или <= level. -1, если нет
+def first_cross(values, start, level, above, chunk=SEARCH_CHUNK) -> int:
+    n = len(values)
+    i = start
+    size = chunk
+    while i < n:
+        window = values[i:i + size]
+        hits = np.flatnonzero(window >= level if above else window <= level)
+        if hits.size:
+            return i + int(hits[0])
+        i += size
+        size *= 2
+    return -1
+
+
+# Срабатывание TRAILING_STOP_MARKET: активация по activation, затем откат на callback % от экстремума.
+# Возвращает (индекс, цена срабатывания) или (-1, nan)
+def trailing_exit(series, start, side, activation, callback, chunk=SEARCH_CHUNK) -> tuple:
+    long = side == 'LONG'
+    index = first_cross(series.high if long else series.low, start, activation, above=long, chunk=chunk)
+    if index < 0:
+        return -1, np.nan
+    rate = callback / 100
+    extreme = activation
+    n = len(series)
+    size = chunk
+    while index < n:
+        if long:
+            run = np.maximum.accumulate(np.maximum(series.high[index:index + size], extreme))
+            trigger = run * (1 - rate)
+            hits = np.flatnonzero(series.low[index:index + size] <= trigger)
+        else:
+            run = np.minimum.accumulate(np.minimum(series.low[index:index + size], extreme))
+            trigger = run * (1 + rate)
+            hits = np.flatnonzero(series.high[index:index + size] >= trigger)
+        if hits.size:
+            return index + int(hits[0]), float(trigger[hits[0]])
+        extreme = run[-1]
+        index += size
+        size *= 2
+    return -1, np.nan
+
+
+# Выход одной стороны: (индекс, цена, тейк ли). При совпадении индексов считаем, что первым сработал стоп
+def leg_exit(series, start, side, start_price, settings, tick=0.0) -> tuple:
+    take_price, stop_price = leg_prices(side, start_price, settings.take, settings.loss)
+    if tick:
+        take_price = round(take_price / tick) * tick
+        stop_price = round(stop_price / tick) * tick
+    long = side == 'LONG'
+
+    stop_index = first_cross(series.low if long else series.high, start, stop_price, above=not long)
+    if settings.trailing_stop:
+        take_index, take_fill = trailing_exit(series, start, side, activation_price(side, start_price, settings.trailing_limit), settings.trail_distance_percent)
+    else:
+        take_index = first_cross(series.high if long else series.low, start, take_price, above=long)
+        take_fill = take_price
+
+    if stop_index < 0 and take_index < 0:
+        return -1, np.nan, False
+    if take_index < 0 or (0 <= stop_index <= take_index):
+        return stop_index, stop_price, False
+    return take_index, take_fill, True
+
+
+# Итоги бэктеста: массивы по циклам и сводные показатели
+@dataclass
+class BacktestResult:
+    start_index: np.ndarray
+    end_index: np.ndarray
+    lot: np.ndarray
+    pnl: np.ndarray
+    fees: np.ndarray
+    long_win: np.ndarray
+    short_win: np.ndarray
+    equity: np.ndarray
+    ruined: bool
+
+    @property
+    def cycles(self) -> int:
+        return len(self.pnl)
+
+    @property
+    def net_pnl(self) -> float:
+        return float(self.pnl.sum() - self.fees.sum())
+
+    @property
+    def max_drawdown(self) -> float:
+        if not len(self.equity):
+            return 0.0
+        peaks = np.maximum.accumulate(self.equity)
+        return float((peaks - self.equity).max())
+
+    def summary(self) -> dict:
+        return {
+            'cycles': self.cycles,
+            'net_pnl': self.net_pnl,
+            'fees': float(self.fees.sum()),
+            'max_drawdown': self.max_drawdown,
+            'max_lot': float(self.lot.max()) if self.cycles else 0.0,
+            'win_rate': float((self.long_win | self.short_win).mean()) if self.cycles else 0.0,
+            'ruined': self.ruined,
+        }
+
+
+# Прогон стратегии main(): вход LONG и SHORT лимитом по текущей цене (считаем, что исполняется сразу),
+# выход по тейку/трейлингу или стопу, следующий цикл - после закрытия обеих сторон.
+def run_backtest(series, settings, balance=1000.0, maker_fee=MAKER_FEE, taker_fee=TAKER_FEE, tick=0.0, step=0.0, max_cycles=None) -> BacktestResult:
+    rows = []
+    lot = settings.initial_lot
+    equity = balance
+    ruined = False
+    start = 0
+    n = len(series)
+
+    while start < n - 1 and (max_cycles is None or len(rows) < max_cycles):
+        start_price = float(series.close[start])
+        if tick:
+            start_price = round(start_price / tick) * tick
+        quantity = lot / start_price
+        if step:
+            quantity = np.floor(quantity / step) * step
+
+        long_index, long_exit, long_win = leg_exit(series, start + 1, 'LONG', start_price, settings, tick)
+        short_index, short_exit, short_win = leg_exit(series, start + 1, 'SHORT', start_price, settings, tick)
+        if long_index < 0 or short_index < 0:
+            break
+
+        pnl = quantity * (long_exit - start_price) + quantity * (start_price - short_exit)
+        fees = 2 * quantity * start_price * maker_fee + quantity * (long_exit + short_exit) * taker_fee
+        end = max(long_index, short_index)
+        rows.append((start, end, lot, pnl, fees, long_win, short_win))
+
+        equity += pnl - fees
+        if equity <= 0:
+            ruined = True
+            break
+        lot = next_lot(lot, settings.initial_lot, settings.martingale, settings.lot_increment, not long_win and not short_win)
+        start = end + 1
+
+    table = np.array(rows, dtype=[('start', np.int64), ('end', np.int64), ('lot', np.float64), ('pnl', np.float64), ('fees', np.float64), ('long', bool), ('short', bool)])
+    return BacktestResult(
+        table['start'], table['end'], table['lot'], table['pnl'], table['fees'], table['long'], table['short'],
+        balance + np.cumsum(table['pnl'] - table['fees']), ruined,
+    )
+
+
+def add_settings_arguments(parser) -> None:
+    parser.add_argument('--lot', type=float, required=True, help='Начальный LOT в валюте котировки')
+    parser.add_argument('--take', type=float, required=True)
+    parser.add_argument('--loss', type=float, required=True)
+    parser.add_argument('--trailing-stop', action='store_true')
+    parser.add_argument('--trailing-limit', type=float, default=0.0)
+    parser.add_argument('--trail-distance', type=float, default=0.0)
+    parser.add_argument('--martingale', action='store_true')
+    parser.add_argument('--lot-increment', type=float, default=1.0)
+    parser.add_argument('--balance', type=float, default=1000.0)
+    parser.add_argument('--tick', type=float, default=0.0, help='tickSize пары')
+    parser.add_argument('--step', type=float, default=0.0, help='stepSize пары')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Бэктест стрэддла по aggTrades или 1s klines')
+    parser.add_argument('path', help='CSV (data.binance.vision), Parquet, .npz или каталог символа recorder.py')
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    settings = StraddleSettings(args.lot, args.take, args.loss, args.trailing_stop, args.trailing_limit, args.trail_distance, args.martingale, args.lot_increment)
+    result = run_backtest(load_prices(args.path), settings, balance=args.balance, tick=args.tick, step=args.step)
+    for key, value in result.summary().items():
+        print(key, value)
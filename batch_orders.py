@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from eventlog import log_event
+
+
+# Пакетное размещение ордеров фьючерсов через /fapi/v1/batchOrders
+BATCH_LIMIT = 5
+
+
+# В batchOrders все значения передаются строками, None не передаются.
+# Числа с плавающей точкой - в десятичной записи: str(0.00001) дал бы '1e-05', а такую цену
+# или количество биржа отклоняет
+def format_batch_order(params) -> dict:
+    formatted = {}
+    for key, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = 'true' if value else 'false'
+        elif isinstance(value, float):
+            value = format(Decimal(str(value)), 'f')
+        formatted[key] = str(value)
+    return formatted
+
+
+# Отправка до BATCH_LIMIT ордеров одним запросом.
+# Возвращает список ответов в порядке ордеров: словарь ордера либо None, и список ошибок (индекс, код, текст).
+def submit_batch(place_batch, orders):
+    if len(orders) > BATCH_LIMIT:
+        raise ValueError(f'В одном пакете не больше {BATCH_LIMIT} ордеров')
+    try:
+        response = place_batch(batchOrders=[format_batch_order(order) for order in orders])
+    except Exception as ex:
+        return [None] * len(orders), [(index, getattr(ex, 'code', None), getattr(ex, 'message', str(ex))) for index in range(len(orders))]
+
+    placed = []
+    errors = []
+    for index, result in enumerate(response):
+        if 'orderId' in result:
+            placed.append(result)
+        else:
+            placed.append(None)
+            errors.append((index, result.get('code'), result.get('msg')))
+    return placed, errors
+
+
+# Откат: отмена всех успешно размещённых ордеров из списка; ошибки - в журнал событий log
+def cancel_placed(cancel_order, symbol, placed, log=None) -> None:
+    for order in placed:
+        if order is None:
+            continue
+        try:
+            cancel_order(symbol=symbol, orderId=order['orderId'])
+        except Exception as ex:
+            log_event(log, 'cancel_error', 'Ошибка отмены ордера', order['orderId'], ex, symbol=symbol, order_ids=[order['orderId']], error=repr(ex))
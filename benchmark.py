@@ -0,0 +1,182 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+
+import numpy as np
+
+
+BASELINE_PATH = 'bench_baseline.json'
+
+# Этапы цикла из CycleRecord
+STAGES = ('price_latency', 'placement_latency', 'time_to_fill', 'cancel_latency', 'duration')
+
+
+# Синтетическая лента (случайное блуждание) в формате .npz backtest.load_prices,
+# чтобы базовые значения были воспроизводимы без записанных данных
+def synthetic_feed(path, ticks=200000, price=30000.0, volatility=2.0, seed=1) -> str:
+    rng = np.random.default_rng(seed)
+    close = price + np.cumsum(rng.normal(0, volatility, ticks))
+    np.savez(path, times=np.arange(ticks, dtype=np.int64), high=close, low=close, close=close)
+    return path
+
+
+# Замена auto_stop: остановка после заданного числа циклов
+class CycleLimit:
+    def __init__(self, cycles):
+        self.cycles = cycles
+        self.done = 0
+
+    def is_set(self) -> bool:
+        self.done += 1
+        return self.done >= self.cycles
+
+
+def percentile(values, q) -> float:
+    return float(np.percentile(values, q)) if values else None
+
+
+# Прогон main() модуля futures или spot против симулятора; возвращает p50/p99 по этапам в мс
+def run_market(module, symbol, lot, take, loss, cycles, latency, jitter, interval=0.001, quiet=True) -> dict:
+    from cycle import CycleStats
+    from strategy import StraddleSettings
+
+    market = module.adapter
+    market.exchange.latency = latency
+    market.exchange.jitter = jitter
+    market.exchange.start(interval)
+    market.user_stream.start()
+    market.order_books.add_symbol(symbol)
+    market.price_feed.add_symbol(symbol)
+    market.auto_stop = CycleLimit(cycles)
+
+    stats = CycleStats(history=cycles)
+
+    # Журнал событий пишется в файл, в консоль - только с --verbose
+    market.log.echo = not quiet
+    output = io.StringIO() if quiet else sys.stdout
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        market.main(StraddleSettings(lot, take, loss), symbol, stats)
+    elapsed = time.perf_counter() - started
+    market.exchange.stop()
+
+    result = {'cycles': stats.count, 'cycles_per_second': stats.count / elapsed if elapsed else 0.0}
+    for stage in STAGES:
+        values = [getattr(record, stage) * 1000 for record in stats.recent if getattr(record, stage) is not None]
+        result[stage] = {'p50': percentile(values, 50), 'p99': percentile(values, 99)}
+    return result
+
+
+def print_report(name, result) -> None:
+    print(f"{name}: циклов {result['cycles']}, {result['cycles_per_second']:.1f} в секунду")
+    for stage in STAGES:
+        p50, p99 = result[stage]['p50'], result[stage]['p99']
+        if p50 is None:
+            print(f'  {stage:<18} нет данных')
+        else:
+            print(f'  {stage:<18} p50 {p50:9.3f} мс   p99 {p99:9.3f} мс')
+
+
+# Сравнение с сохранёнными базовыми значениями: регрессия, если p50 или p99 выросли больше чем на threshold
+def compare(results, baseline, threshold) -> list:
+    regressions = []
+    for name, result in results.items():
+        for stage in STAGES:
+            for quantile in ('p50', 'p99'):
+                old = baseline.get(name, {}).get(stage, {}).get(quantile)
+                new = result[stage][quantile]
+                if old and new is not None and new > old * (1 + threshold):
+                    regressions.append(f'{name}.{stage}.{quantile}: {old:.3f} -> {new:.3f} мс')
+    return regressions
+
+
+# Микро-замер подписи запроса: BaseClient._get_request_kwargs python-binance против
+# signing.fast_request_kwargs на параметрах ордера фьючерсов; сеть не используется
+def bench_signing(iterations) -> dict:
+    from binance.client import BaseClient, Client
+    import signing
+
+    client = Client.__new__(Client)
+    BaseClient.__init__(client, 'key', 'x' * 64)
+    clock = signing.ServerClock(lambda: int(time.time() * 1000))
+    signer = signing.FastSigner(client.API_SECRET)
+    fast = signing.fast_request_kwargs(client, signer, clock)
+    order = {'symbol': 'BTCUSDT', 'side': 'BUY', 'type': 'STOP_MARKET', 'quantity': 0.001, 'stopPrice': 30020.5,
+             'workingType': 'MARK_PRICE', 'priceProtect': None, 'newOrderRespType': 'RESULT'}
+
+    # Подпись и строка запроса совпадают с python-binance
+    payload, signature = client._get_request_kwargs('get', True, data=dict(order))['params'].rsplit('&signature=', 1)
+    if signer.sign(payload) != signature:
+        raise RuntimeError('Подпись FastSigner не совпадает с python-binance')
+    query = fast('get', True, data=dict(order))['params']
+    if query.split('&timestamp=')[0] != payload.split('&timestamp=')[0]:
+        raise RuntimeError('Строка запроса fast_request_kwargs не совпадает с python-binance')
+
+    results = {}
+    for name, build in (('library', client._get_request_kwargs), ('fast', fast)):
+        for method in ('post', 'get'):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                build(method, True, data=dict(order))
+            results[f'{name}_{method}_us'] = (time.perf_counter() - started) / iterations * 1e6
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Замер задержек цикла MarketAdapter.main (futures и spot) на локальном симуляторе')
+    parser.add_argument('--feed', default=None, help='SYMBOL=путь к ленте цен; по умолчанию синтетическая лента BTCUSDT')
+    parser.add_argument('--markets', default='futures,spot')
+    parser.add_argument('--cycles', type=int, default=200)
+    parser.add_argument('--lot', type=float, default=100.0)
+    parser.add_argument('--take', type=float, default=20.0)
+    parser.add_argument('--loss', type=float, default=20.0)
+    parser.add_argument('--latency', type=float, default=0.0, help='Задержка каждого запроса к бирже, с')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Случайная добавка к задержке до jitter с')
+    parser.add_argument('--interval', type=float, default=0.001, help='Секунд между тиками ленты')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save', action='store_true', help='Сохранить результаты как базовые')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Допустимый рост p50/p99 относительно базовых')
+    parser.add_argument('--verbose', action='store_true', help='Не скрывать вывод main()')
+    parser.add_argument('--signing', type=int, default=None, metavar='N', help='Только микро-замер подписи запроса, N повторов')
+    args = parser.parse_args()
+
+    if args.signing:
+        for key, value in bench_signing(args.signing).items():
+            print(f'{key:<16} {value:8.2f} мкс')
+        sys.exit(0)
+
+    feed = args.feed
+    if feed is None:
+        feed = 'BTCUSDT=' + synthetic_feed(os.path.join(tempfile.mkdtemp(), 'feed.npz'))
+    symbol = feed.split('=')[0] if '=' in feed else 'BTCUSDT'
+
+    # Модули читают SIMULATOR при импорте и создают свою локальную биржу
+    os.environ['SIMULATOR'] = feed
+    modules = {}
+    for name in args.markets.split(','):
+        modules[name] = __import__(name)
+        modules[name].exchange.stop()
+
+    results = {}
+    for name, module in modules.items():
+        results[name] = run_market(module, symbol, args.lot, args.take, args.loss, args.cycles, args.latency, args.jitter, args.interval, quiet=not args.verbose)
+        print_report(name, results[name])
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print('Базовые значения сохранены в', args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print('Регрессии задержек:')
+            for line in regressions:
+                print(' ', line)
+            sys.exit(1)
+        print('Регрессий нет')
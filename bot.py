@@ -0,0 +1,111 @@
+import sys
+import json
+import signal
+import argparse
+import importlib
+import threading
+
+from config import load_config
+from control import Controller, ControlServer, call
+
+
+# Заставка при запуске; пакет art нужен только для неё
+def banner() -> None:
+    try:
+        from art import tprint
+    except ImportError:
+        print('Binance bot started')
+        return
+    tprint('Binance   bot   started')
+
+
+# Первый SIGINT/SIGTERM - остановка после текущего цикла, второй - немедленный выход
+def install_signals(controller, stopped) -> None:
+    def handle(signum, frame):
+        if controller.market.auto_stop.is_set() or not controller.running:
+            stopped.set()
+            return
+        print('Остановка после завершения текущего цикла (повторный сигнал - выход)')
+        controller.stop()
+
+    signal.signal(signal.SIGINT, handle)
+    signal.signal(signal.SIGTERM, handle)
+
+
+# Торговля без окна: модуль рынка импортируется только здесь, Tk не загружается.
+# start=True - сразу запустить торговлю и выйти после её завершения,
+# иначе ждать команд управляющего API до сигнала остановки
+def serve(config, start=True) -> None:
+    market = importlib.import_module(config.market)
+    controller = Controller(market, config)
+    server = ControlServer(controller, config.host, config.port, config.token)
+    server.start()
+    print('Управление:', server.url)
+
+    stopped = threading.Event()
+    install_signals(controller, stopped)
+    if start:
+        controller.start()
+    while not stopped.wait(0.5):
+        if start and not controller.running:
+            break
+    server.stop()
+
+
+# Окно Tk поверх управляющего API в том же процессе (python futures.py / python spot.py)
+def serve_with_gui(market, name) -> None:
+    from gui import run_gui
+
+    banner()
+    config = load_config(market=name)
+    controller = Controller(market, config)
+    server = ControlServer(controller, config.host, config.port, config.token)
+    server.start()
+    run_gui(server.url, config, config.token)
+    # Окно закрыто, а торговля продолжается до остановки
+    controller.wait()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m bot', description='Стрэддл-бот Binance без окна')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    for name, text in (('run', 'Запустить торговлю'), ('serve', 'Ждать команд управляющего API')):
+        command = commands.add_parser(name, help=text)
+        command.add_argument('--config', default=None, help='TOML-файл с параметрами')
+        command.add_argument('--market', choices=('futures', 'spot'), default=None)
+        command.add_argument('--symbol', default=None)
+        command.add_argument('--port', type=int, default=None)
+
+    gui = commands.add_parser('gui', help='Окно управления запущенным ботом')
+    gui.add_argument('--config', default=None)
+    gui.add_argument('--url', default=None)
+
+    for name in ('status', 'stop', 'resume', 'cancel'):
+        command = commands.add_parser(name, help='Команда управляющему API')
+        command.add_argument('--config', default=None)
+        command.add_argument('--url', default=None)
+
+    args = parser.parse_args(argv)
+    if args.command in ('run', 'serve'):
+        banner()
+        serve(load_config(args.config, market=args.market, symbol=args.symbol, port=args.port), start=args.command == 'run')
+        return
+
+    config = load_config(args.config)
+    url = args.url or f'http://{config.host}:{config.port}'
+    if args.command == 'gui':
+        from gui import run_gui
+
+        run_gui(url, config, config.token)
+    else:
+        try:
+            result = call(url, '/status' if args.command == 'status' else '/' + args.command, None if args.command == 'status' else {}, config.token)
+        except OSError as ex:
+            print('Нет связи с', url, ex)
+            sys.exit(1)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
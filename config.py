@@ -0,0 +1,76 @@
+import os
+import tomllib
+from dataclasses import dataclass, fields, replace
+
+
+ENV_PREFIX = 'STRADDLE_'
+
+
+# Параметры торговли (то же, что поля формы Tk) и адрес управляющего API
+@dataclass(frozen=True)
+class TradingConfig:
+    market: str = 'futures'
+    symbol: str = 'BTCUSDT'
+    # Начальный LOT в процентах от баланса (не меньше 10 в валюте котировки)
+    lot_percent: float = 0.0
+    take: float = 0.0
+    loss: float = 0.0
+    fee: float = 0.0
+    trailing_stop: bool = False
+    trail_distance_percent: float = 0.0
+    trailing_limit: float = 0.0
+    martingale: bool = False
+    lot_increment: float = 1.0
+    # Лимиты risk.RiskGuard, 0 - без ограничения
+    max_notional: float = 0.0
+    max_martingale_depth: int = 0
+    daily_loss_limit: float = 0.0
+    max_exposure: float = 0.0
+    max_fee: float = 0.0
+    host: str = '127.0.0.1'
+    port: int = 8765
+    token: str = None
+
+
+def _cast(kind, value):
+    if value is None:
+        return None
+    if kind == 'bool':
+        if isinstance(value, str):
+            return value.strip().lower() in ('1', 'true', 'yes', 'on')
+        return bool(value)
+    if kind == 'int':
+        return int(value)
+    if kind == 'float':
+        return float(value)
+    return str(value).strip()
+
+
+# Новая конфигурация с изменёнными полями; неизвестные поля - ошибка
+def update_config(config, values) -> TradingConfig:
+    kinds = {field.name: field.type.__name__ for field in fields(TradingConfig)}
+    unknown = set(values) - set(kinds)
+    if unknown:
+        raise ValueError('Неизвестные параметры: ' + ', '.join(sorted(unknown)))
+    config = replace(config, **{name: _cast(kinds[name], value) for name, value in values.items()})
+    if config.market not in ('futures', 'spot'):
+        raise ValueError('market должен быть futures или spot')
+    return config
+
+
+# Конфигурация из TOML (поля верхнего уровня и таблица [control]) и переменных окружения STRADDLE_*.
+# Окружение важнее файла, явные overrides важнее окружения
+def load_config(path=None, env=None, **overrides) -> TradingConfig:
+    values = {}
+    if path:
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+        values.update(data.pop('control', {}))
+        values.update(data)
+    env = os.environ if env is None else env
+    for field in fields(TradingConfig):
+        name = ENV_PREFIX + field.name.upper()
+        if name in env:
+            values[field.name] = env[name]
+    values.update({name: value for name, value in overrides.items() if value is not None})
+    return update_config(TradingConfig(), values)
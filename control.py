@@ -0,0 +1,161 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import update_config
+import metrics
+from cycle import CycleStats
+
+
+# Управление торговлей модуля futures или spot: запуск в отдельном потоке,
+# остановка после текущего цикла через market.auto_stop, отмена ордеров символа
+class Controller:
+    def __init__(self, market, config):
+        self.market = market
+        self.config = config
+        self.stats = CycleStats()
+
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # Запуск с изменёнными параметрами; False, если торговля уже идёт
+    def start(self, **values) -> bool:
+        with self._lock:
+            if self.running:
+                return False
+            self.config = update_config(self.config, values)
+            self.stats = CycleStats()
+            self.market.auto_stop.clear()
+            self._thread = threading.Thread(target=self.market.start_trading, args=(self.config, self.stats), daemon=True)
+            self._thread.start()
+        return True
+
+    # Остановка после завершения текущего цикла
+    def stop(self) -> None:
+        self.market.auto_stop.set()
+
+    def resume(self) -> None:
+        self.market.auto_stop.clear()
+
+    def cancel(self, symbol=None) -> None:
+        self.market.close_orders(symbol or self.config.symbol)
+
+    def wait(self, timeout=None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self) -> dict:
+        last = self.stats.recent[-1] if self.stats.recent else None
+        return {
+            'running': self.running,
+            'stopping': self.market.auto_stop.is_set(),
+            'config': {name: value for name, value in asdict(self.config).items() if name != 'token'},
+            'cycles': self.stats.count,
+            'pnl': self.stats.pnl,
+            'lot': last.lot if last else None,
+            'placement_latency': self.stats.average('placement_latency'),
+            'time_to_fill': self.stats.average('time_to_fill'),
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    controller = None
+    token = None
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _reply(self, code, body) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        if self.token and self.headers.get('X-Control-Token') != self.token:
+            self._reply(403, {'error': 'forbidden'})
+            return False
+        return True
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+        if self.path == '/status':
+            self._reply(200, self.controller.status())
+        elif self.path == '/metrics':
+            data = metrics.registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', metrics.CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def do_POST(self) -> None:
+        if not self._authorized():
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if self.path == '/start':
+                self._reply(200 if self.controller.start(**body) else 409, self.controller.status())
+            elif self.path == '/stop':
+                self.controller.stop()
+                self._reply(200, self.controller.status())
+            elif self.path == '/resume':
+                self.controller.resume()
+                self._reply(200, self.controller.status())
+            elif self.path == '/cancel':
+                self.controller.cancel(body.get('symbol'))
+                self._reply(200, self.controller.status())
+            else:
+                self._reply(404, {'error': 'not found'})
+        except (ValueError, TypeError) as ex:
+            self._reply(400, {'error': str(ex)})
+
+
+# Локальный HTTP API управления: GET /status, GET /metrics (Prometheus), POST /start (JSON с параметрами), /stop, /resume, /cancel.
+# Слушает только указанный адрес (по умолчанию 127.0.0.1); token - заголовок X-Control-Token
+class ControlServer:
+    def __init__(self, controller, host='127.0.0.1', port=8765, token=None):
+        handler = type('Handler', (_Handler,), {'controller': controller, 'token': token})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# Клиент управляющего API (для Tk и командной строки)
+def call(url, path, payload=None, token=None, timeout=5) -> dict:
+    data = None if payload is None else json.dumps(payload).encode()
+    request = urllib.request.Request(url + path, data=data, method='GET' if data is None else 'POST')
+    request.add_header('Content-Type', 'application/json')
+    if token:
+        request.add_header('X-Control-Token', token)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as ex:
+        return json.loads(ex.read() or b'{}')
@@ -0,0 +1,102 @@
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import metrics
+
+
+# Компактная запись одного торгового цикла. Время в секундах (time.perf_counter)
+@dataclass(slots=True)
+class CycleRecord:
+    number: int
+    symbol: str
+    lot: float
+    start_price: float = 0.0
+    long: bool = None
+    short: bool = None
+    pnl: float = 0.0
+    started: float = 0.0
+    priced: float = 0.0
+    placed: float = 0.0
+    filled: float = 0.0
+    finished: float = 0.0
+    # От исполнения ноги до подтверждения отмены второй (худшая из сторон)
+    cancel_latency: float = None
+    # ID цикла в журнале и баланс валюты котировки на старте
+    cycle_id: int = None
+    start_balance: float = 0.0
+    # Рынок и счёт (метки метрик): main - основной счёт, как в accounts.AccountRegistry.adapters
+    market: str = ''
+    account: str = 'main'
+
+    # Получение цены для входа
+    @property
+    def price_latency(self) -> float:
+        return self.priced - self.started if self.priced else None
+
+    # Размещение обеих сторон
+    @property
+    def placement_latency(self) -> float:
+        return self.placed - (self.priced or self.started) if self.placed else None
+
+    # От размещения до закрытия последней стороны
+    @property
+    def time_to_fill(self) -> float:
+        return self.filled - self.placed if self.filled else None
+
+    @property
+    def duration(self) -> float:
+        return self.finished - self.started if self.finished else None
+
+
+def new_cycle(number, symbol, lot) -> CycleRecord:
+    return CycleRecord(number, symbol, lot, started=time.perf_counter())
+
+
+# Заполнение времени исполнения и отмены по закрытым ногам OrderTracker. Вызывается после
+# OrderTracker.wait / join_cancels, когда отмены вторых ног обеих сторон уже завершены
+def mark_legs(record, legs) -> None:
+    record.filled = max(leg.done_at for leg in legs)
+    canceled = [leg.canceled_at - leg.done_at for leg in legs if leg.canceled_at >= leg.done_at > 0]
+    record.cancel_latency = max(canceled) if canceled else None
+    for leg in legs:
+        if leg.side == 'LONG':
+            record.long = leg.result
+        else:
+            record.short = leg.result
+
+
+# Статистика по циклам с постоянным расходом памяти: суммы и последние history записей
+class CycleStats:
+    def __init__(self, history=100):
+        self.count = 0
+        self.pnl = 0.0
+        self.recent = deque(maxlen=history)
+        self._sums = {'price_latency': 0.0, 'placement_latency': 0.0, 'time_to_fill': 0.0, 'cancel_latency': 0.0}
+        self._counts = dict.fromkeys(self._sums, 0)
+
+    def add(self, record) -> None:
+        record.finished = record.finished or time.perf_counter()
+        self.count += 1
+        self.pnl += record.pnl
+        self.recent.append(record)
+        metrics.observe_cycle(record)
+        for name in self._sums:
+            value = getattr(record, name)
+            if value is not None:
+                self._sums[name] += value
+                self._counts[name] += 1
+
+    def average(self, name) -> float:
+        return self._sums[name] / self._counts[name] if self._counts[name] else None
+
+    # Задержки цикла в журнал событий log (eventlog.EventLog)
+    def report(self, record, log) -> None:
+        log.event(
+            'cycle_latency', 'Цикл', record.number,
+            'размещение %.3f с' % (record.placement_latency or 0),
+            'до исполнения %.3f с' % (record.time_to_fill or 0),
+            'отмена %.3f с' % (record.cancel_latency or 0),
+            symbol=record.symbol, number=record.number, placement_latency=record.placement_latency,
+            time_to_fill=record.time_to_fill, cancel_latency=record.cancel_latency,
+        )
@@ -0,0 +1,226 @@
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import futures
+import metrics
+from strategy import StraddleSettings
+from transport import AsyncTransport
+from risk import RiskLimits
+from cycle import CycleStats, new_cycle
+
+
+# Состояние стратегии одного символа
+class StraddleStrategy:
+    def __init__(self, symbol, settings):
+        self.symbol = symbol
+        self.settings = settings
+        self.lot = settings.initial_lot
+        self.cycles = 0
+        self.wins = 0
+        self.losses = 0
+        self.running = True
+        self.stats = CycleStats()
+
+    # Итоги цикла; lot - следующий LOT по MarketAdapter.next_lot
+    def finish_cycle(self, lot, legs) -> None:
+        self.cycles += 1
+        self.wins += sum(1 for leg in legs if leg.result)
+        self.losses += sum(1 for leg in legs if not leg.result)
+        self.lot = lot
+
+
+# Движок: стратегии по многим символам в одном процессе, без Tk.
+# Блокирующие вызовы клиента выполняются в общем пуле потоков и проходят через
+# общий RateGovernor клиента (market.governor), а ожидание
+# исполнения тейков/стопов идёт по событиям OrderTracker без отдельного потока на символ.
+# market - market.MarketAdapter (по умолчанию фьючерсы из futures.py), limits - risk.RiskLimits
+# (None - текущие лимиты market.risk), fee - порог комиссии, как fee в TradingConfig
+class StraddleEngine:
+    def __init__(self, strategies, max_workers=32, reconcile_interval=3, transport=None, market=None, limits=None, fee=0.0):
+        self.strategies = {strategy.symbol: strategy for strategy in strategies}
+        self.market = market or futures.adapter
+        self.limits = limits
+        self.fee = fee
+        self.transport = transport
+        self.reconcile_interval = reconcile_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._loop = None
+        self._waiters = {}
+        self._stopping = False
+
+    async def _call(self, func, *args):
+        return await self._loop.run_in_executor(self._executor, func, *args)
+
+    # Цена из потока; если котировка устарела - REST-метод адаптера через асинхронный
+    # транспорт, если он подключен, иначе через пул потоков
+    async def _price(self, symbol) -> float:
+        market = self.market
+        price = market.price_feed.price(symbol)
+        if price is not None:
+            return price
+        if self.transport is None:
+            return await self._call(market.rest_price, symbol)
+        prices = await asyncio.wrap_future(self.transport.submit(market.price_method, symbol=symbol))
+        return float(prices[market.price_field])
+
+    def _on_leg_done(self, leg) -> None:
+        waiter = self._waiters.get(id(leg))
+        if waiter is not None:
+            self._loop.call_soon_threadsafe(waiter.set)
+
+    async def _wait_legs(self, legs) -> None:
+        events = []
+        for leg in legs:
+            event = self._waiters[id(leg)] = asyncio.Event()
+            events.append(event)
+            if leg.done:
+                event.set()
+        try:
+            await asyncio.gather(*(event.wait() for event in events))
+            # Следующий цикл - только после отмены вторых ног
+            await self._call(self.market.tracker.join_cancels, legs)
+        finally:
+            for leg in legs:
+                self._waiters.pop(id(leg), None)
+            self.market.tracker.forget(legs)
+
+    # Сверка через REST, пока поток пользовательских данных не подключен
+    async def _reconcile_loop(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(self.reconcile_interval)
+            if not self.market.tracker.connected:
+                await self._call(self.market.tracker.reconcile)
+
+    # Как MarketAdapter.run_cycle: LOT резервируется до размещения и освобождается при откате или ошибке
+    async def _run_cycle(self, strategy) -> bool:
+        market = self.market
+        symbol = strategy.symbol
+        # Проверка риска в памяти, до запроса цены и размещения
+        lot = market.risk_check(symbol, strategy.lot, strategy.settings)
+        if lot is None:
+            return False
+        try:
+            placed = await self._trade_cycle(strategy, lot)
+        except Exception:
+            market.risk.release(symbol, lot)
+            raise
+        if not placed:
+            market.risk.release(symbol, lot)
+        return placed
+
+    # Шаги MarketAdapter.trade_cycle; блокирующие - в пуле потоков, ожидание ног - по событиям
+    async def _trade_cycle(self, strategy, lot) -> bool:
+        market = self.market
+        settings = strategy.settings
+        symbol = strategy.symbol
+        record = new_cycle(strategy.cycles + 1, symbol, lot)
+
+        price = await self._price(symbol)
+        await self._call(market.open_cycle, record, price)
+        # Исключение при размещении стороны - неудача этой стороны, вторая откатывается
+        placements = await self._call(market.place_both, lot, symbol, settings, record.start_price)
+        record.placed = time.perf_counter()
+        if not await self._call(market.commit_placements, record, placements):
+            return False
+
+        legs = market.track_legs(symbol, placements)
+        await self._wait_legs(legs)
+        await self._call(market.close_cycle, record, placements, legs)
+        strategy.finish_cycle(market.next_lot(strategy.lot, settings, record, legs), legs)
+        strategy.stats.add(record)
+        market.log.event('strategy_lot', symbol, 'Цикл', record.number, 'LOT', strategy.lot, symbol=symbol, number=record.number, lot=strategy.lot)
+        return True
+
+    # Незавершённые циклы из журнала (после перезапуска) и проверка комиссии, которая
+    # заодно кэширует её для max_fee. False - символ не торгуется
+    async def _prepare_strategy(self, strategy) -> bool:
+        try:
+            await self._call(self.market.resume_cycles, strategy.symbol)
+            # Нумерация циклов продолжается с последнего номера в журнале
+            strategy.cycles = await self._call(self.market.journal.last_number, strategy.symbol)
+            return await self._call(self.market.symbol_fee_allowed, strategy.symbol, self.fee)
+        except Exception as ex:
+            self.market.log.event('cycle_error', strategy.symbol, 'Ошибка подготовки:', ex, symbol=strategy.symbol, error=repr(ex))
+            return False
+
+    async def _run_strategy(self, strategy) -> None:
+        while strategy.running and not self._stopping:
+            try:
+                if not await self._run_cycle(strategy):
+                    strategy.running = False
+            except Exception as ex:
+                self.market.log.event('cycle_error', strategy.symbol, 'Ошибка цикла:', ex, symbol=strategy.symbol, error=repr(ex))
+                strategy.running = False
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self.market.tracker.done_callbacks.append(self._on_leg_done)
+        self.market.user_stream.start()
+        for symbol in self.strategies:
+            self.market.order_books.add_symbol(symbol)
+            self.market.price_feed.add_symbol(symbol)
+
+        reconcile = asyncio.create_task(self._reconcile_loop())
+        try:
+            strategies = list(self.strategies.values())
+            ready = await asyncio.gather(*(self._prepare_strategy(strategy) for strategy in strategies))
+            # PnL за сутки - после продолжения циклов, чтобы они тоже вошли в него
+            await self._call(self.market.prepare_risk, self.limits or self.market.risk.limits)
+            await asyncio.gather(*(self._run_strategy(strategy) for strategy, allowed in zip(strategies, ready) if allowed))
+        finally:
+            self._stopping = True
+            reconcile.cancel()
+            self.market.tracker.done_callbacks.remove(self._on_leg_done)
+            self._executor.shutdown(wait=False)
+            self.market.latency.report()
+            self.market.trades.flush()
+            for symbol, totals in self.market.trades.symbols.items():
+                print(symbol, 'профит по сделкам:', totals.net, 'комиссии:', totals.fees)
+
+    # Остановка после завершения текущих циклов
+    def stop(self) -> None:
+        for strategy in self.strategies.values():
+            strategy.running = False
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Стрэддл по нескольким фьючерсным парам без GUI')
+    parser.add_argument('--symbols', required=True, help='Пары через запятую, например BTCUSDT,ETHUSDT')
+    parser.add_argument('--lot', type=float, required=True, help='Начальный LOT в валюте котировки')
+    parser.add_argument('--take', type=float, required=True)
+    parser.add_argument('--loss', type=float, required=True)
+    parser.add_argument('--trailing-stop', action='store_true')
+    parser.add_argument('--trailing-limit', type=float, default=0.0)
+    parser.add_argument('--trail-distance', type=float, default=0.0)
+    parser.add_argument('--martingale', action='store_true')
+    parser.add_argument('--lot-increment', type=float, default=1.0)
+    parser.add_argument('--max-notional', type=float, default=0.0, help='Лимиты risk.RiskGuard, 0 - без ограничения')
+    parser.add_argument('--max-martingale-depth', type=int, default=0)
+    parser.add_argument('--daily-loss-limit', type=float, default=0.0)
+    parser.add_argument('--max-exposure', type=float, default=0.0)
+    parser.add_argument('--max-fee', type=float, default=0.0)
+    parser.add_argument('--fee', type=float, default=0.0, help='Порог комиссии мейкера для запуска, как fee в TOML')
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--async-transport', action='store_true', help='Запросы цены через AsyncClient')
+    parser.add_argument('--metrics-port', type=int, default=None, help='Порт endpoint /metrics на 127.0.0.1')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.metrics_port:
+        metrics.serve(port=args.metrics_port)
+    settings = StraddleSettings(args.lot, args.take, args.loss, args.trailing_stop, args.trailing_limit, args.trail_distance, args.martingale, args.lot_increment)
+    limits = RiskLimits(args.max_notional, args.max_martingale_depth, args.daily_loss_limit, args.max_exposure, args.max_fee)
+    strategies = [StraddleStrategy(symbol.strip(), settings) for symbol in args.symbols.split(',') if symbol.strip()]
+    transport = None
+    if args.async_transport:
+        transport = AsyncTransport(futures.adapter.api_key, futures.adapter.api_secret, futures.testnet, governor=futures.adapter.governor, latency=futures.adapter.latency)
+        transport.start()
+    engine = StraddleEngine(strategies, max_workers=args.workers, transport=transport, limits=limits, fee=args.fee)
+    try:
+        asyncio.run(engine.run())
+    except KeyboardInterrupt:
+        print('Остановка')
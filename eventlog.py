@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import threading
+
+
+LOG_DIR = 'logs'
+
+_STOP = object()
+
+
+def _default(value):
+    return str(value)
+
+
+# Событие в журнал log (EventLog); без журнала - текст в консоль: так работают скрипты
+# и тесты, которые создают потоки, стаканы и часы без адаптера рынка
+def log_event(log, name, *parts, **fields) -> None:
+    if log is None:
+        print(*parts)
+    else:
+        log.event(name, *parts, **fields)
+
+
+# Структурный журнал событий в JSON lines. Торговый поток только кладёт событие в очередь
+# (SimpleQueue.put без блокировок на вводе-выводе); запись в файл пачками, вывод в консоль
+# и ротация по размеру выполняются в отдельном потоке.
+# Номер цикла берётся из контекста символа (set_cycle), поэтому он есть у каждого события
+# без передачи через place_order и потоки LONG/SHORT
+class EventLog:
+    def __init__(self, path, max_bytes=50 * 1024 * 1024, backups=5, batch_size=512, echo=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.batch_size = batch_size
+        self.echo = echo
+        self.written = 0
+        self.dropped = 0
+
+        self._queue = queue.SimpleQueue()
+        self._cycles = {}
+        self._file = None
+        self._thread = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    # Текущий цикл символа (ID из журнала циклов); None - вне цикла
+    def set_cycle(self, symbol, cycle_id) -> None:
+        self._cycles[symbol] = cycle_id
+
+    # Событие: name - тип события, parts - текст для консоли (как аргументы print),
+    # fields - symbol, side, order_ids и другие поля
+    def event(self, name, *parts, symbol=None, side=None, order_ids=None, **fields) -> None:
+        if self._thread is None:
+            self._start()
+        record = {'time': time.time(), 'event': name, 'cycle': self._cycles.get(symbol), 'symbol': symbol, 'side': side, 'order_ids': order_ids}
+        if parts:
+            record['message'] = ' '.join(str(part) for part in parts)
+        record.update(fields)
+        self._queue.put((record, parts))
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='eventlog', daemon=True)
+                self._thread.start()
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    # Ротация как у logging.handlers.RotatingFileHandler: path -> path.1 -> ... -> path.backups
+    def _rotate(self) -> None:
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f'{self.path}.{index}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.path}.{index + 1}')
+        if self.backups:
+            os.replace(self.path, self.path + '.1')
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _write(self, batch) -> None:
+        lines = []
+        for record, parts in batch:
+            try:
+                lines.append(json.dumps(record, ensure_ascii=False, default=_default))
+            except (TypeError, ValueError):
+                self.dropped += 1
+                continue
+            if self.echo and parts:
+                print(*parts, file=sys.stdout)
+        if not lines:
+            return
+        try:
+            if self._file is None:
+                self._open()
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+            self.written += len(lines)
+            if self._file.tell() >= self.max_bytes:
+                self._rotate()
+        except OSError as ex:
+            self.dropped += len(lines)
+            print('Ошибка записи журнала событий:', ex, file=sys.stderr)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            self._write([item for item in batch if item is not _STOP])
+            if stop:
+                return
+
+    # Дописать очередь и закрыть файл (при выходе из процесса - через atexit)
+    def close(self, timeout=5) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        with self._lock:
+            self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,128 @@
+import time
+import signal
+import argparse
+import importlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from accounts import AccountRegistry
+from config import load_config
+from cycle import CycleStats
+
+
+# Этапы цикла, по которым сравниваются счета
+SKEW_STAGES = ('priced', 'placed', 'filled')
+
+ACCOUNT_SKEW_SECONDS = metrics.registry.add(metrics.Histogram('straddle_account_skew_seconds', 'Разброс этапа цикла между счетами', ('symbol', 'stage')))
+
+
+# Разброс времени этапов одного цикла между счетами, секунды
+def cycle_skew(records) -> dict:
+    skew = {}
+    for stage in SKEW_STAGES:
+        values = [getattr(record, stage) for record in records if getattr(record, stage)]
+        skew[stage] = max(values) - min(values) if len(values) > 1 else 0.0
+    return skew
+
+
+# Один и тот же цикл на всех счетах параллельно. У каждого счёта свой поток-исполнитель,
+# клиент, пул соединений и доля лимита веса, поэтому медленный или ограниченный счёт
+# не задерживает размещение на остальных. Следующий цикл начинается, когда закрылись все;
+# счёт, на котором цикл откатан, выбывает
+class FanOutExecutor:
+    def __init__(self, adapters, history=100):
+        self.adapters = dict(adapters)
+        self.stats = {name: CycleStats() for name in self.adapters}
+        self.skews = deque(maxlen=history)
+        self.auto_stop = threading.Event()
+        self._pools = {name: ThreadPoolExecutor(max_workers=1, thread_name_prefix='account-' + name) for name in self.adapters}
+
+    # Вызов call(name, adapter) на всех счетах из names, каждый в потоке своего счёта.
+    # Результат по имени счёта; упавший счёт пишет ошибку в свой журнал и получает None
+    def _fan_out(self, names, call) -> dict:
+        futures = {name: self._pools[name].submit(call, name, self.adapters[name]) for name in names}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as ex:
+                self.adapters[name].log.event('account_error', name, 'Ошибка счёта:', ex, account=name, error=repr(ex))
+                results[name] = None
+        return results
+
+    def report(self, number, symbol, records) -> dict:
+        skew = cycle_skew(records.values())
+        for stage, value in skew.items():
+            ACCOUNT_SKEW_SECONDS.observe(value, symbol, stage)
+        self.skews.append(skew)
+        slowest = max(records, key=lambda name: records[name].placed)
+        log = next(iter(self.adapters.values())).log
+        log.event('fanout_cycle', f"Цикл {number}: счетов {len(records)}, разброс цены {skew['priced'] * 1000:.1f} мс, "
+                  f"размещения {skew['placed'] * 1000:.1f} мс, исполнения {skew['filled'] * 1000:.1f} мс, позже всех {slowest}",
+                  symbol=symbol, accounts=list(records), slowest=slowest, **{stage + '_skew': value for stage, value in skew.items()})
+        return skew
+
+    def run(self, config) -> None:
+        symbol = config.symbol
+        prepared = {name: result for name, result in self._fan_out(self.adapters, lambda name, adapter: adapter.prepare(config)).items() if result is not None}
+        settings = {name: result[0] for name, result in prepared.items()}
+        allowed = self._fan_out(settings, lambda name, adapter: adapter.fee_allowed(config))
+        active = [name for name in settings if allowed[name]]
+        lots = {name: settings[name].initial_lot for name in active}
+
+        number = max((self.adapters[name].journal.last_number(symbol) for name in active), default=0)
+        while active and not self.auto_stop.is_set():
+            number += 1
+            results = self._fan_out(active, lambda name, adapter: adapter.run_cycle(number, symbol, lots[name], settings[name]))
+            records = {}
+            for name, result in results.items():
+                if result is None:
+                    active.remove(name)
+                    continue
+                record, legs = result
+                self.stats[name].add(record)
+                lots[name] = self.adapters[name].next_lot(lots[name], settings[name], record, legs)
+                records[name] = record
+            if records:
+                self.report(number, symbol, records)
+
+        for name, (_, start_balance) in prepared.items():
+            self.adapters[name].finish(symbol, start_balance, self.stats[name])
+        for pool in self._pools.values():
+            pool.shutdown(wait=False)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Один стрэддл на основном счёте и суб-счетах из реестра')
+    parser.add_argument('--config', default=None, help='TOML-файл с параметрами, как у python -m bot run')
+    parser.add_argument('--accounts', required=True, help='TOML-файл с таблицами [[account]]')
+    parser.add_argument('--market', choices=('futures', 'spot'), default=None)
+    parser.add_argument('--symbol', default=None)
+    parser.add_argument('--metrics-port', type=int, default=None, help='Порт endpoint /metrics на 127.0.0.1')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    config = load_config(args.config, market=args.market, symbol=args.symbol)
+    if args.metrics_port:
+        metrics.serve(port=args.metrics_port)
+    market = importlib.import_module(config.market)
+    executor = FanOutExecutor(AccountRegistry.load(args.accounts).adapters(market.adapter))
+
+    # Первый SIGINT - остановка после текущего цикла, второй - немедленный выход
+    def handle(signum, frame):
+        if executor.auto_stop.is_set():
+            raise KeyboardInterrupt
+        print('Остановка после завершения текущего цикла (повторный сигнал - выход)')
+        executor.auto_stop.set()
+
+    signal.signal(signal.SIGINT, handle)
+    signal.signal(signal.SIGTERM, handle)
+    started = time.perf_counter()
+    executor.run(config)
+    for name, stats in executor.stats.items():
+        print(name, 'циклов', stats.count, 'PNL', stats.pnl)
+    print(f'Время работы {time.perf_counter() - started:.1f} с')
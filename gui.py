@@ -0,0 +1,92 @@
+import tkinter as tk
+
+from control import call
+
+
+# Окно Tk - клиент управляющего API: значения полей читаются только в потоке Tk
+# и отправляются в POST /start, торговля идёт в процессе с ControlServer
+def run_gui(url, config, token=None) -> None:
+    window = tk.Tk()
+    window.title("Binance Trading Script")
+    window.geometry("400x540")
+
+    entries = {}
+
+    # Поле ввода с меткой; значение по умолчанию из config
+    def add_entry(name, text):
+        label = tk.Label(window, text=text)
+        label.pack()
+        variable = tk.StringVar(value=str(getattr(config, name)))
+        entry = tk.Entry(window, textvariable=variable)
+        entry.pack()
+        entries[name] = variable
+
+    def add_checkbox(name, text):
+        variable = tk.BooleanVar(value=getattr(config, name))
+        checkbox = tk.Checkbutton(window, text=text, variable=variable)
+        checkbox.pack()
+        entries[name] = variable
+
+    # Создание полей ввода и меток для параметров
+    add_entry('lot_percent', "Начальное значение LOT:")
+    add_entry('take', "Тейк профит (пункты):")
+    add_entry('loss', "Стоп-лосс (пункты):")
+    add_entry('fee', "Коммисия:")
+    add_checkbox('trailing_stop', "Активировать трейлинг стоп")
+    add_entry('trail_distance_percent', "Расстояние трейл-стопа (%):")
+    add_entry('trailing_limit', "Стоп лимит трейл-стопа (%):")
+    add_checkbox('martingale', "Включить Мартингейл")
+    add_entry('lot_increment', "Множитель лота:")
+    add_entry('symbol', "Пара торговли:")
+
+    def toggle_auto_stop():
+        call(url, '/stop' if auto_stop_var.get() else '/resume', {}, token)
+
+    auto_stop_var = tk.BooleanVar()
+    auto_stop_checkbox = tk.Checkbutton(window, text="Автоматическая остановка", variable=auto_stop_var, command=toggle_auto_stop)
+    auto_stop_checkbox.pack()
+
+    def start():
+        values = {name: variable.get() for name, variable in entries.items()}
+        result = call(url, '/start', values, token)
+        if 'error' in result:
+            print('Ошибка при старте трейдинга:', result['error'])
+        elif auto_stop_var.get():
+            # Запуск сбрасывает остановку: отмеченный флажок - один цикл
+            call(url, '/stop', {}, token)
+
+    start_button = tk.Button(window, text="Старт", command=start)
+    start_button.pack()
+
+    stop_button = tk.Button(window, text="Остановить все ордера", command=lambda: call(url, '/cancel', {'symbol': entries['symbol'].get()}, token))
+    stop_button.pack()
+
+    status_label = tk.Label(window, text='')
+    status_label.pack()
+
+    # Состояние торговли раз в секунду
+    def refresh():
+        try:
+            status = call(url, '/status', token=token, timeout=0.5)
+            status_label.config(text=f"{'Идёт торговля' if status['running'] else 'Остановлено'}, циклов {status['cycles']}, PNL {status['pnl']:.2f}")
+        except Exception:
+            status_label.config(text='Нет связи с ' + url)
+        window.after(1000, refresh)
+
+    refresh()
+    # Запуск главного цикла обработки событий
+    window.mainloop()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from config import load_config
+
+    parser = argparse.ArgumentParser(description='Окно управления запущенным ботом')
+    parser.add_argument('--config', default=None)
+    parser.add_argument('--url', default=None)
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    run_gui(args.url or f'http://{config.host}:{config.port}', config, config.token)
@@ -0,0 +1,108 @@
+import os
+import time
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+
+
+STATE_DIR = 'state'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cycles (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    lot REAL NOT NULL,
+    start_price REAL,
+    state TEXT NOT NULL DEFAULT 'open',
+    pnl REAL,
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS cycles_open ON cycles (state) WHERE state = 'open';
+CREATE TABLE IF NOT EXISTS legs (
+    cycle_id INTEGER NOT NULL REFERENCES cycles (id),
+    side TEXT NOT NULL,
+    entry_id INTEGER,
+    take_id INTEGER NOT NULL,
+    stop_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS legs_cycle ON legs (cycle_id);
+'''
+
+
+# Незавершённый цикл из журнала: ноги - (side, entry_id, take_id, stop_id)
+@dataclass
+class OpenCycle:
+    id: int
+    symbol: str
+    number: int
+    lot: float
+    start_price: float
+    legs: list = field(default_factory=list)
+
+
+# Журнал циклов в SQLite (WAL): цикл записывается до размещения ордеров, ID ордеров - сразу
+# после размещения, итог - после закрытия. synchronous=NORMAL: коммит не ждёт fsync,
+# WAL сбрасывается на диск пачкой при checkpoint, а падение процесса записи не теряет.
+class CycleJournal:
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def open_cycle(self, symbol, number, lot, start_price=None) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                'INSERT INTO cycles (symbol, number, lot, start_price, started) VALUES (?, ?, ?, ?, ?)',
+                (symbol, number, lot, start_price, time.time()),
+            )
+            return cursor.lastrowid
+
+    # Ноги цикла (side, entry_id, take_id, stop_id) одной транзакцией: после падения между
+    # записями продолжение отслеживало бы только половину стрэддла
+    def add_legs(self, cycle_id, legs) -> None:
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.executemany('INSERT INTO legs VALUES (?, ?, ?, ?, ?)', [(cycle_id, *leg) for leg in legs])
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    # state: closed - цикл завершён, rolled_back - ордера отменены после ошибки размещения
+    def close_cycle(self, cycle_id, pnl=None, state='closed') -> None:
+        with self._lock:
+            self._db.execute('UPDATE cycles SET state = ?, pnl = ?, finished = ? WHERE id = ?', (state, pnl, time.time(), cycle_id))
+
+    def open_cycles(self, symbol=None) -> list:
+        with self._lock:
+            query = 'SELECT id, symbol, number, lot, start_price FROM cycles WHERE state = \'open\''
+            rows = self._db.execute(query + (' AND symbol = ?' if symbol else '') + ' ORDER BY id', (symbol,) if symbol else ()).fetchall()
+            cycles = [OpenCycle(*row) for row in rows]
+            for cycle in cycles:
+                cycle.legs = self._db.execute('SELECT side, entry_id, take_id, stop_id FROM legs WHERE cycle_id = ?', (cycle.id,)).fetchall()
+        return cycles
+
+    # Номер последнего цикла символа: после перезапуска нумерация продолжается
+    def last_number(self, symbol) -> int:
+        with self._lock:
+            row = self._db.execute('SELECT COALESCE(MAX(number), 0) FROM cycles WHERE symbol = ?', (symbol,)).fetchone()
+        return row[0]
+
+    # Сумма PnL циклов, закрытых начиная с since (time.time())
+    def pnl_since(self, since) -> float:
+        with self._lock:
+            row = self._db.execute('SELECT COALESCE(SUM(pnl), 0) FROM cycles WHERE state = \'closed\' AND finished >= ?', (since,)).fetchone()
+        return row[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
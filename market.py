@@ -0,0 +1,545 @@
+import os
+import time
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+from binance.client import Client
+from dotenv import load_dotenv
+
+import metrics
+from rate_limit import RateGovernor, install
+from transport import configure_session
+import signing
+from strategy import StraddleSettings, next_lot
+from symbols import SymbolCache, CACHE_DIR
+from cycle import CycleStats, new_cycle, mark_legs
+from order_book import OrderBookManager
+from prices import PriceService
+from account import AccountLedger
+from accounting import TradeBook, TRADES_DIR
+from journal import CycleJournal, STATE_DIR
+from risk import RiskGuard, RiskLimits, MIN_LOT
+from eventlog import EventLog, LOG_DIR
+from order_tracker import OrderTracker, UserDataStream, FINAL_STATUSES
+
+
+# Понятные сообщения об ошибках размещения
+ORDER_ERRORS = {
+    'Quantity less than or equal to zero.': 'Ошибка: Увеличьте LOT',
+    'Filter failure: NOTIONAL': 'Ошибка: Увеличьте LOT',
+    'Filter failure: MIN_NOTIONAL': 'Ошибка: Увеличьте LOT',
+    'Filter failure: MAX_NUM_ALGO_ORDERS': 'Превышено максимальное количество ордеров',
+    'Invalid callBack rate.': 'Выставлен неправильный callBack rate',
+    'The relationship of the prices for the orders is not correct.': 'Цена ушла, ордер выставляется по новой цене',
+}
+
+
+# TESTNET=true/1/yes - тестовая сеть
+def testnet_from_env() -> bool:
+    return (os.getenv('TESTNET') or '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Размещённая сторона цикла: ID входа (None, если входа нет, как у OCO), тейка и стопа;
+# orders - ответы биржи
+@dataclass
+class Placement:
+    side: str
+    entry_id: int
+    take_id: int
+    stop_id: int
+    orders: list = field(default_factory=list)
+
+    @property
+    def order_ids(self) -> list:
+        return [order_id for order_id in (self.entry_id, self.take_id, self.stop_id) if order_id is not None]
+
+
+# Общая логика стрэддла для любого рынка: клиент, кэш символов, потоки стаканов, цен и
+# пользовательских данных, учёт сделок, журнал циклов и сам цикл. Подкласс описывает только
+# вызовы клиента своего рынка (exchange_info ... submit_leg) и, при необходимости, cycle_pnl.
+class MarketAdapter(ABC):
+    name = None
+    futures = True
+    weight_limit = None
+    # Лимиты числа ордеров по окнам (rate_limit.FUTURES_ORDER_LIMITS / SPOT_ORDER_LIMITS)
+    order_limits = None
+    key_env = None
+    secret_env = None
+    combined_url = None
+    testnet_combined_url = None
+    stream_url = None
+    testnet_stream_url = None
+    final_statuses = FINAL_STATUSES
+    # Реализованный PnL приходит с биржи (фьючерсы), иначе считается по средней цене
+    exchange_realized = False
+    # Ошибки, после которых сторона размещается заново по свежей цене. Повторов не больше
+    # max_reprice и только в пределах reprice_budget секунд; пауза перед повтором растёт
+    # от reprice_backoff вдвое до reprice_backoff_max, чтобы поток цен успел обновиться
+    reprice_errors = ()
+    max_reprice = 5
+    reprice_budget = 1.0
+    reprice_backoff = 0.005
+    reprice_backoff_max = 0.1
+    # Отмена второй ноги после исполнения первой; None - биржа отменяет её сама (OCO)
+    cancel_sibling = None
+    # Цена по REST: метод клиента (одинаковый у Client и AsyncClient) и поле ответа
+    price_method = None
+    price_field = None
+
+    # account - accounts.Account (None - основной счёт с ключами key_env/secret_env),
+    # share - доля лимита веса IP, market_data - адаптер, с которым общие символы, стаканы и цены
+    def __init__(self, testnet=False, simulator=None, account=None, share=1.0, market_data=None):
+        load_dotenv()
+        self.account = account
+        self.api_key = account.api_key if account else os.getenv(self.key_env)
+        self.api_secret = account.api_secret if account else os.getenv(self.secret_env)
+        self.testnet = testnet
+        # Локальная биржа вместо Binance, например SIMULATOR=BTCUSDT=prices.csv
+        # или запись recorder.py: SIMULATOR=BTCUSDT=market_data/futures/BTCUSDT
+        self.simulator = simulator
+        self.exchange = None
+
+        if simulator:
+            from simulator import SimulatedExchange
+            self.exchange = SimulatedExchange.from_spec(simulator, futures=self.futures)
+            # SIMULATOR_SPEED - темп ленты по её времени (1 - реальное время), без него - максимально быстро
+            self.exchange.start(speed=float(os.getenv('SIMULATOR_SPEED') or 0) or None)
+            self.client = self.exchange.client
+        else:
+            self.client = Client(self.api_key, self.api_secret, testnet=testnet)
+
+        variant = self.name + ('_simulator' if simulator else '_testnet' if testnet else '')
+        account_variant = variant + ('_' + account.name if account else '')
+        # Журнал событий (logs/) создаётся первым: в него пишут и потоки, и часы, и кэш символов
+        self.log = EventLog(os.path.join(LOG_DIR, account_variant + '.jsonl'))
+
+        # Пул keep-alive соединений и гистограммы задержек по эндпоинтам
+        self.latency = configure_session(self.client)
+        # Общий ограничитель веса запросов для всех потоков, использующих client
+        self.governor = install(self.client, RateGovernor(self.weight_limit, share=share, order_limits=self.order_limits))
+        label = self.name + ('/' + account.name if account else '')
+        metrics.track_governor(label, self.governor)
+        # timestamp подписанных запросов по оценке времени сервера, HMAC с готовым ключом
+        self.clock = None
+        # Проверка циклов перед размещением; лимиты задаются в prepare() из конфигурации
+        self.risk = RiskGuard(label=label)
+        if not simulator:
+            self.clock = signing.ServerClock(self.server_time, log=self.log)
+            self.clock.start()
+            signing.install(self.client, self.clock, label)
+            metrics.track_clock(label, self.clock)
+
+        # Метаданные символов (quoteAsset, tickSize, stepSize, minNotional)
+        if market_data is not None:
+            self.symbols = market_data.symbols
+        else:
+            self.symbols = SymbolCache(self.exchange_info, os.path.join(CACHE_DIR, variant + '_symbols.json'), log=self.log)
+
+        # Локальные стаканы, последние цены и поток пользовательских данных
+        if simulator:
+            self.order_books = self.exchange.order_books
+            self.price_feed = self.exchange.price_feed
+            self.user_stream = self.exchange.user_stream
+        else:
+            combined_url = self.testnet_combined_url if testnet else self.combined_url
+            if market_data is not None:
+                self.order_books = market_data.order_books
+                self.price_feed = market_data.price_feed
+            else:
+                self.order_books = OrderBookManager(lambda symbol: self.order_book(symbol, 1000), combined_url, futures=self.futures, log=self.log)
+                self.price_feed = PriceService(combined_url, futures=self.futures, log=self.log)
+            self.user_stream = UserDataStream(self.get_listen_key, self.keepalive, self.testnet_stream_url if testnet else self.stream_url, log=self.log)
+
+        # Отслеживание тейков и стопов; ledger добавляется раньше tracker,
+        # чтобы исполнения были учтены до пробуждения main()
+        self.tracker = OrderTracker(cancel_order=self.cancel_sibling, get_order=self.get_order, final_statuses=self.final_statuses, log=self.log)
+        self.ledger = AccountLedger(self.load_balances)
+        self.user_stream.add_listener(self.ledger)
+        self.user_stream.add_listener(self.tracker)
+
+        # Учёт сделок (trades/) и журнал циклов (state/)
+        self.trades = TradeBook(os.path.join(TRADES_DIR, account_variant), self.symbols.quote_asset, exchange_realized=self.exchange_realized)
+        self.journal = CycleJournal(os.path.join(STATE_DIR, account_variant + '.db'))
+
+        # Остановка после текущего цикла (выставляется из управляющего API или окна Tk)
+        self.auto_stop = threading.Event()
+
+    # Вызовы клиента конкретного рынка
+
+    @abstractmethod
+    def exchange_info(self) -> dict:
+        raise NotImplementedError
+
+    @abstractmethod
+    def order_book(self, symbol, limit) -> dict:
+        raise NotImplementedError
+
+    # Время сервера (GET /time), мс
+    @abstractmethod
+    def server_time(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_balances(self) -> dict:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_listen_key(self) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def keepalive(self, listen_key) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_order(self, symbol, order_id) -> dict:
+        raise NotImplementedError
+
+    @abstractmethod
+    def check_fee(self, symbol) -> float:
+        raise NotImplementedError
+
+    # Исполнения ордера по REST (account.Fill): после перезапуска исполнений в памяти нет
+    @abstractmethod
+    def order_fills(self, symbol, order_id) -> list:
+        raise NotImplementedError
+
+    # Отмена всех ордеров стрэддла по символу
+    @abstractmethod
+    def close_orders(self, symbol) -> None:
+        raise NotImplementedError
+
+    # Закрытие по рынку открытых позиций символа после отмены его ордеров; на споте позиций нет
+    def flatten_positions(self, symbol) -> None:
+        pass
+
+    # Размещение одной стороны по цене price. Возвращает (Placement или None, ошибки (роль, код, текст)).
+    # При частичной ошибке размещённые ордера стороны отменяются здесь же
+    @abstractmethod
+    def submit_leg(self, side, lot, symbol, settings, price) -> tuple:
+        raise NotImplementedError
+
+    @abstractmethod
+    def cancel_placement(self, symbol, placement) -> None:
+        raise NotImplementedError
+
+    # Общая часть
+
+    def rest_price(self, symbol) -> float:
+        return float(getattr(self.client, self.price_method)(symbol=symbol)[self.price_field])
+
+    # Цена из потока, REST - только если котировка устарела
+    def get_current_price(self, symbol) -> float:
+        price = self.price_feed.price(symbol)
+        if price is not None:
+            return price
+        return self.rest_price(symbol)
+
+    # Спред из локального стакана, REST только пока стакан не синхронизирован
+    def get_spread(self, symbol) -> float:
+        spread = self.order_books.spread(symbol)
+        if spread is not None:
+            return spread
+        depth = self.order_book(symbol, 100)
+        return float(depth['asks'][0][0]) - float(depth['bids'][0][0])
+
+    # Баланс из памяти, обновляется событиями потока пользовательских данных
+    def get_balance(self, asset) -> float:
+        return self.ledger.balance(asset)
+
+    # Вывод понятной ошибки размещения
+    def order_error(self, symbol, side, role, code, message) -> None:
+        fields = {'symbol': symbol, 'side': side, 'role': role, 'code': code, 'error': message}
+        if message == 'Order would immediately trigger.':
+            self.log.event('order_error', side, "Увеличьте Take" if role == 'take' else "Увеличьте Stop", **fields)
+        elif message in ORDER_ERRORS:
+            self.log.event('order_error', side, ORDER_ERRORS[message], **fields)
+        else:
+            self.log.event('order_error', side, "Произошла ошибка при размещении ордера:", message, **fields)
+
+    # Свежая цена для повтора: котировка из памяти, округлённая к tickSize (REST - только если она устарела)
+    def reprice(self, symbol) -> float:
+        return self.symbols.round_price(symbol, self.get_current_price(symbol))
+
+    # Размещение одной стороны. Если цена ушла (reprice_errors), сторона размещается заново
+    # по свежей цене с растущей паузой; число и длительность повторов - в metrics
+    def place_order(self, side, lot, symbol, settings, price) -> Placement:
+        started = time.perf_counter()
+        delay = self.reprice_backoff
+        for attempt in range(self.max_reprice + 1):
+            placement, errors = self.submit_leg(side, lot, symbol, settings, price)
+            for role, code, message in errors:
+                metrics.api_error(symbol, code, message)
+                self.order_error(symbol, side, role, code, message)
+            if placement is not None:
+                if attempt:
+                    metrics.REPRICES.inc(symbol, 'placed')
+                    metrics.REPRICE_SECONDS.observe(time.perf_counter() - started, symbol)
+                return placement
+            if not any(text in (message or '') for _, _, message in errors for text in self.reprice_errors):
+                return None
+            if attempt == self.max_reprice or time.perf_counter() - started + delay > self.reprice_budget:
+                metrics.REPRICES.inc(symbol, 'failed')
+                self.log.event('reprice_failed', symbol=symbol, side=side, price=price, attempts=attempt + 1, seconds=time.perf_counter() - started)
+                return None
+            time.sleep(delay)
+            delay = min(delay * 2, self.reprice_backoff_max)
+            price = self.reprice(symbol)
+            metrics.REPRICES.inc(symbol, 'retry')
+            self.log.event('order_repriced', symbol=symbol, side=side, price=price, attempt=attempt + 1)
+
+    # Исключение при размещении стороны (сеть, ошибка отката) - такая же неудача, как ошибка биржи:
+    # цикл откатывается, а размещённая вторая сторона отменяется
+    def placement_error(self, symbol, side, ex) -> None:
+        self.log.event('order_error', side, "Произошла ошибка при размещении ордера:", ex, symbol=symbol, side=side, error=repr(ex))
+
+    # Обе стороны размещаются параллельно; результат - [LONG, SHORT], None на месте неудачной стороны
+    def place_both(self, lot, symbol, settings, price) -> list:
+        placements = {}
+
+        def place(side):
+            try:
+                placements[side] = self.place_order(side, lot, symbol, settings, price)
+            except Exception as ex:
+                self.placement_error(symbol, side, ex)
+
+        threads = [threading.Thread(target=place, args=(side,)) for side in ('LONG', 'SHORT')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return [placements.get('LONG'), placements.get('SHORT')]
+
+    # Откат цикла: отмена ордеров, которые успели разместиться
+    def rollback_orders(self, symbol, placements) -> None:
+        for placement in placements:
+            if placement is not None:
+                self.cancel_placement(symbol, placement)
+
+    # PnL цикла: по исполнениям (реализованный результат минус комиссии),
+    # по разнице балансов - только если исполнения не пришли
+    def cycle_pnl(self, symbol, placements, legs, fills, totals, start_price, balance_change) -> float:
+        return totals.net if fills else balance_change
+
+    # LOT цикла после проверки RiskGuard; None - цикл не начинается
+    def risk_check(self, symbol, lot, settings) -> float:
+        allowed, reason = self.risk.check(symbol, lot, settings.initial_lot)
+        if allowed is None:
+            self.log.event('risk_rejected', 'Цикл не начат, ограничение риска:', reason, symbol=symbol, lot=lot, reason=reason)
+        elif reason is not None:
+            self.log.event('risk_shrunk', 'LOT уменьшен до', allowed, 'ограничение риска:', reason, symbol=symbol, lot=lot, allowed=allowed, reason=reason)
+        return allowed
+
+    # Цикл с проверкой риска: LOT проверяется и резервируется до размещения, освобождается
+    # после закрытия (close_cycle) или отката. Возвращает (record, legs) или None, если цикл не начат или откатан
+    def run_cycle(self, number, symbol, lot, settings) -> tuple:
+        lot = self.risk_check(symbol, lot, settings)
+        if lot is None:
+            return None
+        try:
+            result = self.trade_cycle(number, symbol, lot, settings)
+        except Exception:
+            self.risk.release(symbol, lot)
+            raise
+        if result is None:
+            self.risk.release(symbol, lot)
+        return result
+
+    # Один цикл: цена входа, обе стороны, ожидание тейков/стопов и PnL.
+    # Возвращает (record, legs) или None, если цикл откатан из-за ошибки размещения.
+    # Шаги open_cycle, commit_placements, track_legs и close_cycle общие с engine.StraddleEngine
+    def trade_cycle(self, number, symbol, lot, settings) -> tuple:
+        record = new_cycle(number, symbol, lot)
+        self.open_cycle(record, self.get_current_price(symbol))
+
+        # Открытие позиций
+        placements = self.place_both(lot, symbol, settings, record.start_price)
+        record.placed = time.perf_counter()
+        if not self.commit_placements(record, placements):
+            return None
+
+        # Ожидание исполнения тейка или стопа каждой стороны
+        legs = self.track_legs(symbol, placements)
+        self.tracker.wait(legs)
+        self.close_cycle(record, placements, legs)
+        return record, legs
+
+    # Начало цикла: баланс, цена входа по tickSize и запись в журнал до размещения
+    def open_cycle(self, record, price) -> None:
+        symbol = record.symbol
+        record.market = self.name
+        record.account = self.account.name if self.account else 'main'
+        record.start_balance = self.get_balance(self.symbols.quote_asset(symbol))
+        record.start_price = self.symbols.round_price(symbol, price)
+        record.priced = time.perf_counter()
+        record.cycle_id = self.journal.open_cycle(symbol, record.number, record.lot, record.start_price)
+        self.log.set_cycle(symbol, record.cycle_id)
+        self.log.event('cycle_started', symbol=symbol, number=record.number, lot=record.lot, price=record.start_price)
+
+    # Итог размещения обеих сторон: при ошибке размещённые ордера отменяются и цикл
+    # закрывается как rolled_back (False), иначе ID ордеров записываются в журнал
+    def commit_placements(self, record, placements) -> bool:
+        symbol = record.symbol
+        if None not in placements:
+            self.journal_legs(record.cycle_id, placements)
+            return True
+        self.log.event('cycle_rolled_back', 'Ошибка при размещении ордера', symbol=symbol,
+                       order_ids=[order_id for placement in placements if placement for order_id in placement.order_ids])
+        self.rollback_orders(symbol, placements)
+        self.journal.close_cycle(record.cycle_id, state='rolled_back')
+        self.log.set_cycle(symbol, None)
+        return False
+
+    def track_legs(self, symbol, placements) -> list:
+        return [self.tracker.track(symbol, placement.side, placement.take_id, placement.stop_id) for placement in placements]
+
+    # Закрытие цикла после ожидания ног и отмены вторых ног: PnL по исполнениям,
+    # журнал, RiskGuard (объём, PnL за сутки, глубина мартингейла) и события
+    def close_cycle(self, record, placements, legs) -> None:
+        symbol = record.symbol
+        mark_legs(record, legs)
+        order_ids = [order_id for placement in placements for order_id in placement.order_ids]
+        fills = self.ledger.take_fills(symbol, order_ids)
+        totals = self.trades.add_fills(fills, record.number)
+        balance = self.get_balance(self.symbols.quote_asset(symbol))
+        balance_change = balance - record.start_balance
+        record.pnl = self.cycle_pnl(symbol, placements, legs, fills, totals, record.start_price, balance_change)
+        self.journal.close_cycle(record.cycle_id, record.pnl)
+        self.risk.closed(symbol, record.lot, record.pnl, self.lost_both(record, legs))
+        self.log.event('cycle_closed', 'Ордера закрыты PNL:', record.pnl, *(f"{leg.side}:{'тейк' if leg.result else 'стоп'}" for leg in legs),
+                       symbol=symbol, order_ids=order_ids, pnl=record.pnl, fees=totals.fees, balance_pnl=balance_change, long=record.long, short=record.short)
+        self.log.set_cycle(symbol, None)
+        self.log.event('balance', 'Текущий баланс', round(balance, 2), symbol=symbol, balance=balance)
+        spread = self.get_spread(symbol)
+        self.log.event('spread', 'Spread', spread, symbol=symbol, spread=spread)
+
+    # ID ордеров обеих сторон - в журнал одной транзакцией
+    def journal_legs(self, cycle_id, placements) -> None:
+        self.journal.add_legs(cycle_id, [(placement.side, placement.entry_id, placement.take_id, placement.stop_id) for placement in placements])
+
+    # Обе стороны цикла закрылись по стопу
+    @staticmethod
+    def lost_both(record, legs) -> bool:
+        return not record.long and not record.short and all(leg.stop_status == 'FILLED' for leg in legs)
+
+    # Мартингейл по итогам цикла: после двух стопов лот растёт
+    @classmethod
+    def next_lot(cls, lot, settings, record, legs) -> float:
+        return next_lot(lot, settings.initial_lot, settings.martingale, settings.lot_increment, cls.lost_both(record, legs))
+
+    # Циклы стрэддла идут в цикле while, а не рекурсией, поэтому стек и память не растут
+    # при долгой работе. Возвращает stats после остановки (auto_stop) или ошибки размещения
+    def main(self, settings, symbol, stats=None) -> CycleStats:
+        stats = stats or CycleStats()
+        lot = settings.initial_lot
+        number = self.journal.last_number(symbol)
+        while True:
+            number += 1
+            result = self.run_cycle(number, symbol, lot, settings)
+            if result is None:
+                return stats
+            record, legs = result
+            stats.add(record)
+            stats.report(record, self.log)
+            lot = self.next_lot(lot, settings, record, legs)
+
+            # Повторная торговля
+            if self.auto_stop.is_set():
+                return stats
+
+    # Продолжение циклов, прерванных остановкой процесса: ноги из журнала снова отслеживаются,
+    # состояние сверяется через REST по ID ордеров, без отмены всех ордеров и опроса всего аккаунта
+    def resume_cycles(self, symbol) -> None:
+        for cycle in self.journal.open_cycles(symbol):
+            if not cycle.legs:
+                # Процесс остановился во время размещения: ID ордеров неизвестны, поэтому снимаются
+                # все ордера символа, а исполнившиеся входы закрываются по позиции
+                self.log.event('cycle_rolled_back', 'Цикл', cycle.number, 'прерван при размещении, ордера', symbol, 'отменяются', symbol=symbol, cycle=cycle.id)
+                self.close_orders(symbol)
+                self.flatten_positions(symbol)
+                self.journal.close_cycle(cycle.id, state='rolled_back')
+                continue
+            order_ids = [order_id for leg in cycle.legs for order_id in leg[1:] if order_id is not None]
+            self.log.set_cycle(symbol, cycle.id)
+            self.log.event('cycle_resumed', 'Продолжение цикла', cycle.number, symbol, symbol=symbol, order_ids=order_ids)
+            legs = [self.tracker.track(symbol, side, take_id, stop_id) for side, entry_id, take_id, stop_id in cycle.legs]
+            self.tracker.reconcile()
+            self.tracker.wait(legs)
+            pnl = self.trades.add_fills(self.resumed_fills(symbol, order_ids), cycle.number).net
+            self.journal.close_cycle(cycle.id, pnl)
+            self.log.event('cycle_closed', symbol=symbol, pnl=pnl)
+            self.log.set_cycle(symbol, None)
+
+    # Исполнения ордеров продолжаемого цикла: часть или все пришли до перезапуска, поэтому
+    # они берутся через REST; события в памяти только убираются, чтобы не посчитать их дважды.
+    # Если REST недоступен - то, что есть в памяти
+    def resumed_fills(self, symbol, order_ids) -> list:
+        streamed = self.ledger.take_fills(symbol, order_ids)
+        try:
+            return [fill for order_id in order_ids for fill in self.order_fills(symbol, order_id)]
+        except Exception as ex:
+            self.log.event('fills_error', 'Ошибка загрузки исполнений цикла:', ex, symbol=symbol, order_ids=order_ids, error=str(ex))
+            return streamed
+
+    # Подготовка к торговле символом config.symbol: потоки, продолжение прерванных циклов и
+    # параметры стрэддла. Начальный LOT - процент от баланса счёта, но не меньше MIN_LOT.
+    # Лимиты риска - из config, PnL за сутки - из журнала. Возвращает (settings, start_balance)
+    def prepare(self, config) -> tuple:
+        symbol = config.symbol
+        self.user_stream.start()
+        self.order_books.add_symbol(symbol)
+        self.price_feed.add_symbol(symbol)
+        self.resume_cycles(symbol)
+        self.prepare_risk(RiskLimits.from_config(config))
+
+        start_balance = self.get_balance(self.symbols.quote_asset(symbol))
+        initial_lot = max(MIN_LOT, config.lot_percent / 100 * start_balance)
+        spread = self.get_spread(symbol)
+        self.log.event('balance', 'Текущий баланс', start_balance, symbol=symbol, balance=start_balance)
+        self.log.event('spread', 'Spread', spread, symbol=symbol, spread=spread)
+        self.log.event('trading_started', 'Текущий LOT $:', initial_lot, symbol=symbol, lot=initial_lot)
+        settings = StraddleSettings(initial_lot, config.take, config.loss, config.trailing_stop, config.trailing_limit, config.trail_distance_percent, config.martingale, config.lot_increment)
+        return settings, start_balance
+
+    # Лимиты RiskGuard и PnL закрытых сегодня циклов из журнала: после перезапуска
+    # daily_loss_limit учитывает и циклы до него. Вызывается после resume_cycles
+    def prepare_risk(self, limits) -> None:
+        self.risk.limits = limits
+        self.risk.seed(self.journal.pnl_since(self.risk.day_start()))
+
+    # Комиссия биржи подходит для запуска (в тестовой сети не проверяется).
+    # Ответ кэшируется в RiskGuard для проверки max_fee перед циклами
+    def fee_allowed(self, config) -> bool:
+        return self.symbol_fee_allowed(config.symbol, config.fee)
+
+    def symbol_fee_allowed(self, symbol, min_fee) -> bool:
+        if self.testnet:
+            return True
+        fee = self.check_fee(symbol)
+        self.risk.set_fee(symbol, fee)
+        if fee >= min_fee:
+            return True
+        self.log.event('fee_exceeded', 'Коммиссия превышена', symbol=symbol, fee=min_fee)
+        return False
+
+    # Итоги торговли и запись журнала сделок на диск
+    def finish(self, symbol, start_balance, stats) -> None:
+        profit = self.get_balance(self.symbols.quote_asset(symbol)) - start_balance
+        self.log.event('trading_stopped', 'Общий профит: ', profit, symbol=symbol, profit=profit, pnl=stats.pnl, net=self.trades.session.net, fees=self.trades.session.fees)
+        self.log.event('profit', 'Общий профит %: ', profit / start_balance * 100, symbol=symbol)
+        self.log.event('profit', 'PNL циклов:', stats.pnl, symbol=symbol)
+        self.log.event('profit', 'Профит по сделкам:', self.trades.session.net, 'комиссии:', self.trades.session.fees, symbol=symbol)
+        self.trades.flush()
+
+    # Запуск торговли с параметрами config (config.TradingConfig).
+    # Параметры читаются до запуска, поэтому поток торговли не обращается к виджетам Tk
+    def start_trading(self, config, stats=None) -> None:
+        try:
+            settings, start_balance = self.prepare(config)
+            stats = stats or CycleStats()
+            if self.fee_allowed(config):
+                self.main(settings, config.symbol, stats)
+            self.finish(config.symbol, start_balance, stats)
+        except Exception as ex:
+            self.log.event('trading_error', 'Ошибка при старте трейдинга:', ex, symbol=config.symbol, error=repr(ex))
@@ -0,0 +1,214 @@
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from transport import LATENCY_BUCKETS
+
+
+# Корзины времени до исполнения тейка/стопа и длительности цикла, секунды
+FILL_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ''
+    pairs = ','.join('%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+# Метрика с метками. Значения хранятся по кортежу значений меток;
+# обновление - поиск в словаре и сложение под коротким замком
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            lines.append(f'{self.name}{_labels(self.labels, key)} {value}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1.0) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+
+# Gauge; function - значение вычисляется при чтении /metrics (без затрат в торговом потоке)
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, help, labels=()):
+        super().__init__(name, help, labels)
+        self.functions = {}
+
+    def set(self, value, *labels) -> None:
+        self.values[labels] = value
+
+    def set_function(self, function, *labels) -> None:
+        self.functions[labels] = function
+
+    def render(self) -> list:
+        for labels, function in list(self.functions.items()):
+            try:
+                self.values[labels] = function()
+            except Exception:
+                pass
+        return super().render()
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels) -> None:
+        with self._lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bisect.bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self.values.items())
+        names = self.labels + ('le',)
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{_labels(names, key + (bound,))} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labels, key)} {total}')
+            lines.append(f'{self.name}_count{_labels(self.labels, key)} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines += metric.render()
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+PLACEMENT_SECONDS = registry.add(Histogram('straddle_order_placement_seconds', 'Размещение обеих сторон цикла', ('market', 'account', 'symbol')))
+FILL_SECONDS = registry.add(Histogram('straddle_fill_seconds', 'От размещения до закрытия последней стороны', ('market', 'account', 'symbol'), FILL_BUCKETS))
+CANCEL_SECONDS = registry.add(Histogram('straddle_cancel_seconds', 'От исполнения ноги до отмены второй', ('market', 'account', 'symbol')))
+CYCLE_SECONDS = registry.add(Histogram('straddle_cycle_seconds', 'Длительность цикла', ('market', 'account', 'symbol'), FILL_BUCKETS))
+CYCLES = registry.add(Counter('straddle_cycles_total', 'Завершённые циклы по результату (take/stop каждой стороны)', ('market', 'account', 'symbol', 'long', 'short')))
+CYCLE_PNL = registry.add(Gauge('straddle_cycle_pnl', 'PnL последнего цикла', ('market', 'account', 'symbol')))
+SESSION_PNL = registry.add(Gauge('straddle_session_pnl', 'Сумма PnL циклов с запуска', ('market', 'account', 'symbol')))
+LOT = registry.add(Gauge('straddle_lot', 'Текущий LOT (мартингейл)', ('market', 'account', 'symbol')))
+REPRICES = registry.add(Counter('straddle_reprices_total', 'Перевыставления стороны по свежей цене: local - до отправки по котировке, retry - повтор после отказа, placed/failed - итог повторов', ('symbol', 'outcome')))
+REPRICE_SECONDS = registry.add(Histogram('straddle_reprice_seconds', 'От первой попытки до размещения стороны после повторов', ('symbol',)))
+API_ERRORS = registry.add(Counter('straddle_api_errors_total', 'Ошибки API по коду и причине', ('symbol', 'code', 'reason')))
+REQUEST_WEIGHT = registry.add(Gauge('straddle_request_weight_used', 'X-MBX-USED-WEIGHT-1M из последнего ответа', ('market',)))
+REQUEST_WEIGHT_LIMIT = registry.add(Gauge('straddle_request_weight_limit', 'Минутный лимит веса запросов', ('market',)))
+REQUESTS_DELAYED = registry.add(Gauge('straddle_requests_delayed', 'Запросы, задержанные ограничителем веса', ('market',)))
+CLOCK_OFFSET = registry.add(Gauge('straddle_clock_offset_ms', 'Оценка смещения времени сервера от локальных часов, мс', ('market',)))
+CLOCK_DRIFT = registry.add(Gauge('straddle_clock_drift_ms_per_second', 'Дрейф смещения времени сервера, мс в секунду', ('market',)))
+RISK_REJECTIONS = registry.add(Counter('straddle_risk_rejections_total', 'Проверка перед размещением: blocked - цикл не начат, shrunk - LOT уменьшен', ('market', 'symbol', 'reason', 'action')))
+TIMESTAMP_REJECTS = registry.add(Counter('straddle_timestamp_rejects_total', 'Отказы -1021 (timestamp вне recvWindow)', ('market',)))
+
+# Известные сообщения биржи -> короткая причина (метка с ограниченным числом значений)
+ERROR_REASONS = {
+    'Filter failure: MAX_NUM_ALGO_ORDERS': 'MAX_NUM_ALGO_ORDERS',
+    'Filter failure: NOTIONAL': 'NOTIONAL',
+    'Filter failure: MIN_NOTIONAL': 'NOTIONAL',
+    'Order would immediately trigger.': 'WOULD_IMMEDIATELY_TRIGGER',
+    'Quantity less than or equal to zero.': 'ZERO_QUANTITY',
+    'Invalid callBack rate.': 'INVALID_CALLBACK_RATE',
+    'The relationship of the prices for the orders is not correct.': 'PRICE_RELATIONSHIP',
+}
+
+
+def api_error(symbol, code, message) -> None:
+    API_ERRORS.inc(symbol, code, ERROR_REASONS.get(message, 'OTHER'))
+
+
+# PnL с запуска по (market, account, symbol): один символ торгуют несколько счетов и рынков
+_session_pnl = {}
+_session_lock = threading.Lock()
+
+
+# Замеры завершённого цикла (cycle.CycleRecord); вызывается из CycleStats.add
+def observe_cycle(record) -> None:
+    labels = (record.market, record.account, record.symbol)
+    if record.placement_latency is not None:
+        PLACEMENT_SECONDS.observe(record.placement_latency, *labels)
+    if record.time_to_fill is not None:
+        FILL_SECONDS.observe(record.time_to_fill, *labels)
+    if record.cancel_latency is not None:
+        CANCEL_SECONDS.observe(record.cancel_latency, *labels)
+    if record.duration is not None:
+        CYCLE_SECONDS.observe(record.duration, *labels)
+    CYCLES.inc(*labels, 'take' if record.long else 'stop', 'take' if record.short else 'stop')
+    CYCLE_PNL.set(record.pnl, *labels)
+    with _session_lock:
+        _session_pnl[labels] = _session_pnl.get(labels, 0.0) + record.pnl
+        SESSION_PNL.set(_session_pnl[labels], *labels)
+    LOT.set(record.lot, *labels)
+
+
+# Вес запросов из ограничителя rate_limit.RateGovernor (читается при запросе /metrics)
+def track_governor(market, governor) -> None:
+    REQUEST_WEIGHT.set_function(lambda: governor.used_weight, market)
+    REQUEST_WEIGHT_LIMIT.set(governor.limit, market)
+    REQUESTS_DELAYED.set_function(lambda: governor.delayed, market)
+
+
+# Модель времени сервера signing.ServerClock
+def track_clock(market, clock) -> None:
+    CLOCK_OFFSET.set_function(lambda: clock.offset_at(time.time()), market)
+    CLOCK_DRIFT.set_function(lambda: clock.drift, market)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        data = registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+# Отдельный endpoint /metrics (для engine.py); в bot.py /metrics отдаёт управляющий API
+def serve(host='127.0.0.1', port=9108) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,180 @@
+import os
+import csv
+import math
+import random
+import argparse
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from strategy import StraddleSettings
+from backtest import PriceSeries, load_prices, run_backtest
+
+
+# Перебираемые параметры формы Tk
+PARAMETERS = ('take', 'loss', 'trail_distance_percent', 'trailing_limit', 'lot_increment')
+
+# Ряд цен в процессе-исполнителе (memmap, без копирования между процессами)
+_series = None
+_options = None
+
+
+# Сохранение массивов ряда в .npy для открытия через memmap в исполнителях
+def share_series(series, directory) -> dict:
+    paths = {}
+    for name in ('times', 'high', 'low', 'close'):
+        paths[name] = os.path.join(directory, name + '.npy')
+        np.save(paths[name], getattr(series, name))
+    return paths
+
+
+def _init_worker(paths, options) -> None:
+    global _series, _options
+    _series = PriceSeries(*(np.load(paths[name], mmap_mode='r') for name in ('times', 'high', 'low', 'close')))
+    _options = options
+
+
+# Вероятность хотя бы одной серии из k подряд проигрышных циклов за n циклов (пуассоновское приближение)
+def ruin_probability(loss_rate, k, n) -> float:
+    if k is None or n < k or loss_rate <= 0:
+        return 0.0
+    if loss_rate >= 1:
+        return 1.0
+    return 1 - math.exp(-(n - k + 1) * (1 - loss_rate) * loss_rate ** k)
+
+
+# Длина серии циклов подряд с двумя стопами, на которой заканчивается баланс при умножении
+# лота на increment (баланс выдерживает на одну меньше); None - не заканчивается за limit циклов
+def affordable_losses(first_loss, increment, balance, limit=200) -> int:
+    if first_loss <= 0:
+        return None
+    total = 0.0
+    loss = first_loss
+    for k in range(limit):
+        total += loss
+        if total > balance:
+            return k + 1
+        loss *= increment
+    return None
+
+
+def evaluate(params) -> dict:
+    settings = StraddleSettings(
+        _options['lot'], params['take'], params['loss'],
+        trailing_stop=_options['trailing_stop'],
+        trailing_limit=params.get('trailing_limit', 0.0),
+        trail_distance_percent=params.get('trail_distance_percent', 0.0),
+        martingale=_options['martingale'],
+        lot_increment=params.get('lot_increment', 1.0),
+    )
+    result = run_backtest(_series, settings, balance=_options['balance'], tick=_options['tick'], step=_options['step'])
+    row = dict(params)
+    row.update(result.summary())
+
+    lost_both = ~(result.long_win | result.short_win)
+    loss_rate = float(lost_both.mean()) if result.cycles else 0.0
+    first_losses = (result.fees - result.pnl)[lost_both & (result.lot == settings.initial_lot)]
+    first_loss = float(first_losses.mean()) if first_losses.size else 0.0
+    k = affordable_losses(first_loss, settings.lot_increment if settings.martingale else 1.0, _options['balance'])
+    row['ruin_probability'] = 1.0 if result.ruined else ruin_probability(loss_rate, k, result.cycles)
+    return row
+
+
+# Разбор диапазона: "20:200:20" (start:stop:step, stop включительно) или "10,20,50"
+def parse_range(text) -> list:
+    if ':' in text:
+        start, stop, step = (float(value) for value in text.split(':'))
+        return list(np.round(np.arange(start, stop + step / 2, step), 10))
+    return [float(value) for value in text.split(',')]
+
+
+def grid(space) -> list:
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_sample(space, count, seed=None) -> list:
+    rng = random.Random(seed)
+    return [{name: rng.uniform(min(values), max(values)) for name, values in space.items()} for _ in range(count)]
+
+
+# Уточнение вокруг лучших результатов: новые точки в окрестности top лучших по net_pnl.
+# Без результатов (например, --samples 1 в режиме refine) уточнять не вокруг чего - точек нет
+def refine(space, rows, count, top=10, scale=0.1, seed=None) -> list:
+    if not rows:
+        return []
+    rng = random.Random(seed)
+    best = sorted(rows, key=lambda row: row['net_pnl'], reverse=True)[:top]
+    points = []
+    for index in range(count):
+        center = best[index % len(best)]
+        point = {}
+        for name, values in space.items():
+            low, high = min(values), max(values)
+            point[name] = min(max(rng.gauss(center[name], (high - low) * scale), low), high)
+        points.append(point)
+    return points
+
+
+def run_sweep(series, points, options, workers=None) -> list:
+    with tempfile.TemporaryDirectory() as directory:
+        paths = share_series(series, directory)
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(paths, options)) as pool:
+            chunksize = max(1, len(points) // ((workers or os.cpu_count()) * 4))
+            return list(pool.map(evaluate, points, chunksize=chunksize))
+
+
+def write_results(rows, path) -> None:
+    if not rows:
+        return
+    rows = sorted(rows, key=lambda row: (row['ruin_probability'] > 0.5, -row['net_pnl']))
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Перебор параметров стрэддла на исторических данных')
+    parser.add_argument('path', help='CSV (data.binance.vision), Parquet или .npz')
+    parser.add_argument('--lot', type=float, required=True)
+    parser.add_argument('--take', required=True, help='Диапазон, например 20:200:20')
+    parser.add_argument('--loss', required=True)
+    parser.add_argument('--trail-distance', default=None)
+    parser.add_argument('--trailing-limit', default=None)
+    parser.add_argument('--lot-increment', default=None)
+    parser.add_argument('--trailing-stop', action='store_true')
+    parser.add_argument('--martingale', action='store_true')
+    parser.add_argument('--balance', type=float, default=1000.0)
+    parser.add_argument('--tick', type=float, default=0.0)
+    parser.add_argument('--step', type=float, default=0.0)
+    parser.add_argument('--mode', choices=('grid', 'random', 'refine'), default='grid')
+    parser.add_argument('--samples', type=int, default=1000, help='Точек для random/refine')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default='sweep_results.csv')
+    args = parser.parse_args()
+
+    space = {'take': parse_range(args.take), 'loss': parse_range(args.loss)}
+    for name, value in (('trail_distance_percent', args.trail_distance), ('trailing_limit', args.trailing_limit), ('lot_increment', args.lot_increment)):
+        if value is not None:
+            space[name] = parse_range(value)
+    options = {'lot': args.lot, 'trailing_stop': args.trailing_stop, 'martingale': args.martingale, 'balance': args.balance, 'tick': args.tick, 'step': args.step}
+
+    series = load_prices(args.path)
+    if args.mode == 'grid':
+        rows = run_sweep(series, grid(space), options, args.workers)
+    elif args.mode == 'random':
+        rows = run_sweep(series, random_sample(space, args.samples, args.seed), options, args.workers)
+    else:
+        # Половина бюджета - случайный поиск, половина - уточнение вокруг лучших
+        rows = run_sweep(series, random_sample(space, args.samples // 2, args.seed), options, args.workers)
+        rows += run_sweep(series, refine(space, rows, args.samples - args.samples // 2, seed=args.seed), options, args.workers)
+
+    if rows:
+        write_results(rows, args.output)
+        print('Комбинаций:', len(rows), 'результаты в', args.output)
+    else:
+        print('Нет комбинаций для перебора')
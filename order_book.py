@@ -0,0 +1,225 @@
+import json
+import bisect
+import threading
+
+from streams import WebsocketStream
+from eventlog import log_event
+
+
+# Одна сторона стакана: словарь цена -> объём и отсортированный список цен.
+# Лучшая цена читается за O(1), вставка и удаление уровня - за O(log n) поиск.
+class BookSide:
+    def __init__(self, descending):
+        self.descending = descending
+        self.levels = {}
+        self._prices = []
+
+    def _key(self, price) -> float:
+        return -price if self.descending else price
+
+    def clear(self) -> None:
+        self.levels.clear()
+        self._prices.clear()
+
+    def set(self, price, qty) -> None:
+        if qty == 0:
+            if self.levels.pop(price, None) is not None:
+                index = bisect.bisect_left(self._prices, self._key(price))
+                del self._prices[index]
+        else:
+            if price not in self.levels:
+                bisect.insort(self._prices, self._key(price))
+            self.levels[price] = qty
+
+    def best(self) -> float:
+        if not self._prices:
+            return None
+        return self._key(self._prices[0])
+
+    def qty(self, price) -> float:
+        return self.levels.get(price, 0.0)
+
+    # Суммарный объём от лучшей цены до price включительно
+    def depth_to(self, price) -> float:
+        index = bisect.bisect_right(self._prices, self._key(price))
+        return sum(self.levels[self._key(key)] for key in self._prices[:index])
+
+
+# Локальная копия стакана: REST-снимок плюс поток изменений depthUpdate.
+# Правила последовательности update ID отличаются у фьючерсов (pu) и спота (U == u + 1).
+class LocalOrderBook:
+    def __init__(self, symbol, futures=True):
+        self.symbol = symbol
+        self.futures = futures
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.last_update_id = None
+        self.synced = False
+        self.event_time = 0
+
+    def apply_snapshot(self, snapshot) -> None:
+        self.bids.clear()
+        self.asks.clear()
+        for price, qty in snapshot['bids']:
+            self.bids.set(float(price), float(qty))
+        for price, qty in snapshot['asks']:
+            self.asks.set(float(price), float(qty))
+        self.last_update_id = snapshot['lastUpdateId']
+        self.synced = False
+
+    # Возвращает False при разрыве последовательности: нужен новый снимок
+    def apply_diff(self, event) -> bool:
+        if self.last_update_id is None:
+            return False
+        first_id, last_id = event['U'], event['u']
+
+        if not self.synced:
+            # Первое событие после снимка должно перекрывать lastUpdateId
+            if self.futures:
+                if last_id < self.last_update_id:
+                    return True
+                if first_id > self.last_update_id:
+                    return False
+            else:
+                if last_id <= self.last_update_id:
+                    return True
+                if first_id > self.last_update_id + 1:
+                    return False
+        elif self.futures and event['pu'] != self.last_update_id:
+            return False
+        elif not self.futures and first_id != self.last_update_id + 1:
+            return False
+
+        for price, qty in event['b']:
+            self.bids.set(float(price), float(qty))
+        for price, qty in event['a']:
+            self.asks.set(float(price), float(qty))
+        self.last_update_id = last_id
+        self.event_time = event.get('E', self.event_time)
+        self.synced = True
+        return True
+
+    def best_bid(self) -> float:
+        return self.bids.best()
+
+    def best_ask(self) -> float:
+        return self.asks.best()
+
+    def spread(self) -> float:
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return ask - bid
+
+    def depth_at(self, side, price) -> float:
+        return (self.bids if side == 'BUY' else self.asks).qty(price)
+
+
+# Воспроизведение записанного файла (JSON lines: снимок с lastUpdateId, затем события depthUpdate)
+def replay_file(book, path) -> int:
+    gaps = 0
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'lastUpdateId' in record:
+                book.apply_snapshot(record)
+            elif not book.apply_diff(record):
+                gaps += 1
+    return gaps
+
+
+# Стаканы нескольких символов на одном комбинированном потоке depth.
+# При разрыве последовательности стакан символа пересобирается по новому снимку,
+# а события, пришедшие во время загрузки снимка, накапливаются и применяются после.
+class OrderBookManager:
+    def __init__(self, load_snapshot, base_url, futures=True, speed='100ms', log=None):
+        self.load_snapshot = load_snapshot
+        self.log = log
+        self.base_url = base_url
+        self.futures = futures
+        self.speed = speed
+        self.books = {}
+
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self._stream = WebsocketStream(self._url, self._on_message, on_connect=self._on_connect, on_disconnect=self._on_disconnect, log=log)
+
+    def _url(self) -> str:
+        streams = '/'.join(f'{symbol.lower()}@depth@{self.speed}' for symbol in self.books)
+        return self.base_url + streams
+
+    def add_symbol(self, symbol) -> LocalOrderBook:
+        with self._lock:
+            if symbol in self.books:
+                return self.books[symbol]
+            book = self.books[symbol] = LocalOrderBook(symbol, self.futures)
+        if self._stream.connected:
+            self._stream.reconnect()
+        else:
+            self._stream.start()
+        return book
+
+    def stop(self) -> None:
+        self._stream.stop()
+
+    def _on_connect(self) -> None:
+        for symbol in list(self.books):
+            self._resync(symbol)
+
+    def _on_disconnect(self) -> None:
+        for book in self.books.values():
+            book.synced = False
+            book.last_update_id = None
+
+    def _on_message(self, msg) -> None:
+        event = msg.get('data', msg)
+        if event.get('e') != 'depthUpdate':
+            return
+        symbol = event['s']
+        with self._lock:
+            book = self.books.get(symbol)
+            if book is None:
+                return
+            buffer = self._buffers.get(symbol)
+            if buffer is not None:
+                buffer.append(event)
+                return
+            if not book.apply_diff(event):
+                self._buffers[symbol] = [event]
+                threading.Thread(target=self._load, args=(symbol,), daemon=True).start()
+
+    def _resync(self, symbol) -> None:
+        with self._lock:
+            if symbol in self._buffers:
+                return
+            self._buffers[symbol] = []
+        threading.Thread(target=self._load, args=(symbol,), daemon=True).start()
+
+    def _load(self, symbol) -> None:
+        try:
+            snapshot = self.load_snapshot(symbol)
+        except Exception as ex:
+            log_event(self.log, 'book_error', 'Ошибка загрузки стакана', symbol, ex, symbol=symbol, error=repr(ex))
+            with self._lock:
+                self._buffers.pop(symbol, None)
+                self.books[symbol].last_update_id = None
+            return
+        with self._lock:
+            book = self.books[symbol]
+            book.apply_snapshot(snapshot)
+            for event in self._buffers.pop(symbol, []):
+                if not book.apply_diff(event):
+                    log_event(self.log, 'book_gap', 'Разрыв в потоке стакана', symbol, symbol=symbol)
+                    break
+
+    def book(self, symbol) -> LocalOrderBook:
+        book = self.books.get(symbol)
+        if book is None or not book.synced:
+            return None
+        return book
+
+    def spread(self, symbol) -> float:
+        book = self.book(symbol)
+        return book.spread() if book else None
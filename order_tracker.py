@@ -0,0 +1,280 @@
+import time
+import threading
+from dataclasses import dataclass, field
+
+from streams import WebsocketStream
+from eventlog import log_event
+
+
+FUTURES_STREAM_URL = 'wss://fstream.binance.com/ws/'
+FUTURES_TESTNET_STREAM_URL = 'wss://stream.binancefuture.com/ws/'
+SPOT_STREAM_URL = 'wss://stream.binance.com:9443/ws/'
+SPOT_TESTNET_STREAM_URL = 'wss://testnet.binance.vision/ws/'
+
+FINAL_STATUSES = ('FILLED', 'CANCELED')
+
+# Статусы, при которых ордера на бирже уже нет и отменять нечего
+INACTIVE_STATUSES = ('FILLED', 'CANCELED', 'EXPIRED', 'REJECTED')
+
+# Код ошибки отмены: ордера уже нет на бирже (исполнен или отменён)
+UNKNOWN_ORDER = -2011
+
+
+# Вторая нога не отменилась и по REST всё ещё стоит на бирже:
+# следующий цикл не начинается, иначе старый тейк/стоп закроет его позицию
+class SiblingCancelError(RuntimeError):
+    pass
+
+
+# Поток пользовательских данных: listenKey + ORDER_TRADE_UPDATE / executionReport.
+# Слушатели получают каждое событие через on_message, а также on_connect/on_disconnect.
+class UserDataStream:
+    def __init__(self, get_listen_key, keepalive, base_url, keepalive_interval=30 * 60, log=None):
+        self.get_listen_key = get_listen_key
+        self.log = log
+        self.keepalive = keepalive
+        self.base_url = base_url
+        self.keepalive_interval = keepalive_interval
+        self.listen_key = None
+        self.listeners = []
+
+        self._stream = WebsocketStream(self._url, self._on_message, self._on_connect, self._on_disconnect, log=log)
+        self._stop = threading.Event()
+        self._keepalive_thread = None
+
+    @property
+    def connected(self) -> bool:
+        return self._stream.connected
+
+    def add_listener(self, listener) -> None:
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._stream.start()
+        if self._keepalive_thread is None or not self._keepalive_thread.is_alive():
+            self._keepalive_thread = threading.Thread(target=self._keepalive_loop, daemon=True)
+            self._keepalive_thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._stream.stop()
+
+    # Новый listenKey запрашивается при каждом подключении: старый мог истечь за время обрыва
+    def _url(self) -> str:
+        self.listen_key = self.get_listen_key()
+        return self.base_url + self.listen_key
+
+    def _keepalive_loop(self) -> None:
+        while not self._stop.wait(self.keepalive_interval):
+            if self.listen_key is None:
+                continue
+            try:
+                self.keepalive(self.listen_key)
+            except Exception as ex:
+                log_event(self.log, 'keepalive_error', 'Ошибка продления listenKey:', ex, error=repr(ex))
+
+    def _on_message(self, msg) -> None:
+        for listener in self.listeners:
+            listener.on_message(msg)
+
+    def _on_connect(self) -> None:
+        for listener in self.listeners:
+            if hasattr(listener, 'on_connect'):
+                listener.on_connect()
+
+    def _on_disconnect(self) -> None:
+        for listener in self.listeners:
+            if hasattr(listener, 'on_disconnect'):
+                listener.on_disconnect()
+
+
+# Пара тейк/стоп одной стороны цикла
+@dataclass(eq=False)
+class Leg:
+    symbol: str
+    side: str
+    take_id: int
+    stop_id: int
+    take_status: str = 'NEW'
+    stop_status: str = 'NEW'
+    result: bool = None
+    done_at: float = 0.0
+    canceled_at: float = 0.0
+    # Поток отмены второй ноги и ошибка, если отменить её не удалось
+    cancel_thread: threading.Thread = field(default=None, repr=False)
+    cancel_error: Exception = None
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+
+# Отслеживание исполнения тейков и стопов по событиям потока пользовательских данных.
+# При исполнении одной ноги вторая отменяется сразу (cancel_order) с повторами; wait()
+# возвращается только после отмены. Если повторы не удались, а вторая нога по REST ещё
+# стоит, wait() бросает SiblingCancelError. Снимается только вторая нога этой стороны:
+# отмена всех ордеров символа оставила бы позицию другой стороны без тейка и стопа.
+# При обрыве потока состояние сверяется через REST (get_order).
+# Для OCO отмена второй ноги - следствие исполнения первой, поэтому там
+# final_statuses=('FILLED',), а нога считается закрытой по стопу, только если отменены обе.
+class OrderTracker:
+    def __init__(self, cancel_order=None, get_order=None, final_statuses=FINAL_STATUSES, cancel_retries=3, cancel_backoff=0.05, log=None):
+        self.cancel_order = cancel_order
+        self.log = log
+        self.get_order = get_order
+        self.cancel_retries = cancel_retries
+        self.cancel_backoff = cancel_backoff
+        self.final_statuses = final_statuses
+        self.connected = False
+        # Вызываются с закрытой ногой (например, чтобы разбудить asyncio-задачу)
+        self.done_callbacks = []
+
+        self._legs = {}
+        self._unknown = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+
+    def track(self, symbol, side, take_id, stop_id) -> Leg:
+        leg = Leg(symbol, side, take_id, stop_id)
+        with self._lock:
+            self._legs[(symbol, take_id)] = (leg, 'take')
+            self._legs[(symbol, stop_id)] = (leg, 'stop')
+            # События могли прийти раньше, чем ордера были зарегистрированы
+            early = [(order_id, self._unknown.pop((symbol, order_id))) for order_id in (stop_id, take_id) if (symbol, order_id) in self._unknown]
+        for order_id, status in early:
+            self._update(symbol, order_id, status)
+        return leg
+
+    def forget(self, legs) -> None:
+        with self._lock:
+            for leg in legs:
+                self._legs.pop((leg.symbol, leg.take_id), None)
+                self._legs.pop((leg.symbol, leg.stop_id), None)
+
+    def on_message(self, msg) -> None:
+        if msg.get('e') == 'ORDER_TRADE_UPDATE':
+            order = msg['o']
+            self._update(order['s'], order['i'], order['X'])
+        elif msg.get('e') == 'executionReport':
+            self._update(msg['s'], msg['i'], msg['X'])
+
+    # Сверка после переподключения (события за время обрыва потеряны) идёт в отдельном потоке,
+    # чтобы REST-запросы по открытым ногам не задерживали события потока
+    def on_connect(self) -> None:
+        self.connected = True
+        threading.Thread(target=self.reconcile, name='reconcile', daemon=True).start()
+
+    def on_disconnect(self) -> None:
+        self.connected = False
+        self._changed.set()
+
+    def _update(self, symbol, order_id, status) -> None:
+        with self._lock:
+            entry = self._legs.get((symbol, order_id))
+            if entry is None:
+                if len(self._unknown) > 1000:
+                    self._unknown.clear()
+                self._unknown[(symbol, order_id)] = status
+                return
+            leg, role = entry
+            if leg.done:
+                return
+            if role == 'take':
+                leg.take_status = status
+            else:
+                leg.stop_status = status
+            if status in self.final_statuses:
+                # CANCELED (futures) закрывает ногу без тейка
+                result = role == 'take' and status == 'FILLED'
+            elif leg.take_status == leg.stop_status == 'CANCELED':
+                result = False
+            else:
+                return
+            leg.done_at = time.perf_counter()
+            sibling = leg.stop_id if role == 'take' else leg.take_id
+            # wait() читает ногу без блокировки: результат выставляется только после запуска
+            # потока отмены, иначе join_cancels пропустит его или не сможет дождаться
+            if self.cancel_order is not None:
+                cancel_thread = threading.Thread(target=self._cancel, args=(leg, sibling), daemon=True)
+                cancel_thread.start()
+                leg.cancel_thread = cancel_thread
+            leg.result = result
+
+        self._changed.set()
+        for callback in self.done_callbacks:
+            callback(leg)
+
+    def _cancel(self, leg, order_id) -> None:
+        delay = self.cancel_backoff
+        for _ in range(self.cancel_retries):
+            try:
+                self.cancel_order(leg.symbol, order_id)
+                leg.cancel_error = None
+                break
+            except Exception as ex:
+                if getattr(ex, 'code', None) == UNKNOWN_ORDER:
+                    leg.cancel_error = None
+                    break
+                log_event(self.log, 'cancel_error', 'Ошибка при отмене ордера', order_id, ex, symbol=leg.symbol, side=leg.side, order_ids=[order_id], error=repr(ex))
+                leg.cancel_error = ex
+                time.sleep(delay)
+                delay *= 2
+        else:
+            if self._inactive(leg.symbol, order_id):
+                leg.cancel_error = None
+        if leg.cancel_error is None:
+            leg.canceled_at = time.perf_counter()
+
+    # Ордера уже нет на бирже (отменён или исполнен без события); ошибка запроса - считаем, что стоит
+    def _inactive(self, symbol, order_id) -> bool:
+        if self.get_order is None:
+            return False
+        try:
+            return self.get_order(symbol, order_id)['status'] in INACTIVE_STATUSES
+        except Exception:
+            return False
+
+    # Ожидание отмены вторых ног закрытых ног; SiblingCancelError, если отмена не удалась
+    def join_cancels(self, legs) -> None:
+        for leg in legs:
+            if leg.cancel_thread is not None:
+                leg.cancel_thread.join()
+        failed = [leg for leg in legs if leg.cancel_error is not None]
+        if failed:
+            raise SiblingCancelError(f'Не отменена вторая нога {failed[0].symbol} {failed[0].side}: {failed[0].cancel_error}')
+
+    # Сверка состояния ордеров через REST
+    def reconcile(self) -> None:
+        if self.get_order is None:
+            return
+        with self._lock:
+            legs = {leg for leg, _ in self._legs.values() if not leg.done}
+        for leg in legs:
+            try:
+                stop = self.get_order(leg.symbol, leg.stop_id)
+                take = self.get_order(leg.symbol, leg.take_id)
+            except Exception as ex:
+                log_event(self.log, 'reconcile_error', 'Ошибка сверки ордеров:', ex, symbol=leg.symbol, side=leg.side, order_ids=[leg.take_id, leg.stop_id], error=repr(ex))
+                continue
+            # Исполненный ордер применяется первым: CANCELED второго - следствие исполнения,
+            # и нога закрывается по нему, только если не исполнен ни один
+            statuses = sorted([(leg.take_id, take['status']), (leg.stop_id, stop['status'])], key=lambda item: item[1] != 'FILLED')
+            for order_id, status in statuses:
+                self._update(leg.symbol, order_id, status)
+
+    # Ожидание завершения всех ног и отмены их вторых ног. Пока поток подключен, ждём событий;
+    # без потока опрашиваем REST раз в poll_interval секунд.
+    def wait(self, legs, poll_interval=3) -> None:
+        try:
+            while not all(leg.done for leg in legs):
+                if not self.connected:
+                    self.reconcile()
+                    if all(leg.done for leg in legs):
+                        break
+                self._changed.wait(poll_interval)
+                self._changed.clear()
+            self.join_cancels(legs)
+        finally:
+            self.forget(legs)
@@ -0,0 +1,83 @@
+import time
+import threading
+
+from streams import WebsocketStream
+
+
+# Котировка символа. Неизменяемый кортеж: запись заменяет его целиком,
+# поэтому читатели получают согласованные значения без блокировок
+class Quote(tuple):
+    __slots__ = ()
+
+    def __new__(cls, price, bid, ask, received):
+        return tuple.__new__(cls, (price, bid, ask, received))
+
+    price = property(lambda self: self[0])
+    bid = property(lambda self: self[1])
+    ask = property(lambda self: self[2])
+    received = property(lambda self: self[3])
+
+    def age(self) -> float:
+        return time.monotonic() - self.received
+
+
+# Последние цены по потокам markPrice@1s (фьючерсы) или bookTicker (спот).
+# Чтение - обращение к словарю без блокировки; устаревшая котировка не отдаётся.
+class PriceService:
+    def __init__(self, base_url, futures=True, max_age=None, log=None):
+        self.base_url = base_url
+        self.futures = futures
+        # markPrice приходит раз в секунду, bookTicker - при каждом изменении лучших цен
+        self.max_age = max_age if max_age is not None else 3.0 if futures else 1.0
+        self.quotes = {}
+        self.symbols = set()
+
+        self._lock = threading.Lock()
+        self._stream = WebsocketStream(self._url, self._on_message, on_disconnect=self._on_disconnect, log=log)
+
+    def _url(self) -> str:
+        stream = '@markPrice@1s' if self.futures else '@bookTicker'
+        return self.base_url + '/'.join(symbol.lower() + stream for symbol in sorted(self.symbols))
+
+    def add_symbol(self, symbol) -> None:
+        with self._lock:
+            if symbol in self.symbols:
+                return
+            self.symbols.add(symbol)
+        if self._stream.connected:
+            self._stream.reconnect()
+        else:
+            self._stream.start()
+
+    def stop(self) -> None:
+        self._stream.stop()
+
+    # После обрыва котировки считаются устаревшими
+    def _on_disconnect(self) -> None:
+        self.quotes = {}
+
+    def _on_message(self, msg) -> None:
+        event = msg.get('data', msg)
+        if event.get('e') == 'markPriceUpdate':
+            price = float(event['p'])
+            self.quotes[event['s']] = Quote(price, price, price, time.monotonic())
+        elif 'b' in event and 'a' in event and 's' in event:
+            # bookTicker спота приходит без поля e
+            bid, ask = float(event['b']), float(event['a'])
+            self.quotes[event['s']] = Quote((bid + ask) / 2, bid, ask, time.monotonic())
+
+    # Свежая котировка или None, если её нет или она старше max_age секунд
+    def quote(self, symbol, max_age=None) -> Quote:
+        quote = self.quotes.get(symbol)
+        if quote is None or quote.age() > (max_age if max_age is not None else self.max_age):
+            return None
+        return quote
+
+    def price(self, symbol, max_age=None) -> float:
+        quote = self.quote(symbol, max_age)
+        return quote.price if quote else None
+
+    # Возраст последней котировки в секундах (None, если её нет)
+    def staleness(self, symbol) -> float:
+        quote = self.quotes.get(symbol)
+        return quote.age() if quote else None
@@ -0,0 +1,218 @@
+import time
+import threading
+from urllib.parse import urlparse
+
+
+# Минутные лимиты веса запросов по IP
+FUTURES_WEIGHT_LIMIT = 2400
+SPOT_WEIGHT_LIMIT = 6000
+
+# Лимиты числа ордеров счёта по окнам заголовков X-MBX-ORDER-COUNT-<окно>
+FUTURES_ORDER_LIMITS = {'10S': 300, '1M': 1200}
+SPOT_ORDER_LIMITS = {'10S': 50, '1D': 160000}
+# Длительность окна в секундах; окна биржи выровнены по UTC
+ORDER_WINDOWS = {'10S': 10, '1M': 60, '1D': 86400}
+
+# Вес эндпоинтов, которые вызывают скрипты: (метод, путь) -> вес.
+# Для стакана вес зависит от limit и считается отдельно.
+ENDPOINT_WEIGHTS = {
+    ('GET', '/fapi/v1/premiumIndex'): 1,
+    ('GET', '/fapi/v1/exchangeInfo'): 1,
+    ('GET', '/fapi/v2/balance'): 5,
+    ('GET', '/fapi/v1/order'): 1,
+    ('POST', '/fapi/v1/order'): 0,
+    ('DELETE', '/fapi/v1/order'): 1,
+    ('POST', '/fapi/v1/batchOrders'): 5,
+    ('DELETE', '/fapi/v1/allOpenOrders'): 1,
+    ('GET', '/fapi/v1/commissionRate'): 20,
+    ('GET', '/fapi/v1/userTrades'): 5,
+    ('POST', '/fapi/v1/listenKey'): 1,
+    ('PUT', '/fapi/v1/listenKey'): 1,
+    ('GET', '/api/v3/ticker/price'): 2,
+    ('GET', '/api/v3/exchangeInfo'): 20,
+    ('GET', '/api/v3/account'): 20,
+    ('GET', '/api/v3/order'): 4,
+    ('DELETE', '/api/v3/order'): 1,
+    ('POST', '/api/v3/order/oco'): 1,
+    ('GET', '/api/v3/openOrderList'): 6,
+    ('GET', '/api/v3/myTrades'): 20,
+    ('POST', '/api/v3/userDataStream'): 2,
+    ('PUT', '/api/v3/userDataStream'): 2,
+    ('GET', '/sapi/v1/asset/tradeFee'): 1,
+}
+
+# Размещение и отмена ордеров идут вне очереди
+PRIORITY_PATHS = ('/fapi/v1/order', '/fapi/v1/batchOrders', '/fapi/v1/allOpenOrders', '/api/v3/order', '/api/v3/order/oco')
+# Запросы, которые создают ордера и расходуют лимит числа ордеров
+ORDER_PATHS = ('/fapi/v1/order', '/fapi/v1/batchOrders', '/api/v3/order', '/api/v3/order/oco')
+
+
+def depth_weight(path, limit) -> int:
+    limit = int(limit or 100)
+    if path.startswith('/fapi'):
+        if limit <= 50:
+            return 2
+        if limit <= 100:
+            return 5
+        if limit <= 500:
+            return 10
+        return 20
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+def endpoint_weight(method, path, params=None) -> int:
+    if path in ('/fapi/v1/depth', '/api/v3/depth'):
+        return depth_weight(path, (params or {}).get('limit'))
+    return ENDPOINT_WEIGHTS.get((method.upper(), path), 1)
+
+
+def is_priority(method, path) -> bool:
+    return method.upper() != 'GET' and path in PRIORITY_PATHS
+
+
+def is_order(method, path) -> bool:
+    return method.upper() == 'POST' and path in ORDER_PATHS
+
+
+# Ограничитель запросов: ведро токенов по минутному лимиту веса, которое
+# синхронизируется с заголовками X-MBX-USED-WEIGHT-1M ответа биржи.
+# Часть ёмкости (reserve) доступна только ордерам и отменам.
+# Лимит веса общий на IP: при нескольких счетах в одном процессе каждый получает долю share,
+# и вес из заголовков (тоже общий на IP) учитывается в той же доле.
+# Счётчики ордеров из заголовков X-MBX-ORDER-COUNT-* - на счёт: когда счётчик окна доходит до
+# safety от order_limits, новые ордера ждут начала следующего окна
+class RateGovernor:
+    def __init__(self, limit=FUTURES_WEIGHT_LIMIT, reserve=0.1, safety=0.9, share=1.0, order_limits=None):
+        self.limit = limit
+        self.safety = safety
+        self.order_limits = FUTURES_ORDER_LIMITS if order_limits is None else order_limits
+        self.share = share
+        self.capacity = limit * safety * share
+        self.reserve = self.capacity * reserve
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.used_weight = 0
+        self.order_count_10s = 0
+        self.order_count_1m = 0
+        self.order_counts = {}
+        self.blocked_until = 0.0
+        self.orders_blocked_until = 0.0
+        self.requests = 0
+        self.delayed = 0
+        self.delay_seconds = 0.0
+        self.rejected = 0
+
+        self._updated = time.monotonic()
+        self._condition = threading.Condition()
+
+    # Новая доля лимита IP (например, когда к счёту добавляются суб-счета)
+    def set_share(self, share) -> None:
+        with self._condition:
+            scale = share / self.share
+            self.share = share
+            self.capacity *= scale
+            self.reserve *= scale
+            self.rate *= scale
+            self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self, now) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    # Ожидание токенов перед запросом; приоритетные запросы могут тратить резерв,
+    # ордера (order) ещё и ждут окна лимита числа ордеров.
+    # Вес больше доступной ёмкости ограничивается ею: иначе такой запрос не дождался бы токенов никогда
+    def acquire(self, weight, priority=False, order=False) -> None:
+        floor = 0 if priority else self.reserve
+        started = time.monotonic()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                # Ёмкость может уменьшиться в set_share, пока запрос ждёт
+                needed = min(weight, self.capacity - floor)
+                blocked = max(self.blocked_until, self.orders_blocked_until if order else 0.0)
+                if now >= blocked and self.tokens - needed >= floor:
+                    self.tokens -= needed
+                    self.requests += 1
+                    break
+                wait = max(blocked - now, (needed + floor - self.tokens) / self.rate, 0.01)
+                self._condition.wait(wait)
+        waited = time.monotonic() - started
+        if waited > 0.001:
+            self.delayed += 1
+            self.delay_seconds += waited
+
+    # Учёт ответа: реальный вес из заголовков и бан по Retry-After для 429/418
+    def on_response(self, status_code, headers) -> None:
+        with self._condition:
+            used = headers.get('X-MBX-USED-WEIGHT-1M') or headers.get('x-mbx-used-weight-1m')
+            if used is not None:
+                self.used_weight = int(used)
+                self.tokens = min(self.tokens, self.capacity - self.used_weight * self.share)
+            for name, value in headers.items():
+                name = name.upper()
+                if name.startswith('X-MBX-ORDER-COUNT-'):
+                    self._order_count(name[len('X-MBX-ORDER-COUNT-'):], int(value))
+            if status_code in (418, 429):
+                self.rejected += 1
+                retry_after = float(headers.get('Retry-After') or headers.get('retry-after') or 60)
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+                self.tokens = 0
+            self._condition.notify_all()
+
+    # Счётчик окна window ('10S', '1M', '1D'); вызывается под self._condition
+    def _order_count(self, window, count) -> None:
+        self.order_counts[window] = count
+        if window == '10S':
+            self.order_count_10s = count
+        elif window == '1M':
+            self.order_count_1m = count
+        limit = self.order_limits.get(window)
+        seconds = ORDER_WINDOWS.get(window)
+        if limit and seconds and count >= limit * self.safety:
+            # До начала следующего окна по UTC
+            self.orders_blocked_until = max(self.orders_blocked_until, time.monotonic() + seconds - time.time() % seconds)
+
+    def utilisation(self) -> dict:
+        with self._condition:
+            self._refill(time.monotonic())
+            return {
+                'used_weight': self.used_weight,
+                'limit': self.limit,
+                'utilisation': self.used_weight / self.limit,
+                'tokens': self.tokens,
+                'order_count_10s': self.order_count_10s,
+                'order_count_1m': self.order_count_1m,
+                'order_counts': dict(self.order_counts),
+                'orders_blocked': max(self.orders_blocked_until - time.monotonic(), 0.0),
+                'requests': self.requests,
+                'delayed': self.delayed,
+                'delay_seconds': self.delay_seconds,
+                'rejected': self.rejected,
+                'blocked': max(self.blocked_until - time.monotonic(), 0.0),
+            }
+
+
+# Подключение ограничителя к клиенту python-binance: все REST-вызовы клиента
+# проходят через acquire, а ответы сессии requests - через on_response.
+def install(client, governor) -> RateGovernor:
+    request = client._request
+
+    def governed_request(method, uri, signed, force_params=False, **kwargs):
+        path = urlparse(uri).path
+        governor.acquire(endpoint_weight(method, path, kwargs.get('data')), is_priority(method, path), is_order(method, path))
+        return request(method, uri, signed, force_params, **kwargs)
+
+    def on_response(response, *args, **kwargs):
+        governor.on_response(response.status_code, response.headers)
+
+    client._request = governed_request
+    client.session.hooks['response'].append(on_response)
+    return governor
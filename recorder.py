@@ -0,0 +1,267 @@
+import os
+import time
+import glob
+import signal
+import argparse
+import threading
+
+import numpy as np
+
+import metrics
+from streams import WebsocketStream, FUTURES_COMBINED_URL, FUTURES_TESTNET_COMBINED_URL, SPOT_COMBINED_URL, SPOT_TESTNET_COMBINED_URL
+
+
+DATA_DIR = 'market_data'
+
+# Потоки рыночных данных: имя в подписке и тип сегмента. markPrice есть только у фьючерсов
+STREAMS = {'aggTrade': 'aggTrade', 'bookTicker': 'bookTicker', 'depth@100ms': 'depth', 'markPrice@1s': 'markPrice'}
+
+# Колонки сегментов. time - время события биржи, received - время получения, оба в мс.
+# depth: одна строка на событие, уровни - в level_* (levels - число уровней события, сначала bids)
+COLUMNS = {
+    'aggTrade': {'time': np.int64, 'received': np.int64, 'trade_id': np.int64, 'price': np.float64, 'qty': np.float64, 'buyer_maker': np.bool_},
+    'bookTicker': {'time': np.int64, 'received': np.int64, 'update_id': np.int64, 'bid': np.float64, 'bid_qty': np.float64, 'ask': np.float64, 'ask_qty': np.float64},
+    'markPrice': {'time': np.int64, 'received': np.int64, 'mark': np.float64, 'index': np.float64, 'funding_rate': np.float64},
+    'depth': {'time': np.int64, 'received': np.int64, 'first_id': np.int64, 'last_id': np.int64, 'prev_id': np.int64, 'bids': np.int32, 'asks': np.int32},
+}
+LEVEL_COLUMNS = {'level_price': np.float64, 'level_qty': np.float64}
+
+RECORDED_EVENTS = metrics.registry.add(metrics.Counter('straddle_recorded_events_total', 'Записанные события рыночных данных', ('symbol', 'stream')))
+RECORDED_SEGMENTS = metrics.registry.add(metrics.Counter('straddle_recorded_segments_total', 'Записанные сегменты', ('symbol', 'stream')))
+
+
+# Строка сегмента из события потока
+def _row(kind, event, received) -> tuple:
+    if kind == 'aggTrade':
+        return event['T'], received, event['a'], float(event['p']), float(event['q']), event['m']
+    if kind == 'bookTicker':
+        return event.get('E', received), received, event['u'], float(event['b']), float(event['B']), float(event['a']), float(event['A'])
+    if kind == 'markPrice':
+        return event['E'], received, float(event['p']), float(event.get('i') or 'nan'), float(event.get('r') or 'nan')
+    return event['E'], received, event['U'], event['u'], event.get('pu', -1), len(event['b']), len(event['a'])
+
+
+# Запись потоков aggTrade, bookTicker, depth и markPrice в сжатые колоночные сегменты .npz:
+# <directory>/<SYMBOL>/<тип>-<время первого события>-<time_ns записи>.npz. Поток websocket только добавляет
+# строку в буфер; буферы сбрасываются отдельным потоком раз в flush_interval секунд или
+# после segment_rows строк. Сегменты не дописываются, файл появляется целиком (os.replace)
+class MarketRecorder:
+    def __init__(self, symbols, futures=True, testnet=False, directory=DATA_DIR, segment_rows=100000, flush_interval=10.0):
+        self.symbols = [symbol.upper() for symbol in symbols]
+        self.futures = futures
+        self.directory = os.path.join(directory, 'futures' if futures else 'spot')
+        self.segment_rows = segment_rows
+        self.flush_interval = flush_interval
+        if futures:
+            self.base_url = FUTURES_TESTNET_COMBINED_URL if testnet else FUTURES_COMBINED_URL
+        else:
+            self.base_url = SPOT_TESTNET_COMBINED_URL if testnet else SPOT_COMBINED_URL
+        self.streams = [name for name in STREAMS if futures or STREAMS[name] != 'markPrice']
+        self.segments = 0
+
+        self._buffers = {}
+        self._rows = 0
+        self._lock = threading.Lock()
+        self._flush = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stream = WebsocketStream(self._url, self._on_message)
+
+    def _url(self) -> str:
+        return self.base_url + '/'.join(symbol.lower() + '@' + name for symbol in self.symbols for name in self.streams)
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='recorder', daemon=True)
+        self._thread.start()
+        self._stream.start()
+
+    # Остановка потока и запись оставшихся строк
+    def stop(self) -> None:
+        self._stream.stop()
+        self._stop.set()
+        self._flush.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _on_message(self, msg) -> None:
+        received = int(time.time() * 1000)
+        kind = STREAMS.get(msg.get('stream', '').partition('@')[2])
+        event = msg.get('data', msg)
+        if kind is None or 's' not in event:
+            return
+        row = _row(kind, event, received)
+        with self._lock:
+            buffer = self._buffers.get((event['s'], kind))
+            if buffer is None:
+                buffer = self._buffers[(event['s'], kind)] = ([], [])
+            buffer[0].append(row)
+            if kind == 'depth':
+                buffer[1].extend(event['b'])
+                buffer[1].extend(event['a'])
+            self._rows += 1
+            if self._rows >= self.segment_rows:
+                self._flush.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._flush.wait(self.flush_interval)
+            self._flush.clear()
+            self.flush()
+        self.flush()
+
+    # Буферы подменяются пустыми под блокировкой, сжатие и запись идут без неё
+    def flush(self) -> None:
+        with self._lock:
+            buffers, self._buffers, self._rows = self._buffers, {}, 0
+        for (symbol, kind), (rows, levels) in buffers.items():
+            if rows:
+                self._write(symbol, kind, rows, levels)
+
+    def _write(self, symbol, kind, rows, levels) -> None:
+        columns = {name: np.array(values, dtype=dtype) for (name, dtype), values in zip(COLUMNS[kind].items(), zip(*rows))}
+        if kind == 'depth':
+            pairs = np.array(levels, dtype=np.float64).reshape(-1, 2)
+            columns['level_price'], columns['level_qty'] = pairs[:, 0], pairs[:, 1]
+        directory = os.path.join(self.directory, symbol)
+        os.makedirs(directory, exist_ok=True)
+        # time_ns: у двух сегментов может совпасть время первого события (та же миллисекунда
+        # после сброса по segment_rows или после перезапуска), и второй заменил бы первый
+        path = os.path.join(directory, f"{kind}-{columns['time'][0]}-{time.time_ns()}.npz")
+        np.savez_compressed(path + '.tmp.npz', **columns)
+        os.replace(path + '.tmp.npz', path)
+        self.segments += 1
+        RECORDED_EVENTS.inc(symbol, kind, amount=len(rows))
+        RECORDED_SEGMENTS.inc(symbol, kind)
+
+
+# Сегменты типа kind в каталоге символа (<directory>/<SYMBOL>) по времени первого события
+# и времени записи (у сегментов прежнего формата <тип>-<время>.npz его нет)
+def segments(path, kind) -> list:
+    files = [name for name in glob.glob(os.path.join(path, kind + '-*.npz')) if not name.endswith('.tmp.npz')]
+    return sorted(files, key=lambda name: tuple(int(part) for part in os.path.basename(name)[len(kind) + 1:-4].split('-')))
+
+
+# Все сегменты типа kind одним набором колонок; пустой словарь, если записей нет
+def load_stream(path, kind) -> dict:
+    parts = []
+    for name in segments(path, kind):
+        with np.load(name) as data:
+            parts.append({column: data[column] for column in data.files})
+    if not parts:
+        return {}
+    return {column: np.concatenate([part[column] for part in parts]) for column in parts[0]}
+
+
+# Ряд цен backtest.PriceSeries из записи символа: сделки aggTrade, без них - markPrice или середина bookTicker
+def load_series(path):
+    from backtest import PriceSeries
+
+    for kind in ('aggTrade', 'markPrice', 'bookTicker'):
+        data = load_stream(path, kind)
+        if data:
+            if kind == 'aggTrade':
+                price = data['price']
+            elif kind == 'markPrice':
+                price = data['mark']
+            else:
+                price = (data['bid'] + data['ask']) / 2
+            return PriceSeries(data['time'], price, price, price)
+    raise FileNotFoundError(f'В {path} нет записанных цен')
+
+
+# Событие в формате комбинированного потока Binance из строки сегмента
+def _message(symbol, kind, data, index, offsets) -> dict:
+    if kind == 'aggTrade':
+        event = {'e': 'aggTrade', 'E': int(data['time'][index]), 's': symbol, 'a': int(data['trade_id'][index]), 'p': str(data['price'][index]),
+                 'q': str(data['qty'][index]), 'T': int(data['time'][index]), 'm': bool(data['buyer_maker'][index])}
+        stream = 'aggTrade'
+    elif kind == 'bookTicker':
+        event = {'u': int(data['update_id'][index]), 'E': int(data['time'][index]), 's': symbol, 'b': str(data['bid'][index]), 'B': str(data['bid_qty'][index]),
+                 'a': str(data['ask'][index]), 'A': str(data['ask_qty'][index])}
+        stream = 'bookTicker'
+    elif kind == 'markPrice':
+        event = {'e': 'markPriceUpdate', 'E': int(data['time'][index]), 's': symbol, 'p': str(data['mark'][index]), 'i': str(data['index'][index]),
+                 'r': str(data['funding_rate'][index])}
+        stream = 'markPrice@1s'
+    else:
+        start = offsets[index]
+        middle = start + int(data['bids'][index])
+        end = middle + int(data['asks'][index])
+        levels = [[str(price), str(qty)] for price, qty in zip(data['level_price'][start:end], data['level_qty'][start:end])]
+        event = {'e': 'depthUpdate', 'E': int(data['time'][index]), 's': symbol, 'U': int(data['first_id'][index]), 'u': int(data['last_id'][index]),
+                 'pu': int(data['prev_id'][index]), 'b': levels[:middle - start], 'a': levels[middle - start:]}
+        stream = 'depth@100ms'
+    return {'stream': symbol.lower() + '@' + stream, 'data': event}
+
+
+# Воспроизведение записи символа (<directory>/<SYMBOL>): события потоков kinds по времени биржи
+# в формате комбинированного потока, как их получают PriceService и OrderBookManager.
+# speed=1 - в реальном времени, 10 - в десять раз быстрее, 0 - без пауз
+def replay(path, kinds=('aggTrade', 'bookTicker', 'depth', 'markPrice'), speed=1.0, stop=None):
+    symbol = os.path.basename(os.path.normpath(path))
+    streams = {kind: load_stream(path, kind) for kind in kinds}
+    streams = {kind: data for kind, data in streams.items() if data}
+    if not streams:
+        return
+    offsets = {}
+    if 'depth' in streams:
+        counts = streams['depth']['bids'].astype(np.int64) + streams['depth']['asks']
+        offsets['depth'] = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    kinds = list(streams)
+    times = np.concatenate([streams[kind]['time'] for kind in kinds])
+    sources = np.concatenate([np.full(len(streams[kind]['time']), number, dtype=np.int8) for number, kind in enumerate(kinds)])
+    indexes = np.concatenate([np.arange(len(streams[kind]['time'])) for kind in kinds])
+    order = np.argsort(times, kind='stable')
+
+    first = times[order[0]]
+    started = time.monotonic()
+    for position in order:
+        if stop is not None and stop.is_set():
+            return
+        if speed:
+            delay = (times[position] - first) / 1000 / speed - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+        kind = kinds[sources[position]]
+        yield _message(symbol, kind, streams[kind], indexes[position], offsets.get(kind))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Запись рыночных данных (aggTrade, bookTicker, depth, markPrice) в сегменты .npz')
+    parser.add_argument('--symbols', default='BTCUSDT', help='Пары через запятую')
+    parser.add_argument('--market', choices=('futures', 'spot'), default='futures')
+    parser.add_argument('--testnet', action='store_true')
+    parser.add_argument('--dir', default=DATA_DIR)
+    parser.add_argument('--segment-rows', type=int, default=100000, help='Строк в буферах до внеочередной записи сегментов')
+    parser.add_argument('--flush-interval', type=float, default=10.0, help='Секунд между записями сегментов')
+    parser.add_argument('--replay', default=None, metavar='PATH', help='Не записывать, а воспроизвести каталог символа и вывести сводку')
+    parser.add_argument('--speed', type=float, default=0.0, help='Скорость воспроизведения: 1 - реальное время, 0 - без пауз')
+    parser.add_argument('--metrics-port', type=int, default=None, help='Порт endpoint /metrics на 127.0.0.1')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.replay:
+        counts = {}
+        started = time.perf_counter()
+        for message in replay(args.replay, speed=args.speed):
+            stream = message['stream'].partition('@')[2]
+            counts[stream] = counts.get(stream, 0) + 1
+        for stream, count in counts.items():
+            print(f'{stream:<14} {count}')
+        print(f'Воспроизведено за {time.perf_counter() - started:.2f} с')
+    else:
+        if args.metrics_port:
+            metrics.serve(port=args.metrics_port)
+        recorder = MarketRecorder(args.symbols.split(','), futures=args.market == 'futures', testnet=args.testnet, directory=args.dir,
+                                  segment_rows=args.segment_rows, flush_interval=args.flush_interval)
+        stopped = threading.Event()
+        signal.signal(signal.SIGINT, lambda signum, frame: stopped.set())
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+        recorder.start()
+        print('Запись в', recorder.directory, '(Ctrl+C - остановка)')
+        stopped.wait()
+        recorder.stop()
+        print('Записано сегментов:', recorder.segments)
@@ -0,0 +1,107 @@
+import time
+import threading
+from dataclasses import dataclass
+
+import metrics
+
+
+# Минимальный LOT стороны в валюте котировки
+MIN_LOT = 10
+
+DAY_SECONDS = 86400
+
+
+# Лимиты проверки перед размещением; 0 - без ограничения
+@dataclass(frozen=True)
+class RiskLimits:
+    # LOT одной стороны, валюта котировки
+    max_notional: float = 0.0
+    # Сколько раз подряд мартингейл может увеличить LOT
+    max_martingale_depth: int = 0
+    # Убыток циклов за сутки UTC, после которого новые циклы не начинаются
+    daily_loss_limit: float = 0.0
+    # Сумма LOT открытых сторон по символу на счёте
+    max_exposure: float = 0.0
+    # Комиссия мейкера
+    max_fee: float = 0.0
+
+    @classmethod
+    def from_config(cls, config) -> 'RiskLimits':
+        return cls(config.max_notional, config.max_martingale_depth, config.daily_loss_limit, config.max_exposure, config.max_fee)
+
+
+# Проверка цикла перед размещением по состоянию в памяти, без REST: открытая позиция
+# и глубина мартингейла по символу, PnL за сутки, комиссия из кэша. Цикл либо не начинается,
+# либо его LOT уменьшается; отказы - в metrics с причиной. Один RiskGuard - один счёт
+class RiskGuard:
+    def __init__(self, limits=None, label=''):
+        self.limits = limits or RiskLimits()
+        self.label = label
+        self.exposure = {}
+        self.depth = {}
+        self.fees = {}
+        self.day = self.day_start()
+        self.day_pnl = 0.0
+        self._lock = threading.Lock()
+
+    # Начало текущих суток UTC, секунды
+    @staticmethod
+    def day_start(now=None) -> float:
+        now = time.time() if now is None else now
+        return now - now % DAY_SECONDS
+
+    def _roll_day(self) -> None:
+        day = self.day_start()
+        if day != self.day:
+            self.day = day
+            self.day_pnl = 0.0
+
+    # PnL уже закрытых сегодня циклов (из журнала при запуске)
+    def seed(self, day_pnl) -> None:
+        with self._lock:
+            self._roll_day()
+            self.day_pnl = day_pnl
+
+    def set_fee(self, symbol, fee) -> None:
+        self.fees[symbol] = fee
+
+    # LOT, с которым можно начать цикл (обе стороны по lot), и причина уменьшения;
+    # (None, причина) - цикл не начинается. Разрешённый объём сразу учитывается в exposure
+    def check(self, symbol, lot, initial_lot) -> tuple:
+        limits = self.limits
+        allowed, reason = lot, None
+        with self._lock:
+            self._roll_day()
+            if limits.daily_loss_limit and self.day_pnl <= -limits.daily_loss_limit:
+                allowed, reason = None, 'daily_loss'
+            elif limits.max_fee and self.fees.get(symbol, 0.0) > limits.max_fee:
+                allowed, reason = None, 'fee'
+            else:
+                if limits.max_martingale_depth and self.depth.get(symbol, 0) > limits.max_martingale_depth and allowed > initial_lot:
+                    allowed, reason = initial_lot, 'martingale_depth'
+                if limits.max_notional and allowed > limits.max_notional:
+                    allowed, reason = limits.max_notional, 'max_notional'
+                if limits.max_exposure:
+                    room = (limits.max_exposure - self.exposure.get(symbol, 0.0)) / 2
+                    if allowed > room:
+                        allowed, reason = room, 'exposure'
+                if allowed < MIN_LOT:
+                    allowed, reason = None, reason or 'min_lot'
+                else:
+                    self.exposure[symbol] = self.exposure.get(symbol, 0.0) + 2 * allowed
+        if reason is not None:
+            metrics.RISK_REJECTIONS.inc(self.label, symbol, reason, 'blocked' if allowed is None else 'shrunk')
+        return allowed, reason
+
+    # Цикл откатан: ордера не стоят
+    def release(self, symbol, lot) -> None:
+        with self._lock:
+            self.exposure[symbol] = max(0.0, self.exposure.get(symbol, 0.0) - 2 * lot)
+
+    # Цикл закрыт: освобождение объёма, PnL за сутки и глубина мартингейла
+    def closed(self, symbol, lot, pnl, lost_both) -> None:
+        with self._lock:
+            self.exposure[symbol] = max(0.0, self.exposure.get(symbol, 0.0) - 2 * lot)
+            self._roll_day()
+            self.day_pnl += pnl
+            self.depth[symbol] = self.depth.get(symbol, 0) + 1 if lost_both else 0
@@ -0,0 +1,157 @@
+import time
+import hmac
+import hashlib
+import threading
+from collections import deque
+
+from binance.exceptions import BinanceAPIException
+
+import metrics
+from eventlog import log_event
+
+
+# Код ошибки биржи: timestamp вне recvWindow или впереди времени сервера
+TIMESTAMP_ERROR = -1021
+
+
+# Оценка времени сервера: смещение от локальных часов по замерам /time и линейный дрейф.
+# Замер - середина интервала запроса; при подгонке прямой замеры с большим RTT весят меньше
+class ServerClock:
+    def __init__(self, fetch_server_time, interval=300, samples=8, log=None):
+        self.fetch_server_time = fetch_server_time
+        self.log = log
+        self.interval = interval
+        self.samples = deque(maxlen=samples)
+        # Смещение (мс) в момент reference (с) и дрейф (мс в секунду)
+        self.offset = 0.0
+        self.drift = 0.0
+        self.reference = time.time()
+        self.rtt = None
+        self.syncs = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Один замер /time и пересчёт модели
+    def sync(self) -> float:
+        sent = time.time()
+        server = self.fetch_server_time()
+        received = time.time()
+        local = (sent + received) / 2
+        with self._lock:
+            self.samples.append((local, server - local * 1000, (received - sent) * 1000))
+            self._fit()
+            self.syncs += 1
+        return self.offset
+
+    def _fit(self) -> None:
+        weights = [1 / (rtt + 1) for _, _, rtt in self.samples]
+        total = sum(weights)
+        mean_time = sum(w * local for w, (local, _, _) in zip(weights, self.samples)) / total
+        mean_offset = sum(w * offset for w, (_, offset, _) in zip(weights, self.samples)) / total
+        variance = sum(w * (local - mean_time) ** 2 for w, (local, _, _) in zip(weights, self.samples))
+        if len(self.samples) > 1 and variance > 0:
+            covariance = sum(w * (local - mean_time) * (offset - mean_offset) for w, (local, offset, _) in zip(weights, self.samples))
+            self.drift = covariance / variance
+        else:
+            self.drift = 0.0
+        self.reference = mean_time
+        self.offset = mean_offset
+        self.rtt = min(rtt for _, _, rtt in self.samples)
+
+    # Смещение часов сервера относительно локальных на момент now (мс)
+    def offset_at(self, now) -> float:
+        return self.offset + self.drift * (now - self.reference)
+
+    # timestamp для подписанного запроса - оценка времени сервера, мс
+    def timestamp(self) -> int:
+        now = time.time()
+        return int(now * 1000 + self.offset + self.drift * (now - self.reference))
+
+    def start(self) -> None:
+        try:
+            self.sync()
+        except Exception as ex:
+            log_event(self.log, 'clock_error', 'Ошибка синхронизации времени:', ex, error=repr(ex))
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sync()
+            except Exception as ex:
+                log_event(self.log, 'clock_error', 'Ошибка синхронизации времени:', ex, error=repr(ex))
+
+
+# HMAC-SHA256 с заранее подготовленным ключом: состояние после ipad/opad считается один раз,
+# на запрос - copy() и хеширование только строки параметров
+class FastSigner:
+    def __init__(self, secret):
+        self._base = hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha256)
+
+    def sign(self, payload) -> str:
+        mac = self._base.copy()
+        mac.update(payload.encode('utf-8'))
+        return mac.hexdigest()
+
+
+# Замена BaseClient._get_request_kwargs python-binance: параметры сортируются и переводятся
+# в строки один раз, строка запроса собирается один раз и для подписи, и для GET,
+# timestamp - по ServerClock вместо локальных часов
+def fast_request_kwargs(client, signer, clock):
+    def get_request_kwargs(method, signed, force_params=False, **kwargs):
+        kwargs['timeout'] = client.REQUEST_TIMEOUT
+        if client._requests_params:
+            kwargs.update(client._requests_params)
+
+        data = kwargs.get('data')
+        if isinstance(data, dict) and 'requests_params' in data:
+            kwargs.update(data.pop('requests_params'))
+
+        query = None
+        if signed:
+            data = data if isinstance(data, dict) else {}
+            data['timestamp'] = clock.timestamp()
+            params = sorted((key, str(value)) for key, value in data.items() if value is not None and key != 'signature')
+            query = '&'.join(f'{key}={value}' for key, value in params)
+            signature = signer.sign(query)
+            params.append(('signature', signature))
+            query += '&signature=' + signature
+            kwargs['data'] = params
+        elif data:
+            params = sorted((key, str(value)) for key, value in data.items() if value is not None)
+            kwargs['data'] = params
+
+        if kwargs.get('data') and (method == 'get' or force_params):
+            kwargs['params'] = query if query is not None else '&'.join(f'{key}={value}' for key, value in kwargs['data'])
+            del kwargs['data']
+        return kwargs
+
+    return get_request_kwargs
+
+
+# Подключение быстрой подписи к клиенту python-binance (только HMAC-ключи; RSA остаётся как есть).
+# Ответ -1021 считается в metrics, часы сразу синхронизируются, и запрос повторяется один раз
+def install(client, clock, market) -> None:
+    if client.PRIVATE_KEY or not client.API_SECRET:
+        return
+    client._get_request_kwargs = fast_request_kwargs(client, FastSigner(client.API_SECRET), clock)
+    request = client._request
+
+    def timed_request(method, uri, signed, force_params=False, **kwargs):
+        try:
+            return request(method, uri, signed, force_params, **kwargs)
+        except BinanceAPIException as ex:
+            if not signed or ex.code != TIMESTAMP_ERROR:
+                raise
+            metrics.TIMESTAMP_REJECTS.inc(market)
+            clock.sync()
+            return request(method, uri, signed, force_params, **kwargs)
+
+    client._request = timed_request
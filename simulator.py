@@ -0,0 +1,669 @@
+import json
+import time
+import random
+import threading
+import itertools
+from types import SimpleNamespace
+from dataclasses import dataclass
+
+
+# Ошибка в формате клиента python-binance, чтобы скрипты обрабатывали её как настоящую
+def api_error(code, message):
+    try:
+        from binance.exceptions import BinanceAPIException
+    except ImportError:
+        return SimulatedAPIError(code, message)
+    return BinanceAPIException(None, 400, json.dumps({'code': code, 'msg': message}))
+
+
+class SimulatedAPIError(Exception):
+    def __init__(self, code, message):
+        super().__init__(f'APIError(code={code}): {message}')
+        self.code = code
+        self.message = message
+
+
+def _float(value, default=None):
+    return default if value is None else float(value)
+
+
+@dataclass(eq=False)
+class SimOrder:
+    order_id: int
+    symbol: str
+    side: str
+    type: str
+    quantity: float = 0.0
+    price: float = 0.0
+    stop_price: float = 0.0
+    position_side: str = 'BOTH'
+    close_position: bool = False
+    activation_price: float = None
+    callback_rate: float = 0.0
+    order_list_id: int = -1
+    status: str = 'NEW'
+    executed_qty: float = 0.0
+    avg_price: float = 0.0
+    extreme: float = None
+    time: int = 0
+    commission: float = 0.0
+    realized: float = 0.0
+
+    # Сделки ордера в формате /fapi/v1/userTrades и /api/v3/myTrades (одна на исполненный ордер)
+    def trades(self, quote_asset) -> list:
+        if not self.executed_qty:
+            return []
+        return [{
+            'symbol': self.symbol, 'id': self.order_id, 'orderId': self.order_id, 'side': self.side, 'isBuyer': self.side == 'BUY',
+            'price': str(self.avg_price), 'qty': str(self.executed_qty), 'realizedPnl': str(self.realized),
+            'commission': str(self.commission), 'commissionAsset': quote_asset, 'time': self.time, 'positionSide': self.position_side,
+        }]
+
+    def to_dict(self) -> dict:
+        return {
+            'orderId': self.order_id,
+            'orderListId': self.order_list_id,
+            'symbol': self.symbol,
+            'side': self.side,
+            'type': self.type,
+            'status': self.status,
+            'price': str(self.price),
+            'stopPrice': str(self.stop_price),
+            'origQty': str(self.quantity),
+            'executedQty': str(self.executed_qty),
+            'avgPrice': str(self.avg_price),
+            'positionSide': self.position_side,
+            'closePosition': self.close_position,
+            'updateTime': self.time,
+        }
+
+
+# Цены одного символа из записанной ленты
+class SymbolFeed:
+    def __init__(self, symbol, prices, base_asset, quote_asset, tick_size, step_size, min_notional, times=None):
+        self.symbol = symbol
+        self.prices = prices
+        # Время тиков ленты в мс, для воспроизведения в темпе записи
+        self.times = times
+        self.index = 0
+        self.price = float(prices[0])
+        self.base_asset = base_asset
+        self.quote_asset = quote_asset
+        self.tick_size = tick_size
+        self.step_size = step_size
+        self.min_notional = min_notional
+
+    # Лента зацикливается, чтобы длинные прогоны не останавливались
+    def advance(self) -> float:
+        self.index = (self.index + 1) % len(self.prices)
+        self.price = float(self.prices[self.index])
+        return self.price
+
+    # Пауза до следующего тика по времени записи, мс (0 на стыке зацикленной ленты)
+    def gap(self) -> float:
+        if self.times is None:
+            return 0.0
+        return max(0.0, float(self.times[(self.index + 1) % len(self.times)] - self.times[self.index]))
+
+
+# Локальная биржа: сопоставление ордеров фьючерсов (MARKET, LIMIT, TAKE_PROFIT_MARKET, STOP_MARKET,
+# TRAILING_STOP_MARKET, хедж-режим) или спота (OCO) по записанной ленте цен.
+# События исполнения рассылаются слушателям в том же виде, что и поток пользовательских данных.
+class SimulatedExchange:
+    def __init__(self, feeds, futures=True, balance=10000.0, maker_fee=0.0002, taker_fee=0.0004, latency=0.0, jitter=0.0):
+        self.feeds = {feed.symbol: feed for feed in feeds}
+        self.futures = futures
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.latency = latency
+        self.jitter = jitter
+        self.balances = {}
+        for feed in feeds:
+            self.balances.setdefault(feed.quote_asset, balance)
+            self.balances.setdefault(feed.base_asset, 0.0)
+        self.positions = {}
+        self.orders = {}
+        self.open_orders = {}
+        self.listeners = []
+        self.ticks = 0
+        self.update_id = 1
+
+        self._ids = itertools.count(1)
+        self._list_ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._thread = None
+        self._stop = threading.Event()
+
+        self.client = FuturesSimClient(self) if futures else SpotSimClient(self)
+        self.user_stream = SimulatedUserStream(self)
+        self.order_books = SimulatedOrderBooks(self)
+        self.price_feed = SimulatedPriceFeed(self)
+
+    # Лента из файла backtest.load_prices (CSV, Parquet, .npz); символ задаётся как SYMBOL=путь
+    @classmethod
+    def from_spec(cls, spec, futures=True, **kwargs):
+        from backtest import load_prices
+
+        feeds = []
+        for item in spec.split(','):
+            symbol, _, path = item.partition('=')
+            if not path:
+                symbol, path = 'BTCUSDT', symbol
+            quote = next((q for q in ('USDT', 'BUSD', 'USDC', 'BTC') if symbol.endswith(q)), 'USDT')
+            series = load_prices(path)
+            feeds.append(SymbolFeed(symbol, series.close, symbol[:-len(quote)], quote, 0.1, 0.001, 5.0, series.times))
+        return cls(feeds, futures=futures, **kwargs)
+
+    def now(self) -> int:
+        return int(time.time() * 1000)
+
+    # Запуск ленты в фоне: interval секунд между тиками (0 - максимально быстро).
+    # speed - темп по времени записи первой ленты: 1 - реальное время, 10 - в десять раз быстрее
+    def start(self, interval=0.0, speed=None) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval, speed), daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self, interval, speed=None) -> None:
+        pace = next(iter(self.feeds.values())) if speed else None
+        while not self._stop.is_set():
+            delay = pace.gap() / 1000 / speed if pace else interval
+            self.step()
+            if delay:
+                time.sleep(delay)
+            else:
+                time.sleep(0)
+
+    def step(self) -> None:
+        events = []
+        with self._lock:
+            self.ticks += 1
+            self.update_id += 1
+            for feed in self.feeds.values():
+                feed.advance()
+            for order in list(self.open_orders.values()):
+                events += self._check(order)
+        self._emit(events)
+
+    def _emit(self, events) -> None:
+        for event in events:
+            for listener in list(self.listeners):
+                listener(event)
+
+    def _feed(self, symbol) -> SymbolFeed:
+        feed = self.feeds.get(symbol)
+        if feed is None:
+            raise api_error(-1121, 'Invalid symbol.')
+        return feed
+
+    # Проверка условия исполнения или срабатывания открытого ордера по текущей цене
+    def _check(self, order) -> list:
+        price = self.feeds[order.symbol].price
+        buy = order.side == 'BUY'
+        # closePosition без открытой позиции ждёт исполнения входа, а не истекает
+        if order.close_position and self.positions.get((order.symbol, order.position_side), (0.0,))[0] <= 0:
+            return []
+        if order.type == 'MARKET':
+            return self._fill(order, price, maker=False)
+        if order.type == 'LIMIT':
+            if (buy and price <= order.price) or (not buy and price >= order.price):
+                return self._fill(order, order.price, maker=True)
+        elif order.type == 'LIMIT_MAKER':
+            if (buy and price <= order.price) or (not buy and price >= order.price):
+                return self._fill(order, order.price, maker=True)
+        elif order.type == 'STOP_LOSS_LIMIT':
+            if (buy and price >= order.stop_price) or (not buy and price <= order.stop_price):
+                return self._fill(order, order.price, maker=False)
+        elif order.type == 'STOP_MARKET':
+            if (buy and price >= order.stop_price) or (not buy and price <= order.stop_price):
+                return self._fill(order, price, maker=False)
+        elif order.type == 'TAKE_PROFIT_MARKET':
+            if (buy and price <= order.stop_price) or (not buy and price >= order.stop_price):
+                return self._fill(order, price, maker=False)
+        elif order.type == 'TRAILING_STOP_MARKET':
+            if order.extreme is None:
+                if order.activation_price is None or (buy and price <= order.activation_price) or (not buy and price >= order.activation_price):
+                    order.extreme = price
+                return []
+            rate = order.callback_rate / 100
+            if buy:
+                order.extreme = min(order.extreme, price)
+                if price >= order.extreme * (1 + rate):
+                    return self._fill(order, price, maker=False)
+            else:
+                order.extreme = max(order.extreme, price)
+                if price <= order.extreme * (1 - rate):
+                    return self._fill(order, price, maker=False)
+        return []
+
+    def _would_trigger(self, order) -> bool:
+        price = self.feeds[order.symbol].price
+        buy = order.side == 'BUY'
+        if order.type == 'STOP_MARKET':
+            return (buy and price >= order.stop_price) or (not buy and price <= order.stop_price)
+        if order.type == 'TAKE_PROFIT_MARKET':
+            return (buy and price <= order.stop_price) or (not buy and price >= order.stop_price)
+        return False
+
+    def _fill(self, order, price, maker) -> list:
+        feed = self.feeds[order.symbol]
+        events = []
+        if self.futures:
+            position = self.positions.setdefault((order.symbol, order.position_side), [0.0, 0.0])
+            quantity = position[0] if order.close_position else order.quantity
+            if quantity <= 0:
+                return self._finish(order, 'EXPIRED')
+            closing = (order.position_side == 'LONG') == (order.side == 'SELL')
+            realized = 0.0
+            if closing:
+                quantity = min(quantity, position[0])
+                direction = 1 if order.position_side == 'LONG' else -1
+                realized = direction * quantity * (price - position[1])
+                position[0] -= quantity
+            else:
+                position[1] = (position[0] * position[1] + quantity * price) / (position[0] + quantity)
+                position[0] += quantity
+            commission = quantity * price * (self.maker_fee if maker else self.taker_fee)
+            self.balances[feed.quote_asset] += realized - commission
+        else:
+            quantity = order.quantity
+            commission = quantity * price * (self.maker_fee if maker else self.taker_fee)
+            realized = 0.0
+            sign = 1 if order.side == 'BUY' else -1
+            self.balances[feed.base_asset] += sign * quantity
+            self.balances[feed.quote_asset] -= sign * quantity * price + commission
+
+        order.executed_qty = quantity
+        order.avg_price = price
+        order.commission = commission
+        order.realized = realized
+        order.status = 'FILLED'
+        order.time = self.now()
+        self.open_orders.pop(order.order_id, None)
+        events.append(self._order_event(order, quantity, price, commission, realized, maker))
+        events.append(self._account_event(feed))
+
+        # Вторая нога OCO отменяется биржей
+        if order.order_list_id >= 0:
+            for other in list(self.open_orders.values()):
+                if other.order_list_id == order.order_list_id:
+                    events += self._finish(other, 'CANCELED')
+        return events
+
+    def _finish(self, order, status) -> list:
+        order.status = status
+        order.time = self.now()
+        self.open_orders.pop(order.order_id, None)
+        return [self._order_event(order, 0.0, 0.0, 0.0, 0.0, False)]
+
+    def _order_event(self, order, last_qty, last_price, commission, realized, maker) -> dict:
+        feed = self.feeds[order.symbol]
+        now = self.now()
+        if self.futures:
+            return {
+                'e': 'ORDER_TRADE_UPDATE', 'E': now, 'T': now,
+                'o': {
+                    's': order.symbol, 'i': order.order_id, 'S': order.side, 'o': order.type, 'ot': order.type,
+                    'X': order.status, 'x': 'TRADE' if last_qty else order.status,
+                    'q': str(order.quantity), 'p': str(order.price), 'sp': str(order.stop_price), 'ap': str(order.avg_price),
+                    'l': str(last_qty), 'z': str(order.executed_qty), 'L': str(last_price),
+                    'n': str(commission), 'N': feed.quote_asset, 'm': maker, 'rp': str(realized),
+                    'ps': order.position_side, 'cp': order.close_position, 'T': now,
+                },
+            }
+        return {
+            'e': 'executionReport', 'E': now, 's': order.symbol, 'i': order.order_id, 'g': order.order_list_id,
+            'S': order.side, 'o': order.type, 'X': order.status, 'x': 'TRADE' if last_qty else order.status,
+            'q': str(order.quantity), 'p': str(order.price), 'P': str(order.stop_price),
+            'l': str(last_qty), 'z': str(order.executed_qty), 'L': str(last_price),
+            'n': str(commission), 'N': feed.quote_asset, 'm': maker, 'T': now,
+        }
+
+    def _account_event(self, feed) -> dict:
+        now = self.now()
+        if self.futures:
+            positions = [
+                {'s': symbol, 'ps': side, 'pa': str(qty if side == 'LONG' else -qty), 'ep': str(entry)}
+                for (symbol, side), (qty, entry) in self.positions.items() if symbol == feed.symbol
+            ]
+            balance = str(self.balances[feed.quote_asset])
+            return {'e': 'ACCOUNT_UPDATE', 'E': now, 'T': now, 'a': {'m': 'ORDER', 'B': [{'a': feed.quote_asset, 'wb': balance, 'cw': balance}], 'P': positions}}
+        return {
+            'e': 'outboundAccountPosition', 'E': now, 'u': now,
+            'B': [{'a': asset, 'f': str(self.balances[asset]), 'l': '0'} for asset in (feed.base_asset, feed.quote_asset)],
+        }
+
+    def place(self, symbol, side, type, quantity=0.0, price=0.0, stop_price=0.0, position_side='BOTH', close_position=False, activation_price=None, callback_rate=0.0, order_list_id=-1) -> SimOrder:
+        feed = self._feed(symbol)
+        order = SimOrder(
+            next(self._ids), symbol, side, type, quantity, price, stop_price, position_side, close_position,
+            activation_price, callback_rate, order_list_id, time=self.now(),
+        )
+        if not close_position and quantity <= 0:
+            raise api_error(-4003, 'Quantity less than or equal to zero.')
+        if type == 'TRAILING_STOP_MARKET' and not 0.1 <= callback_rate <= 5:
+            raise api_error(-2007, 'Invalid callBack rate.')
+        if self._would_trigger(order):
+            raise api_error(-2021, 'Order would immediately trigger.')
+        if type in ('LIMIT', 'LIMIT_MAKER') and quantity * price < feed.min_notional:
+            raise api_error(-1013, 'Filter failure: NOTIONAL')
+        self.orders[order.order_id] = order
+        self.open_orders[order.order_id] = order
+        return order
+
+    def get(self, symbol, order_id) -> SimOrder:
+        order = self.orders.get(int(order_id))
+        if order is None or order.symbol != symbol:
+            raise api_error(-2013, 'Order does not exist.')
+        return order
+
+    def cancel(self, symbol, order_id) -> SimOrder:
+        events = []
+        with self._lock:
+            order = self.get(symbol, order_id)
+            if order.status != 'NEW':
+                raise api_error(-2011, 'Unknown order sent.')
+            events += self._finish(order, 'CANCELED')
+            if order.order_list_id >= 0:
+                for other in list(self.open_orders.values()):
+                    if other.order_list_id == order.order_list_id:
+                        events += self._finish(other, 'CANCELED')
+        self._emit(events)
+        return order
+
+    def cancel_all(self, symbol) -> None:
+        events = []
+        with self._lock:
+            for order in list(self.open_orders.values()):
+                if order.symbol == symbol:
+                    events += self._finish(order, 'CANCELED')
+        self._emit(events)
+
+    # Ордер может исполниться сразу (например, LIMIT по текущей цене)
+    def submit(self, **params) -> SimOrder:
+        with self._lock:
+            order = self.place(**params)
+            events = self._check(order)
+        self._emit(events)
+        return order
+
+    def depth(self, symbol) -> dict:
+        feed = self._feed(symbol)
+        half = feed.tick_size / 2
+        return {
+            'lastUpdateId': self.update_id,
+            'bids': [[str(feed.price - half), '10']],
+            'asks': [[str(feed.price + half), '10']],
+        }
+
+    def exchange_info(self) -> dict:
+        symbols = []
+        for feed in self.feeds.values():
+            symbols.append({
+                'symbol': feed.symbol, 'baseAsset': feed.base_asset, 'quoteAsset': feed.quote_asset,
+                'filters': [
+                    {'filterType': 'PRICE_FILTER', 'tickSize': str(feed.tick_size), 'minPrice': '0', 'maxPrice': '0'},
+                    {'filterType': 'LOT_SIZE', 'stepSize': str(feed.step_size), 'minQty': str(feed.step_size)},
+                    {'filterType': 'MIN_NOTIONAL', 'notional': str(feed.min_notional), 'minNotional': str(feed.min_notional)},
+                ],
+            })
+        return {'symbols': symbols}
+
+
+# Базовый клиент: задержка на каждый вызов и заглушки, которые ожидают transport и rate_limit
+class _SimClient:
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.session = SimpleNamespace(hooks={'response': []}, mount=lambda *args: None)
+        self.calls = 0
+
+    # rate_limit.install оборачивает _request; методы симулятора его не вызывают
+    def _request(self, method, uri, signed, force_params=False, **kwargs):
+        raise RuntimeError('Симулятор не выполняет HTTP-запросы')
+
+    def _api(self) -> None:
+        self.calls += 1
+        if self.exchange.latency or self.exchange.jitter:
+            time.sleep(self.exchange.latency + random.uniform(0, self.exchange.jitter))
+
+
+# Методы python-binance Client, которые использует futures.py
+class FuturesSimClient(_SimClient):
+    def futures_mark_price(self, symbol):
+        self._api()
+        return {'symbol': symbol, 'markPrice': str(self.exchange._feed(symbol).price)}
+
+    def futures_trade_fee(self, symbol):
+        self._api()
+        return {'tradeFee': [{'symbol': symbol, 'maker': self.exchange.maker_fee, 'taker': self.exchange.taker_fee}]}
+
+    def futures_exchange_info(self):
+        self._api()
+        return self.exchange.exchange_info()
+
+    def futures_order_book(self, symbol, limit=100):
+        self._api()
+        return self.exchange.depth(symbol)
+
+    def futures_account_balance(self):
+        self._api()
+        return [{'asset': asset, 'balance': str(balance)} for asset, balance in self.exchange.balances.items()]
+
+    def _order_params(self, params) -> dict:
+        return {
+            'symbol': params['symbol'],
+            'side': params['side'],
+            'type': params['type'],
+            'quantity': _float(params.get('quantity'), 0.0),
+            'price': _float(params.get('price'), 0.0),
+            'stop_price': _float(params.get('stopPrice'), 0.0),
+            'position_side': params.get('positionSide', 'BOTH'),
+            'close_position': str(params.get('closePosition', 'false')).lower() == 'true',
+            'activation_price': _float(params.get('activationPrice')),
+            'callback_rate': _float(params.get('callbackRate'), 0.0),
+        }
+
+    def futures_create_order(self, **params):
+        self._api()
+        return self.exchange.submit(**self._order_params(params)).to_dict()
+
+    def futures_place_batch_order(self, batchOrders):
+        self._api()
+        results = []
+        for params in batchOrders:
+            try:
+                results.append(self.exchange.submit(**self._order_params(params)).to_dict())
+            except Exception as ex:
+                results.append({'code': getattr(ex, 'code', -1000), 'msg': getattr(ex, 'message', str(ex))})
+        return results
+
+    def futures_get_order(self, symbol, orderId):
+        self._api()
+        with self.exchange._lock:
+            return self.exchange.get(symbol, orderId).to_dict()
+
+    def futures_account_trades(self, symbol, orderId=None):
+        self._api()
+        with self.exchange._lock:
+            orders = [self.exchange.get(symbol, orderId)] if orderId is not None else [order for order in self.exchange.orders.values() if order.symbol == symbol]
+            return [trade for order in orders for trade in order.trades(self.exchange._feed(symbol).quote_asset)]
+
+    def futures_position_information(self, symbol=None):
+        self._api()
+        with self.exchange._lock:
+            return [{'symbol': name, 'positionSide': side, 'positionAmt': str(qty if side == 'LONG' else -qty), 'entryPrice': str(entry)}
+                    for (name, side), (qty, entry) in self.exchange.positions.items() if symbol is None or name == symbol]
+
+    def futures_cancel_order(self, symbol, orderId):
+        self._api()
+        return self.exchange.cancel(symbol, orderId).to_dict()
+
+    def futures_cancel_all_open_orders(self, symbol):
+        self._api()
+        self.exchange.cancel_all(symbol)
+        return {'code': 200, 'msg': 'The operation of cancel all open order is done.'}
+
+    def futures_stream_get_listen_key(self):
+        return 'simulated'
+
+    def futures_stream_keepalive(self, listenKey):
+        return {}
+
+
+# Методы python-binance Client, которые использует spot.py
+class SpotSimClient(_SimClient):
+    def get_symbol_ticker(self, symbol):
+        self._api()
+        return {'symbol': symbol, 'price': str(self.exchange._feed(symbol).price)}
+
+    def get_trade_fee(self, symbol):
+        self._api()
+        return [{'symbol': symbol, 'makerCommission': str(self.exchange.maker_fee), 'takerCommission': str(self.exchange.taker_fee)}]
+
+    def get_exchange_info(self):
+        self._api()
+        return self.exchange.exchange_info()
+
+    def get_order_book(self, symbol, limit=100):
+        self._api()
+        return self.exchange.depth(symbol)
+
+    def get_account(self):
+        self._api()
+        return {'balances': [{'asset': asset, 'free': str(balance), 'locked': '0'} for asset, balance in self.exchange.balances.items()]}
+
+    def get_asset_balance(self, asset):
+        self._api()
+        return {'asset': asset, 'free': str(self.exchange.balances.get(asset, 0.0)), 'locked': '0'}
+
+    # OCO: orderReports[0] - STOP_LOSS_LIMIT, orderReports[1] - LIMIT_MAKER, как ожидает spot.py
+    def _oco(self, side, symbol, quantity, price, stopPrice, stopLimitPrice, **params):
+        self._api()
+        exchange = self.exchange
+        quantity, price, stop_price, stop_limit = float(quantity), float(price), float(stopPrice), float(stopLimitPrice)
+        with exchange._lock:
+            current = exchange._feed(symbol).price
+            if (side == 'SELL' and not price > current > stop_price) or (side == 'BUY' and not price < current < stop_price):
+                raise api_error(-2010, 'The relationship of the prices for the orders is not correct.')
+            list_id = next(exchange._list_ids)
+            stop = exchange.place(symbol, side, 'STOP_LOSS_LIMIT', quantity, stop_limit, stop_price, order_list_id=list_id)
+            take = exchange.place(symbol, side, 'LIMIT_MAKER', quantity, price, order_list_id=list_id)
+        reports = [stop.to_dict(), take.to_dict()]
+        return {
+            'orderListId': list_id, 'symbol': symbol, 'listOrderStatus': 'EXECUTING',
+            'orders': [{'symbol': symbol, 'orderId': report['orderId']} for report in reports],
+            'orderReports': reports,
+        }
+
+    def order_oco_sell(self, **params):
+        return self._oco('SELL', **params)
+
+    def order_oco_buy(self, **params):
+        return self._oco('BUY', **params)
+
+    def get_order(self, symbol, orderId):
+        self._api()
+        with self.exchange._lock:
+            return self.exchange.get(symbol, orderId).to_dict()
+
+    def get_my_trades(self, symbol, orderId=None):
+        self._api()
+        with self.exchange._lock:
+            orders = [self.exchange.get(symbol, orderId)] if orderId is not None else [order for order in self.exchange.orders.values() if order.symbol == symbol]
+            return [trade for order in orders for trade in order.trades(self.exchange._feed(symbol).quote_asset)]
+
+    def cancel_order(self, symbol, orderId):
+        self._api()
+        return self.exchange.cancel(symbol, orderId).to_dict()
+
+    def get_open_oco_orders(self):
+        self._api()
+        lists = {}
+        with self.exchange._lock:
+            for order in self.exchange.open_orders.values():
+                if order.order_list_id >= 0:
+                    entry = lists.setdefault(order.order_list_id, {'orderListId': order.order_list_id, 'symbol': order.symbol, 'orders': []})
+                    entry['orders'].append({'symbol': order.symbol, 'orderId': order.order_id})
+        return list(lists.values())
+
+    def stream_get_listen_key(self):
+        return 'simulated'
+
+    def stream_keepalive(self, listenKey):
+        return {}
+
+
+# Замена UserDataStream: события биржи доставляются слушателям напрямую, без websocket
+class SimulatedUserStream:
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.listeners = []
+        self.connected = False
+
+    def add_listener(self, listener) -> None:
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def _dispatch(self, event) -> None:
+        for listener in self.listeners:
+            listener.on_message(event)
+
+    def start(self) -> None:
+        if self.connected:
+            return
+        self.exchange.listeners.append(self._dispatch)
+        self.connected = True
+        for listener in self.listeners:
+            if hasattr(listener, 'on_connect'):
+                listener.on_connect()
+
+    def stop(self) -> None:
+        if self._dispatch in self.exchange.listeners:
+            self.exchange.listeners.remove(self._dispatch)
+        self.connected = False
+
+
+# Замена OrderBookManager: лучшие цены берутся прямо из ленты
+class SimulatedOrderBooks:
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def add_symbol(self, symbol) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def spread(self, symbol) -> float:
+        return self.exchange._feed(symbol).tick_size
+
+
+# Замена PriceService: котировка всегда свежая и равна текущей цене ленты
+class SimulatedPriceFeed:
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def add_symbol(self, symbol) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def quote(self, symbol, max_age=None):
+        from prices import Quote
+
+        feed = self.exchange._feed(symbol)
+        return Quote(feed.price, feed.price - feed.tick_size / 2, feed.price + feed.tick_size / 2, time.monotonic())
+
+    def price(self, symbol, max_age=None) -> float:
+        return self.exchange._feed(symbol).price
+
+    def staleness(self, symbol) -> float:
+        return 0.0
@@ -1,343 +1,187 @@
 import os
-import time
-import threading
-import tkinter as tk
-
-from binance.client import Client
-from binance.enums import *
-from binance.exceptions import *
-from dotenv import load_dotenv
-from art import tprint
-
-load_dotenv()
-
-api_key = os.getenv('API_KEY_BINANCE')
-api_secret = os.getenv('API_SECRET_BINANCE')
-
-if os.getenv('TESTNET').lower() == 'true':
-    tesntet = True
-elif os.getenv('TESTNET').lower() == 'false':
-    tesntet = False
-
-client = Client(api_key, api_secret, testnet=tesntet)
-
-# Получение текущей цены
-def get_current_price(symbol) -> float:
-    prices = client.get_symbol_ticker(symbol=symbol)
-    return float(prices['price'])
-
-def check_fee(symbol) -> float:
-    fee = client.get_trade_fee(symbol=symbol)
-    return float(fee[0]['makerCommission'])
-
-# Размещение ордера
-def place_order(side, lot, current_price, symbol, take_profit, stop_loss, orders, trailing_stop, trail_distance_percent, trailing_limit) -> None:
-    take_profit_price = current_price - take_profit if side == 'SHORT' else current_price + take_profit
-    stop_loss_price = current_price - stop_loss if side == 'LONG' else current_price + stop_loss
-
-    trailing_limit = round(current_price*(1+(trailing_limit/100)), 2) if side == 'LONG' else round(current_price/(1+(trailing_limit/100)), 2)
-    price = trailing_limit if trailing_stop else take_profit_price
-
-    quantity_oco_long = round(lot/stop_loss_price, 5)
-    quantity_oco_short = round(lot/take_profit_price, 5)
-    order = None
-    print(take_profit_price, stop_loss_price, current_price, side)
-    try:
+import sys
+
+from binance.exceptions import BinanceAPIException
+
+import metrics
+from streams import SPOT_COMBINED_URL, SPOT_TESTNET_COMBINED_URL
+from rate_limit import SPOT_WEIGHT_LIMIT, SPOT_ORDER_LIMITS
+from strategy import leg_prices, activation_price
+from account import Fill, cycle_pnl
+from market import MarketAdapter, Placement, testnet_from_env
+from order_tracker import SPOT_STREAM_URL, SPOT_TESTNET_STREAM_URL
+
+
+# Спот: каждая сторона - один OCO (лимитный тейк и стоп-лимит), вторую ногу OCO
+# биржа отменяет сама, поэтому cancel_sibling не нужен
+class SpotAdapter(MarketAdapter):
+    name = 'spot'
+    futures = False
+    weight_limit = SPOT_WEIGHT_LIMIT
+    order_limits = SPOT_ORDER_LIMITS
+    key_env = 'API_KEY_BINANCE'
+    secret_env = 'API_SECRET_BINANCE'
+    combined_url = SPOT_COMBINED_URL
+    testnet_combined_url = SPOT_TESTNET_COMBINED_URL
+    stream_url = SPOT_STREAM_URL
+    testnet_stream_url = SPOT_TESTNET_STREAM_URL
+    final_statuses = ('FILLED',)
+    price_method = 'get_symbol_ticker'
+    price_field = 'price'
+    reprice_errors = ('The relationship of the prices for the orders is not correct',)
+    # Доля стопа между триггером и ценой стоп-лимита
+    stop_trigger_share = 0.05
+
+    def exchange_info(self) -> dict:
+        return self.client.get_exchange_info()
+
+    def order_book(self, symbol, limit) -> dict:
+        return self.client.get_order_book(symbol=symbol, limit=limit)
+
+    def server_time(self) -> int:
+        return self.client.get_server_time()['serverTime']
+
+    def load_balances(self) -> dict:
+        return {entry['asset']: float(entry['free']) for entry in self.client.get_account()['balances']}
+
+    def get_listen_key(self) -> str:
+        return self.client.stream_get_listen_key()
+
+    def keepalive(self, listen_key) -> None:
+        self.client.stream_keepalive(listen_key)
+
+    def get_order(self, symbol, order_id) -> dict:
+        return self.client.get_order(symbol=symbol, orderId=order_id)
+
+    def check_fee(self, symbol) -> float:
+        fee = self.client.get_trade_fee(symbol=symbol)
+        return float(fee[0]['makerCommission'])
+
+    def order_fills(self, symbol, order_id) -> list:
+        return [Fill(trade['symbol'], trade['orderId'], 'BUY' if trade['isBuyer'] else 'SELL', float(trade['qty']), float(trade['price']),
+                     float(trade['commission']), trade['commissionAsset'], time=trade['time'])
+                for trade in self.client.get_my_trades(symbol=symbol, orderId=order_id)]
+
+    # Закрытие OCO символа
+    def close_orders(self, symbol) -> None:
+        try:
+            for order in self.client.get_open_oco_orders():
+                if order['symbol'] == symbol:
+                    result = self.client.cancel_order(symbol=symbol, orderId=order['orders'][0]['orderId'])
+                    self.log.event('orders_canceled', "Ордер отменён", result['orderListId'], symbol=symbol, order_list_id=result['orderListId'])
+        except Exception as ex:
+            self.log.event('cancel_error', 'Ошибка при закрытии ордеров:', ex, symbol=symbol, error=str(ex))
+
+    # Цены OCO стороны от цены входа, округлённые к tickSize: тейк (или цена активации трейлинга),
+    # триггер стопа и стоп-лимит. Триггер отстоит от стоп-лимита на stop_trigger_share от стопа,
+    # но не меньше одного tickSize
+    def oco_prices(self, side, symbol, current_price, settings) -> tuple:
+        take_profit_price, stop_loss_price = (self.symbols.round_price(symbol, price) for price in leg_prices(side, current_price, settings.take, settings.loss))
+        trailing_price = self.symbols.round_price(symbol, activation_price(side, current_price, settings.trailing_limit))
+        price = trailing_price if settings.trailing_stop else take_profit_price
+        offset = max(self.symbols.get(symbol)['tickSize'], settings.loss * self.stop_trigger_share)
+        stop_price = self.symbols.round_price(symbol, stop_loss_price + offset if side == 'LONG' else stop_loss_price - offset)
+        return take_profit_price, price, stop_price, stop_loss_price
+
+    # Условие биржи для OCO: SELL - тейк > цены > триггера стопа, BUY - наоборот.
+    # Проверяется по лучшим ценам котировки, чтобы запас был и на спред
+    @staticmethod
+    def oco_valid(side, price, stop_price, quote) -> bool:
         if side == 'LONG':
-            order = client.order_oco_sell(
-                symbol=symbol,
-                quantity=quantity_oco_long,
-                price= price, 
-                stopPrice=stop_loss_price + 5,
-                stopLimitPrice=stop_loss_price,
-                trailingDelta = round(trail_distance_percent*100) if trailing_stop else None,
-                stopLimitTimeInForce='GTC'
-            )
-        else:
-            order = client.order_oco_buy(
-                symbol=symbol,
-                quantity=quantity_oco_short,
-                price=price,
-                stopPrice=stop_loss_price - 5,
-                stopLimitPrice=stop_loss_price,
-                trailingDelta = round(trail_distance_percent*100) if trailing_stop else None,
-                stopLimitTimeInForce='GTC'
-            )
-    except BinanceAPIException as e:
-        if 'Filter failure: NOTIONAL' == e.message:
-            print(side,"Ошибка: Увеличьте LOT")
-        elif 'Filter failure: MAX_NUM_ALGO_ORDERS' == e.message:
-            print('Превышено максимальное количество ордеров')
-        elif 'The relationship of the prices for the orders is not correct' in e.message:
-            current_price = get_current_price(symbol)
-
-            take_profit_price = current_price - take_profit if side == 'SHORT' else current_price + take_profit
-            stop_loss_price = current_price - stop_loss if side == 'LONG' else current_price + stop_loss
-
-            trailing_limit = round(current_price*(1+(trailing_limit/100)), 2) if side == 'LONG' else round(current_price/(1+(trailing_limit/100)), 2)
-            price = trailing_limit if trailing_stop else take_profit_price
-
-            quantity_oco = round(lot/current_price, 6)
+            return price > quote.ask and stop_price < quote.bid
+        return price < quote.bid and stop_price > quote.ask
+
+    # Размещение OCO стороны. orderReports[0] - стоп-лимит, orderReports[1] - лимитный тейк.
+    # Если цена уже ушла за границы OCO, цены пересчитываются от котировки из памяти до отправки
+    def submit_leg(self, side, lot, symbol, settings, current_price) -> tuple:
+        take_profit_price, price, stop_price, stop_loss_price = self.oco_prices(side, symbol, current_price, settings)
+        quote = self.price_feed.quote(symbol)
+        if quote is not None and not self.oco_valid(side, price, stop_price, quote):
+            reference = self.symbols.round_price(symbol, quote.price)
+            if reference != current_price:
+                metrics.REPRICES.inc(symbol, 'local')
+                self.log.event('order_repriced', symbol=symbol, side=side, price=reference, previous=current_price, attempt=0)
+                current_price = reference
+                take_profit_price, price, stop_price, stop_loss_price = self.oco_prices(side, symbol, current_price, settings)
+
+        quantity_oco_long = self.symbols.round_qty(symbol, lot/stop_loss_price)
+        quantity_oco_short = self.symbols.round_qty(symbol, lot/take_profit_price)
+        if min(quantity_oco_long*stop_loss_price, quantity_oco_short*take_profit_price) < self.symbols.get(symbol)['minNotional']:
+            self.log.event('order_rejected', side, "Ошибка: Увеличьте LOT", symbol=symbol, side=side, price=current_price)
+            return None, []
+        self.log.event('leg_prices', take_profit_price, stop_loss_price, current_price, side, symbol=symbol, side=side,
+                       price=current_price, take=take_profit_price, stop=stop_loss_price, stop_trigger=stop_price)
+        params = {
+            'symbol': symbol,
+            'price': price,
+            'stopPrice': stop_price,
+            'stopLimitPrice': stop_loss_price,
+            'trailingDelta': round(settings.trail_distance_percent*100) if settings.trailing_stop else None,
+            'stopLimitTimeInForce': 'GTC',
+        }
+        try:
             if side == 'LONG':
-                order = client.order_oco_sell(
-                    symbol=symbol,
-                    quantity=quantity_oco,
-                    price= price, 
-                    stopPrice=stop_loss_price + 5,
-                    stopLimitPrice=stop_loss_price,
-                    trailingDelta = round(trail_distance_percent*100) if trailing_stop else None,
-                    stopLimitTimeInForce='GTC'
-                )
+                order = self.client.order_oco_sell(quantity=quantity_oco_long, **params)
             else:
-                order = client.order_oco_buy(
-                    symbol=symbol,
-                    quantity=quantity_oco,
-                    price=price,
-                    stopPrice=stop_loss_price - 5,
-                    stopLimitPrice=stop_loss_price,
-                    trailingDelta = round(trail_distance_percent*100) if trailing_stop else None,
-                    stopLimitTimeInForce='GTC'
-                )
-        else:   
-            print("Произошла ошибка при размещении ордера:", e)
-    if order:
-        print(side, 'Take', price, 'Stop', stop_loss_price, 'ID ордеров', [order['orderId'] for order in order['orderReports']])
-    orders.append([order, side])
-
-# Закрытие ордеров
-def close_orders() -> None:
-    try:
-        open_orders = client.get_open_oco_orders()
-        for order in open_orders:
-            if order['symbol'] == symbol_entry.get():
-                result = client.cancel_order(symbol=symbol_entry.get(), orderId=order['orders'][0]['orderId'])
-                print(f"Ордер отменён", result['orderListId'])
-    except Exception as ex:
-        print('Ошибка при закрытии ордеров:', ex)
-
-def get_spread(symbol) -> float:
-    depth = client.get_order_book(symbol=symbol)
-
-    # Получите цену предложения и цену спроса из стакана
-    bid_price = float(depth['bids'][0][0])
-    ask_price = float(depth['asks'][0][0])
-
-    # Расчет спреда
-    spread = ask_price - bid_price
-    return spread
-# Основная логика скрипта
-def main(initial_lot, lot, take, loss, trailing_stop, trailing_limit, trail_distance_percent, martingale, lot_increment, symbol, start_balance, balance_currency, pnl_without) -> None:
-    current_price = get_current_price(symbol)
-
-    orders = []
-
-    # Открытие позиций
-    long_thread = threading.Thread(target=place_order, args=('LONG',lot, current_price, symbol, take, loss, orders, trailing_stop, trail_distance_percent, trailing_limit))
-    long_thread.start()
-
-    short_thread = threading.Thread(target=place_order, args=('SHORT',lot, current_price, symbol, take, loss, orders, trailing_stop, trail_distance_percent, trailing_limit))
-    short_thread.start()
-
-
-    # Ждем завершения потоков
-    long_thread.join()
-    short_thread.join()
-    
-    # Проверка на ошибки
-    for order in orders:
-        if None in order:
-            print('Ошибка при размещении ордера')
-            close_orders()
-            return 
-        elif not orders:
-            print('Ошибка при размещении ордера')
-            close_orders()
-            return
-
-    short = None
-    long = None
-
-    # Проверка на завершение ордеров
-    while True:
-        for order in orders:
-            if order[-1] == 'LONG' and long is None:
-                stop_loss_limit = client.get_order(symbol=symbol, orderId=order[0]['orderReports'][0]['orderId'])
-                limit_maker = client.get_order(symbol=symbol, orderId=order[0]['orderReports'][1]['orderId'])
-                if stop_loss_limit['status'] == 'FILLED' or stop_loss_limit['status'] == 'CANCELED':
-                    pnl_long = (float(order[0]['orderReports'][0]['price'])-current_price)*float(order[0]['orderReports'][0]['origQty'])
-                    print(order[-1],f"Ордер {stop_loss_limit['orderId']} закрыт по стоп-лимиту. Убыток:", pnl_long)
-                    long = False
-                elif limit_maker['status'] == 'FILLED' or limit_maker['status'] == 'CANCELED':
-                    pnl_long = (float(order[0]['orderReports'][1]['price'])-current_price)*float(order[0]['orderReports'][1]['origQty'])
-                    print(order[-1],f"Ордер {limit_maker['orderId']} закрыт по тэйку. Прибыль:", pnl_long)
-                    long = True
-            elif order[-1] == 'SHORT' and short is None:
-                stop_loss_limit = client.get_order(symbol=symbol, orderId=order[0]['orderReports'][0]['orderId'])
-                limit_maker = client.get_order(symbol=symbol, orderId=order[0]['orderReports'][1]['orderId'])
-                if stop_loss_limit['status'] == 'FILLED' or stop_loss_limit['status'] == 'CANCELED':
-                    pnl_short = (current_price-float(order[0]['orderReports'][0]['price']))*float(order[0]['orderReports'][0]['origQty'])
-                    print(order[-1],f"Ордер {stop_loss_limit['orderId']} закрыт по стоп-лимиту. Убыток:", pnl_short)
-                    short = False
-                elif limit_maker['status'] == 'FILLED' or limit_maker['status'] == 'CANCELED':
-                    pnl_short = (current_price-float(order[0]['orderReports'][1]['price']))*float(order[0]['orderReports'][1]['origQty'])
-                    print(order[-1],f"Ордер {limit_maker['orderId']} закрыт по тэйку. Прибыль:", pnl_short)
-                    short = True
+                order = self.client.order_oco_buy(quantity=quantity_oco_short, **params)
+        except BinanceAPIException as e:
+            return None, [('order', e.code, e.message)]
 
-        if short is not None and long is not None:
-            break
+        order_ids = [report['orderId'] for report in order['orderReports']]
+        self.log.event('leg_placed', side, 'Take', price, 'Stop', stop_loss_price, 'ID ордеров', order_ids,
+                       symbol=symbol, side=side, order_ids=order_ids, order_list_id=order.get('orderListId'), take=price, stop=stop_loss_price)
+        return Placement(side, None, order_ids[1], order_ids[0], [order]), []
 
-        time.sleep(3)
-    pnl_without += pnl_short+pnl_long
-    print('Ордера закрыты PNL с комиссией:', get_balance(balance_currency) - start_balance)
-    print('Ордера закрыты PNL без комиссии:', pnl_short+pnl_long)
-    start_balance = round(get_balance(balance_currency), 2)
-    print('Текущий баланс', start_balance)
-    print('Spread', get_spread(symbol))
-    # Закрытие ордеров
-    if martingale:
-        if not long and not short and limit_maker['status']=='FILLED' and stop_loss_limit['status']=='FILLED':
-            lot *= lot_increment
-        else:
-            lot = initial_lot
-
-    # Повторная торговля
-    if not auto_stop_var.get():
-        return main(initial_lot, lot, take, loss, trailing_stop, trailing_limit, trail_distance_percent, martingale, lot_increment, symbol, start_balance, balance_currency, pnl_without)
-    else:
-        return pnl_without
-# Получение баланса
-def get_balance(asset) -> float:
-    balance = client.get_asset_balance(asset=asset)
-    return float(balance['free'])
-
-# Функция запуска основного скрипта
-def start_trading() -> None:
-    # Получение параметров из полей ввода
-    try:
-        take = int(take_entry.get())
-        loss = int(loss_entry.get())
-
-        pnl_without=0
-
-        symbol = symbol_entry.get().strip()
-        for symbol_info in client.get_exchange_info()['symbols']:
-            if symbol_info['symbol'] == symbol:
-                balance_currency = symbol_info['quoteAsset']
-                break
-
-        if float(initial_lot_entry.get())/100*get_balance(balance_currency) <10:
-            initial_lot = 10
-        else:
-            initial_lot = float(initial_lot_entry.get())/100*get_balance(balance_currency)
-
-        print('Текущий баланс', get_balance(balance_currency))
-        print('Spread', get_spread(symbol))
-        print('Текущий LOT $:', initial_lot)
-    
-
-        trailing_stop = trailing_stop_var.get()
-        trail_distance_percent = float(trail_distance_entry.get())
-        martingale = martingale_var.get()
-        lot_increment = float(lot_increment_entry.get())
-        start_balance = get_balance(balance_currency)
-        lot = initial_lot
-        trailing_limit = float(trail_limit_entry.get())
-        # Запуск основного скрипта с заданными параметрами
+    # Отмена одной ноги отменяет весь OCO
+    def cancel_placement(self, symbol, placement) -> None:
         try:
-            if not tesntet:
-                if check_fee(symbol) >= float(fee_entry_variable.get()):
-                    pnl_without = main(initial_lot,lot, take, loss, trailing_stop, trailing_limit, trail_distance_percent, martingale, lot_increment, symbol, start_balance, balance_currency, pnl_without)
-                else:
-                    print('Коммиссия превышена')
+            self.client.cancel_order(symbol=symbol, orderId=placement.take_id)
+        except Exception as ex:
+            self.log.event('cancel_error', 'Ошибка отмены ордера', placement.take_id, ex, symbol=symbol, side=placement.side, error=str(ex))
+
+    # PnL каждой стороны по фактическим исполнениям, по цене ордера - если исполнения не пришли
+    def cycle_pnl(self, symbol, placements, legs, fills, totals, start_price, balance_change) -> float:
+        total = 0.0
+        for leg, placement in zip(legs, placements):
+            pnl, fees = cycle_pnl([fill for fill in fills if fill.order_id in (leg.take_id, leg.stop_id)], self.symbols.quote_asset(symbol), start_price)
+            if pnl is None:
+                report = placement.orders[0]['orderReports'][1 if leg.result else 0]
+                pnl = (float(report['price'])-start_price)*float(report['origQty'])
+                if leg.side == 'SHORT':
+                    pnl = -pnl
+            if leg.result:
+                self.log.event('leg_closed', leg.side, f"Ордер {leg.take_id} закрыт по тэйку. Прибыль:", pnl,
+                               symbol=symbol, side=leg.side, order_ids=[leg.take_id, leg.stop_id], result='take', pnl=pnl, fees=fees)
             else:
-                pnl_without = main(initial_lot,lot, take, loss, trailing_stop, trailing_limit, trail_distance_percent, martingale, lot_increment, symbol, start_balance, balance_currency, pnl_without)
-            print('Общий профит: ', get_balance(balance_currency)-start_balance)
-            print('Общий профит %: ', (get_balance(balance_currency)-start_balance)/start_balance*100)
-            print('Доход без коммисии', pnl_without)
-        except Exception as e:
-            print(e)
-
-    except Exception as ex:
-        print('Ошибка при старте трэйдинга:', ex)
-    
-
-# Запуск через поток
-def start_trading_thread() -> None:
-    trading_thread = threading.Thread(target=start_trading)
-    trading_thread.start()
-
+                self.log.event('leg_closed', leg.side, f"Ордер {leg.stop_id} закрыт по стоп-лимиту. Убыток:", pnl,
+                               symbol=symbol, side=leg.side, order_ids=[leg.take_id, leg.stop_id], result='stop', pnl=pnl, fees=fees)
+            total += pnl
+        self.log.event('cycle_fees', 'Комиссия цикла:', totals.fees, symbol=symbol, fees=totals.fees)
+        return total
+
+
+adapter = SpotAdapter(testnet=testnet_from_env(), simulator=os.getenv('SIMULATOR'))
+
+# Имена модуля для управляющего API и benchmark.py
+client = adapter.client
+exchange = adapter.exchange
+testnet = adapter.testnet
+symbols = adapter.symbols
+tracker = adapter.tracker
+trades = adapter.trades
+journal = adapter.journal
+log = adapter.log
+auto_stop = adapter.auto_stop
+get_current_price = adapter.get_current_price
+get_spread = adapter.get_spread
+get_balance = adapter.get_balance
+close_orders = adapter.close_orders
+resume_cycles = adapter.resume_cycles
+start_trading = adapter.start_trading
+
+# Окно Tk - клиент управляющего API, торговля идёт в этом же процессе.
+# Без окна: python -m bot run --config straddle.toml
 if __name__ == "__main__":
-    tprint('Binance   bot   started')
-    # Создание главного окна
-
-    window = tk.Tk()
-    window.title("Binance Trading Script")
-    window.geometry("400x500")
-
-    # Создание полей ввода и меток для параметров
-    initial_lot_label = tk.Label(window, text="Начальное значение LOT:")
-    initial_lot_label.pack()
-    initial_lot_entry = tk.Entry(window)
-    initial_lot_entry.pack()
-
-    take_label = tk.Label(window, text="Тейк профит (пункты):")
-    take_label.pack()
-    take_entry = tk.Entry(window)
-    take_entry.pack()
-
-    loss_label = tk.Label(window, text="Стоп-лосс (пункты):")
-    loss_label.pack()
-    loss_entry = tk.Entry(window)
-    loss_entry.pack()
-
-    fee_label = tk.Label(window, text="Коммисия:")
-    fee_label.pack()
-    fee_entry_variable = tk.IntVar(value=0)
-    fee_entry = tk.Entry(window, textvariable=fee_entry_variable)
-    fee_entry.pack()
-
-    trailing_stop_var = tk.BooleanVar()
-    trailing_stop_checkbox = tk.Checkbutton(window, text="Активировать трейлинг стоп", variable=trailing_stop_var)
-    trailing_stop_checkbox.pack()
-
-    trail_distance_label = tk.Label(window, text="Расстояние трейл-стопа (%):")
-    trail_distance_label.pack()
-    trail_distance_entry_variable = tk.IntVar(value=0)
-    trail_distance_entry = tk.Entry(window, textvariable=trail_distance_entry_variable)
-    trail_distance_entry.pack()
-
-    trail_limit_label = tk.Label(window, text="Стоп лимит трейл-стопа (%):")
-    trail_limit_label.pack()
-    trail_limit_entry_variable = tk.IntVar(value=0)
-    trail_limit_entry = tk.Entry(window, textvariable=trail_limit_entry_variable)
-    trail_limit_entry.pack()
-
-    martingale_var = tk.BooleanVar()
-    martingale_checkbox = tk.Checkbutton(window, text="Включить Мартингейл", variable=martingale_var)
-    martingale_checkbox.pack()
-
-    lot_increment_label = tk.Label(window, text="Множитель лота:")
-    lot_increment_label.pack()
-    lot_increment_variable = tk.IntVar(value=0)
-    lot_increment_entry = tk.Entry(window, textvariable=lot_increment_variable)
-    lot_increment_entry.pack()
-
-    symbol_entry_variable = tk.StringVar(value='BTCUSDT')
-    symbol_label = tk.Label(window, text="Пара торговли:")
-    symbol_label.pack()
-    symbol_entry = tk.Entry(window, textvariable=symbol_entry_variable)
-    symbol_entry.pack()
-
-    auto_stop_var = tk.BooleanVar()
-    auto_stop_checkbox = tk.Checkbutton(window, text="Автоматическая остановка", variable=auto_stop_var)
-    auto_stop_checkbox.pack()
-
-    start_button = tk.Button(window, text="Старт", command=start_trading_thread)
-    start_button.pack()
-
-    stop_button = tk.Button(window, text="Остановить все ордера", command=close_orders)
-    stop_button.pack()
-
+    from bot import serve_with_gui
 
-    # Запуск главного цикла обработки событий
-    window.mainloop()
+    serve_with_gui(sys.modules[__name__], 'spot')
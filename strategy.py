@@ -0,0 +1,37 @@
+from dataclasses import dataclass
+
+
+# Параметры стрэддла (то же, что форма Tk): take/loss в пунктах цены,
+# трейлинг в процентах, lot в валюте котировки
+@dataclass
+class StraddleSettings:
+    initial_lot: float
+    take: float
+    loss: float
+    trailing_stop: bool = False
+    trailing_limit: float = 0.0
+    trail_distance_percent: float = 0.0
+    martingale: bool = False
+    lot_increment: float = 1.0
+
+
+# Цены тейка и стопа стороны LONG/SHORT от цены входа
+def leg_prices(side, start_price, take, loss) -> tuple:
+    if side == 'LONG':
+        return start_price + take, start_price - loss
+    return start_price - take, start_price + loss
+
+
+# Цена активации трейлинг-стопа
+def activation_price(side, start_price, trailing_limit) -> float:
+    if side == 'LONG':
+        return start_price*(1+(trailing_limit/100))
+    return start_price/(1+(trailing_limit/100))
+
+
+# Мартингейл: после цикла, где обе стороны закрылись по стопу, лот умножается,
+# после любого тейка возвращается к начальному
+def next_lot(lot, initial_lot, martingale, lot_increment, lost_both) -> float:
+    if not martingale:
+        return lot
+    return lot * lot_increment if lost_both else initial_lot
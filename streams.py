@@ -0,0 +1,94 @@
+import json
+import time
+import asyncio
+import threading
+
+import websockets
+
+from eventlog import log_event
+
+
+# Адреса комбинированных потоков рыночных данных (?streams=a/b/c)
+FUTURES_COMBINED_URL = 'wss://fstream.binance.com/stream?streams='
+FUTURES_TESTNET_COMBINED_URL = 'wss://stream.binancefuture.com/stream?streams='
+SPOT_COMBINED_URL = 'wss://stream.binance.com:9443/stream?streams='
+SPOT_TESTNET_COMBINED_URL = 'wss://testnet.binance.vision/stream?streams='
+
+
+# Фоновое чтение websocket-потока Binance с автоматическим переподключением.
+# url может быть строкой или функцией (например, когда адрес зависит от listenKey).
+# Ошибки - в журнал событий log (eventlog.EventLog)
+class WebsocketStream:
+    def __init__(self, url, on_message, on_connect=None, on_disconnect=None, reconnect_delay=1.0, max_reconnect_delay=30.0, log=None):
+        self.url = url
+        self.log = log
+        self.on_message = on_message
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connected = False
+        self.last_message_time = 0.0
+
+        self._loop = None
+        self._ws = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    # Переподключение, например после смены списка подписок в url
+    def reconnect(self) -> None:
+        if self._loop is not None and self._ws is not None:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+
+    def _run_forever(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._run())
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _run(self) -> None:
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                url = self.url() if callable(self.url) else self.url
+                async with websockets.connect(url, ping_interval=20, max_size=None) as ws:
+                    self._ws = ws
+                    self.connected = True
+                    delay = self.reconnect_delay
+                    if self.on_connect:
+                        self.on_connect()
+                    async for raw in ws:
+                        self.last_message_time = time.time()
+                        try:
+                            self.on_message(json.loads(raw))
+                        except Exception as ex:
+                            log_event(self.log, 'stream_error', 'Ошибка обработки сообщения websocket:', ex, error=repr(ex))
+            except Exception as ex:
+                if not self._stop.is_set():
+                    log_event(self.log, 'stream_error', 'Ошибка websocket:', ex, error=repr(ex))
+            finally:
+                self._ws = None
+                if self.connected:
+                    self.connected = False
+                    if self.on_disconnect:
+                        self.on_disconnect()
+
+            if not self._stop.is_set():
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import threading
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+
+from eventlog import log_event
+
+
+CACHE_DIR = '.cache'
+
+
+# Округление значения к шагу биржевого фильтра (tickSize / stepSize)
+def round_step(value, step, rounding=ROUND_HALF_UP) -> float:
+    step = Decimal(str(step))
+    if not step:
+        return float(value)
+    steps = (Decimal(str(value)) / step).quantize(Decimal(1), rounding=rounding)
+    return float(steps * step)
+
+
+# Сжатая запись о символе: только то, что нужно для расчёта ордеров
+def parse_symbol_info(symbol_info) -> dict:
+    filters = {f['filterType']: f for f in symbol_info.get('filters', [])}
+    price_filter = filters.get('PRICE_FILTER', {})
+    lot_size = filters.get('LOT_SIZE', {})
+    # У фьючерсов фильтр MIN_NOTIONAL с полем notional, у спота MIN_NOTIONAL или NOTIONAL с minNotional
+    notional = filters.get('MIN_NOTIONAL') or filters.get('NOTIONAL') or {}
+    return {
+        'baseAsset': symbol_info.get('baseAsset'),
+        'quoteAsset': symbol_info.get('quoteAsset'),
+        'tickSize': float(price_filter.get('tickSize', 0)),
+        'minPrice': float(price_filter.get('minPrice', 0)),
+        'maxPrice': float(price_filter.get('maxPrice', 0)),
+        'stepSize': float(lot_size.get('stepSize', 0)),
+        'minQty': float(lot_size.get('minQty', 0)),
+        'minNotional': float(notional.get('notional', notional.get('minNotional', 0))),
+    }
+
+
+# Кэш метаданных символов: индекс по символу, TTL и копия на диске,
+# чтобы при повторном запуске не скачивать exchange info целиком.
+# Загрузка exchange info - одна на все потоки (_refresh_lock). Когда TTL истёк, а символ
+# в кэше есть, обновление идёт в фоне и до его конца отдаётся прежняя запись: цикл
+# не ждёт тяжёлый запрос. Ждут только потоки, которым символа ещё нет в кэше
+class SymbolCache:
+    def __init__(self, load_exchange_info, path, ttl=24 * 60 * 60, log=None):
+        self.load_exchange_info = load_exchange_info
+        self.log = log
+        self.path = path
+        self.ttl = ttl
+        self.updated = 0.0
+        self._symbols = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._load_from_disk()
+
+    def _load_from_disk(self) -> None:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            self._symbols = data['symbols']
+            self.updated = data['updated']
+        except (OSError, ValueError, KeyError):
+            self._symbols = {}
+            self.updated = 0.0
+
+    def _save_to_disk(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'updated': self.updated, 'symbols': self._symbols}, f)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def expired(self) -> bool:
+        return time.time() - self.updated > self.ttl
+
+    def refresh(self) -> None:
+        info = self.load_exchange_info()
+        symbols = {s['symbol']: parse_symbol_info(s) for s in info['symbols']}
+        with self._lock:
+            self._symbols = symbols
+            self.updated = time.time()
+            try:
+                self._save_to_disk()
+            except OSError as ex:
+                log_event(self.log, 'symbols_error', 'Ошибка сохранения кэша символов:', ex, error=repr(ex))
+
+    # Фоновое обновление; если exchange info уже загружается, второе не запускается
+    def _refresh_in_background(self) -> None:
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                if self.expired:
+                    self.refresh()
+            except Exception as ex:
+                log_event(self.log, 'symbols_error', 'Ошибка обновления кэша символов:', ex, error=repr(ex))
+            finally:
+                self._refresh_lock.release()
+
+        threading.Thread(target=run, name='symbols-refresh', daemon=True).start()
+
+    def get(self, symbol) -> dict:
+        info = self._symbols.get(symbol)
+        if info is not None:
+            if self.expired:
+                self._refresh_in_background()
+            return info
+        with self._refresh_lock:
+            # Пока ждали замок, символ мог загрузить другой поток
+            if symbol not in self._symbols:
+                self.refresh()
+        try:
+            return self._symbols[symbol]
+        except KeyError:
+            raise ValueError(f'Неизвестная пара {symbol}')
+
+    def quote_asset(self, symbol) -> str:
+        return self.get(symbol)['quoteAsset']
+
+    def round_price(self, symbol, price) -> float:
+        return round_step(price, self.get(symbol)['tickSize'])
+
+    # Количество округляется вниз, чтобы не выйти за размер лота
+    def round_qty(self, symbol, quantity) -> float:
+        return round_step(quantity, self.get(symbol)['stepSize'], ROUND_DOWN)
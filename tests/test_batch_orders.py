@@ -0,0 +1,8 @@
+from batch_orders import format_batch_order
+
+
+def test_format_batch_order():
+    formatted = format_batch_order({'symbol': 'SHIBUSDT', 'quantity': 12000000.0, 'price': 0.00001234, 'stopPrice': 1e-05,
+                                    'closePosition': True, 'orderId': 7, 'activationPrice': None})
+    assert formatted == {'symbol': 'SHIBUSDT', 'quantity': '12000000.0', 'price': '0.00001234', 'stopPrice': '0.00001',
+                         'closePosition': 'true', 'orderId': '7'}
@@ -0,0 +1,121 @@
+import os
+import json
+import threading
+
+import pytest
+
+from conftest import wait_for
+from order_book import LocalOrderBook, OrderBookManager, replay_file
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def load_records(name) -> list:
+    with open(os.path.join(DATA_DIR, name), encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def snapshot(last_update_id, bids=(), asks=()) -> dict:
+    return {'lastUpdateId': last_update_id, 'bids': list(bids), 'asks': list(asks)}
+
+
+def diff(first_id, last_id, prev_id=None, bids=(), asks=()) -> dict:
+    event = {'e': 'depthUpdate', 'E': 0, 's': 'BTCUSDT', 'U': first_id, 'u': last_id, 'b': list(bids), 'a': list(asks)}
+    if prev_id is not None:
+        event['pu'] = prev_id
+    return event
+
+
+# Записанный поток: устаревшее событие, разрыв, новый снимок и продолжение после него
+@pytest.mark.parametrize('name, futures, last_update_id', [('depth_futures.jsonl', True, 133), ('depth_spot.jsonl', False, 120)])
+def test_replay_recorded_file(name, futures, last_update_id):
+    book = LocalOrderBook('BTCUSDT', futures)
+    gaps = replay_file(book, os.path.join(DATA_DIR, name))
+
+    assert gaps == 1
+    assert book.synced
+    assert book.last_update_id == last_update_id
+    assert book.best_bid() == 29999.9
+    assert book.best_ask() == 30000.1
+    assert book.depth_at('BUY', 29999.9) == 0.5
+    assert book.depth_at('SELL', 30000.1) == 2.5
+    assert book.depth_at('BUY', 29999.7) == 6.0
+    # Уровень из события после разрыва не применяется
+    assert book.depth_at('BUY', 30000.5) == 0.0
+
+
+def test_futures_sequence_uses_pu():
+    book = LocalOrderBook('BTCUSDT', futures=True)
+    assert not book.apply_diff(diff(1, 2, 0))
+
+    book.apply_snapshot(snapshot(100, [['10', '1']], [['11', '1']]))
+    # Первое событие должно перекрывать lastUpdateId
+    assert not book.apply_diff(diff(101, 105, 100))
+    assert book.apply_diff(diff(100, 105, 99, bids=[['10', '2']]))
+    # Дальше важна только связь pu с u предыдущего события, U может не быть u + 1
+    assert book.apply_diff(diff(103, 107, 105, asks=[['11', '0']]))
+    assert book.best_ask() is None
+    assert not book.apply_diff(diff(108, 110, 106))
+    assert book.last_update_id == 107
+
+
+def test_spot_sequence_uses_first_id():
+    book = LocalOrderBook('BTCUSDT', futures=False)
+    book.apply_snapshot(snapshot(100, [['10', '1']], [['11', '1']]))
+
+    assert not book.apply_diff(diff(102, 105))
+    assert book.apply_diff(diff(101, 103, bids=[['10', '3']]))
+    assert book.depth_at('BUY', 10.0) == 3.0
+    # pu на споте не приходит и не проверяется
+    assert book.apply_diff(diff(104, 106, prev_id=1))
+    assert not book.apply_diff(diff(108, 110))
+    assert book.last_update_id == 106
+
+
+# Разрыв в потоке: стакан пересобирается по новому снимку, события во время загрузки не теряются
+def test_manager_resyncs_after_gap():
+    records = load_records('depth_futures.jsonl')
+    snapshots = [record for record in records if 'lastUpdateId' in record]
+    events = [record for record in records if 'lastUpdateId' not in record]
+    release = threading.Event()
+    loaded = []
+
+    def load_snapshot(symbol):
+        loaded.append(symbol)
+        if len(loaded) > 1:
+            release.wait(5)
+        return snapshots[len(loaded) - 1]
+
+    manager = OrderBookManager(load_snapshot, 'ws://127.0.0.1:1/', futures=True)
+    manager.books['BTCUSDT'] = LocalOrderBook('BTCUSDT', futures=True)
+    manager._resync('BTCUSDT')
+    assert wait_for(lambda: manager.books['BTCUSDT'].last_update_id == 100 and 'BTCUSDT' not in manager._buffers)
+
+    for event in events[:3]:
+        manager._on_message({'stream': 'btcusdt@depth@100ms', 'data': event})
+    assert manager.book('BTCUSDT').last_update_id == 110
+
+    # Разрыв: снимок загружается, следующие события ждут в буфере
+    for event in events[3:]:
+        manager._on_message({'stream': 'btcusdt@depth@100ms', 'data': event})
+    assert wait_for(lambda: len(loaded) == 2)
+    assert len(manager._buffers['BTCUSDT']) == 3
+
+    release.set()
+    assert wait_for(lambda: 'BTCUSDT' not in manager._buffers)
+    book = manager.book('BTCUSDT')
+    assert book.last_update_id == 133
+    assert book.best_bid() == 29999.9
+    assert book.depth_at('BUY', 30000.5) == 0.0
+
+
+def test_manager_disconnect_drops_sync():
+    manager = OrderBookManager(lambda symbol: snapshot(1), 'ws://127.0.0.1:1/')
+    book = manager.books['BTCUSDT'] = LocalOrderBook('BTCUSDT')
+    book.apply_snapshot(snapshot(100))
+    assert book.apply_diff(diff(99, 101, 98))
+
+    manager._on_disconnect()
+    assert manager.book('BTCUSDT') is None
+    assert not book.apply_diff(diff(102, 103, 101))
@@ -0,0 +1,231 @@
+import json
+import asyncio
+import threading
+
+import pytest
+import websockets
+
+from conftest import wait_for
+from order_tracker import OrderTracker, UserDataStream, SiblingCancelError, UNKNOWN_ORDER
+
+
+# Локальный сервер потока пользовательских данных: события ORDER_TRADE_UPDATE и обрыв соединения
+class FakeUserStream:
+    def __init__(self):
+        self.clients = set()
+        self.paths = []
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+        self._started.wait(5)
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(websockets.serve(self._handler, '127.0.0.1', 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+        server.close()
+        self._loop.run_until_complete(server.wait_closed())
+
+    async def _handler(self, ws) -> None:
+        self.paths.append(ws.path)
+        self.clients.add(ws)
+        try:
+            await ws.wait_closed()
+        finally:
+            self.clients.discard(ws)
+
+    def _call(self, coro_factory) -> None:
+        async def run():
+            for ws in list(self.clients):
+                await coro_factory(ws)
+        asyncio.run_coroutine_threadsafe(run(), self._loop).result(5)
+
+    def send(self, msg) -> None:
+        self._call(lambda ws: ws.send(json.dumps(msg)))
+
+    def drop(self) -> None:
+        self._call(lambda ws: ws.close())
+
+
+def order_update(symbol, order_id, status) -> dict:
+    return {'e': 'ORDER_TRADE_UPDATE', 'E': 0, 'o': {'s': symbol, 'i': order_id, 'X': status}}
+
+
+# REST-заглушка биржи: статусы ордеров и отмены
+class FakeExchange:
+    def __init__(self):
+        self.statuses = {}
+        self.canceled = []
+        self.listen_keys = 0
+        self.cancel_errors = []
+
+    def get_listen_key(self) -> str:
+        self.listen_keys += 1
+        return f'key{self.listen_keys}'
+
+    def keepalive(self, listen_key) -> None:
+        pass
+
+    def get_order(self, symbol, order_id) -> dict:
+        return {'status': self.statuses.get(order_id, 'NEW')}
+
+    def cancel_order(self, symbol, order_id) -> None:
+        if self.cancel_errors:
+            raise self.cancel_errors.pop(0)
+        self.canceled.append(order_id)
+        self.statuses[order_id] = 'CANCELED'
+
+
+class ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+@pytest.fixture
+def server():
+    server = FakeUserStream()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def exchange():
+    return FakeExchange()
+
+
+@pytest.fixture
+def stream(server, exchange):
+    tracker = OrderTracker(cancel_order=exchange.cancel_order, get_order=exchange.get_order)
+    stream = UserDataStream(exchange.get_listen_key, exchange.keepalive, f'ws://127.0.0.1:{server.port}/')
+    stream._stream.reconnect_delay = 0.05
+    stream.add_listener(tracker)
+    stream.start()
+    assert wait_for(lambda: tracker.connected and server.clients)
+    yield stream, tracker
+    stream.stop()
+
+
+def test_take_filled_over_stream_cancels_stop(server, exchange, stream):
+    _, tracker = stream
+    leg = tracker.track('BTCUSDT', 'LONG', 1, 2)
+
+    server.send(order_update('BTCUSDT', 1, 'PARTIALLY_FILLED'))
+    server.send(order_update('BTCUSDT', 1, 'FILLED'))
+    tracker.wait([leg], poll_interval=0.1)
+
+    assert leg.result is True
+    assert exchange.canceled == [2]
+    assert leg.canceled_at >= leg.done_at > 0
+
+
+def test_event_before_track_is_applied(server, exchange, stream):
+    _, tracker = stream
+    server.send(order_update('BTCUSDT', 4, 'FILLED'))
+    assert wait_for(lambda: ('BTCUSDT', 4) in tracker._unknown)
+
+    leg = tracker.track('BTCUSDT', 'SHORT', 3, 4)
+    tracker.wait([leg], poll_interval=0.1)
+
+    assert leg.result is False
+    assert exchange.canceled == [3]
+
+
+def test_reconnect_reconciles_over_rest(server, exchange, stream):
+    _, tracker = stream
+    leg = tracker.track('BTCUSDT', 'LONG', 1, 2)
+
+    server.drop()
+    assert wait_for(lambda: not tracker.connected)
+    # За время обрыва тейк исполнился, а стоп отменён: событий об этом не будет
+    exchange.statuses.update({1: 'FILLED', 2: 'CANCELED'})
+
+    assert wait_for(lambda: tracker.connected and leg.done)
+    tracker.wait([leg], poll_interval=0.1)
+
+    assert leg.result is True
+    # Новый listenKey на каждое подключение
+    assert server.paths[-2:] == ['/key1', '/key2']
+
+
+def test_reconcile_stop_filled_while_disconnected(server, exchange, stream):
+    _, tracker = stream
+    leg = tracker.track('BTCUSDT', 'SHORT', 5, 6)
+
+    server.drop()
+    assert wait_for(lambda: not tracker.connected)
+    exchange.statuses.update({5: 'CANCELED', 6: 'FILLED'})
+
+    tracker.wait([leg], poll_interval=0.1)
+    assert leg.result is False
+
+
+def test_cancel_retries_and_unknown_order():
+    exchange = FakeExchange()
+    exchange.cancel_errors = [ApiError(-1001), ApiError(UNKNOWN_ORDER)]
+    tracker = OrderTracker(cancel_order=exchange.cancel_order, cancel_backoff=0.001)
+    tracker.connected = True
+    leg = tracker.track('BTCUSDT', 'LONG', 1, 2)
+
+    tracker.on_message(order_update('BTCUSDT', 1, 'FILLED'))
+    tracker.wait([leg], poll_interval=0.1)
+
+    assert leg.result is True
+    assert leg.cancel_error is None
+
+
+# Отмена не прошла, но по REST вторая нога уже снята: нога закрыта без ошибки
+def test_failed_cancel_checks_sibling_status():
+    exchange = FakeExchange()
+    exchange.cancel_errors = [ApiError(-1001)] * 3
+    exchange.statuses[1] = 'EXPIRED'
+    tracker = OrderTracker(cancel_order=exchange.cancel_order, get_order=exchange.get_order, cancel_backoff=0.001)
+    tracker.connected = True
+    leg = tracker.track('BTCUSDT', 'LONG', 1, 2)
+
+    tracker.on_message(order_update('BTCUSDT', 2, 'FILLED'))
+    tracker.wait([leg], poll_interval=0.1)
+
+    assert leg.result is False
+    assert leg.canceled_at >= leg.done_at
+
+
+# Вторая нога осталась на бирже: ошибка, ордера другой стороны не трогаются
+def test_failed_cancel_raises():
+    exchange = FakeExchange()
+    exchange.cancel_errors = [ApiError(-1001)] * 3
+    tracker = OrderTracker(cancel_order=exchange.cancel_order, get_order=exchange.get_order, cancel_backoff=0.001)
+    tracker.connected = True
+    leg = tracker.track('BTCUSDT', 'LONG', 1, 2)
+    other = tracker.track('BTCUSDT', 'SHORT', 3, 4)
+
+    tracker.on_message(order_update('BTCUSDT', 1, 'FILLED'))
+    with pytest.raises(SiblingCancelError):
+        tracker.wait([leg], poll_interval=0.1)
+    assert leg.canceled_at == 0.0
+    assert exchange.canceled == []
+    assert not other.done
+
+
+# Без REST статус второй ноги неизвестен: отмена считается неудавшейся
+def test_failed_cancel_without_rest_raises():
+    exchange = FakeExchange()
+    exchange.cancel_errors = [ApiError(-1001)] * 3
+    tracker = OrderTracker(cancel_order=exchange.cancel_order, cancel_backoff=0.001)
+    tracker.connected = True
+    leg = tracker.track('BTCUSDT', 'LONG', 1, 2)
+
+    tracker.on_message(order_update('BTCUSDT', 1, 'FILLED'))
+    with pytest.raises(SiblingCancelError):
+        tracker.wait([leg], poll_interval=0.1)
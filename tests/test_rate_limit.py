@@ -0,0 +1,174 @@
+import time
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from rate_limit import RateGovernor, install, endpoint_weight, is_priority, is_order
+
+
+FUTURES_URL = 'https://fapi.binance.com'
+
+
+# Клиент python-binance без сети: _request отвечает заголовками headers через хуки сессии requests
+class StubClient:
+    def __init__(self):
+        self.session = SimpleNamespace(hooks={'response': []})
+        self.status_code = 200
+        self.headers = {}
+        self.calls = []
+
+    def _request(self, method, uri, signed, force_params=False, **kwargs):
+        self.calls.append((method, uri))
+        response = SimpleNamespace(status_code=self.status_code, headers=self.headers)
+        for hook in self.session.hooks['response']:
+            hook(response)
+        return {}
+
+
+def timed(call) -> float:
+    started = time.monotonic()
+    call()
+    return time.monotonic() - started
+
+
+@pytest.fixture
+def client():
+    return StubClient()
+
+
+def test_weights_and_priority():
+    assert endpoint_weight('get', '/fapi/v2/balance') == 5
+    assert endpoint_weight('GET', '/fapi/v1/depth', {'limit': 50}) == 2
+    assert endpoint_weight('GET', '/api/v3/depth', {'limit': 1000}) == 50
+    assert endpoint_weight('GET', '/fapi/v1/unknown') == 1
+    assert is_priority('POST', '/fapi/v1/order')
+    assert is_priority('delete', '/api/v3/order')
+    assert not is_priority('GET', '/fapi/v1/order')
+    assert is_order('post', '/fapi/v1/batchOrders')
+    assert not is_order('DELETE', '/fapi/v1/order')
+
+
+# Ведро: после исчерпания обычный запрос ждёт пополнения, резерв остаётся ордерам
+def test_bucket_refill_and_reserve():
+    governor = RateGovernor(limit=6000, reserve=0.1, safety=1.0)
+    assert governor.capacity == 6000 and governor.reserve == 600 and governor.rate == 100
+
+    assert timed(lambda: governor.acquire(5400)) < 0.05
+    assert timed(lambda: governor.acquire(10, priority=True)) < 0.05
+    # Токенов 590 - ниже резерва: обычному запросу нужно 20 токенов, это 0.2 с
+    waited = timed(lambda: governor.acquire(10))
+    assert 0.15 < waited < 1.0
+    assert governor.delayed == 1
+    assert governor.requests == 3
+
+
+def test_priority_passes_waiting_request():
+    governor = RateGovernor(limit=600, reserve=0.1, safety=1.0)
+    governor.acquire(540)
+    done = []
+    waiter = threading.Thread(target=lambda: (governor.acquire(30), done.append('get')))
+    waiter.start()
+    time.sleep(0.05)
+
+    governor.acquire(30, priority=True)
+    done.append('order')
+    waiter.join(0.1)
+    assert done == ['order']
+    governor.tokens = governor.capacity
+    with governor._condition:
+        governor._condition.notify_all()
+    waiter.join(5)
+    assert done == ['order', 'get']
+
+
+def test_install_counts_weight_and_priority(client):
+    governor = install(client, RateGovernor(limit=6000, reserve=0.1, safety=1.0))
+    governor.tokens = governor.reserve + 1
+
+    # Ордер идёт из резерва, запрос баланса (вес 5) ждёт пополнения
+    assert timed(lambda: client._request('post', FUTURES_URL + '/fapi/v1/order', True, data={'symbol': 'BTCUSDT'})) < 0.05
+    assert timed(lambda: client._request('get', FUTURES_URL + '/fapi/v2/balance', True)) > 0.03
+    assert client.calls == [('post', FUTURES_URL + '/fapi/v1/order'), ('get', FUTURES_URL + '/fapi/v2/balance')]
+
+
+# Вес из заголовков ответа: ведро не может быть полнее, чем остаток лимита на бирже
+def test_headers_sync_bucket(client):
+    governor = install(client, RateGovernor(limit=2400, safety=1.0, share=0.5))
+    client.headers = {'X-MBX-USED-WEIGHT-1M': '1000', 'X-MBX-ORDER-COUNT-10S': '7', 'X-MBX-ORDER-COUNT-1M': '42'}
+    client._request('get', FUTURES_URL + '/fapi/v1/premiumIndex', False)
+
+    assert governor.used_weight == 1000
+    # Вес IP общий: счёт с долей 0.5 учитывает половину
+    assert governor.tokens <= governor.capacity - 500
+    assert governor.order_count_10s == 7
+    assert governor.order_count_1m == 42
+    assert governor.utilisation()['utilisation'] == pytest.approx(1000 / 2400)
+
+    # Меньший вес в заголовке не добавляет токенов
+    tokens = governor.tokens
+    client.headers = {'x-mbx-used-weight-1m': '10'}
+    client._request('get', FUTURES_URL + '/fapi/v1/premiumIndex', False)
+    assert governor.tokens <= tokens
+
+
+def test_retry_after_blocks_requests(client):
+    governor = install(client, RateGovernor(limit=60000, safety=1.0))
+    client.status_code = 429
+    client.headers = {'Retry-After': '0.2'}
+    client._request('get', FUTURES_URL + '/fapi/v1/premiumIndex', False)
+
+    assert governor.rejected == 1
+    assert governor.utilisation()['blocked'] > 0
+    client.status_code = 200
+    client.headers = {}
+    # Бан по Retry-After действует и на ордера
+    waited = timed(lambda: client._request('post', FUTURES_URL + '/fapi/v1/order', True))
+    assert waited >= 0.15
+
+
+def test_set_share_scales_capacity():
+    governor = RateGovernor(limit=2400, reserve=0.1, safety=1.0)
+    governor.set_share(0.25)
+    assert governor.capacity == 600
+    assert governor.reserve == 60
+    assert governor.rate == 10
+    assert governor.tokens == 600
+
+
+# Вес больше ёмкости над резервом ограничивается ею, а не ждёт бесконечно
+def test_weight_above_capacity_is_clamped():
+    governor = RateGovernor(limit=200, reserve=0.1, safety=1.0)
+    assert timed(lambda: governor.acquire(250)) < 0.05
+    assert governor.tokens == pytest.approx(20, abs=0.5)
+    # Приоритетному запросу хватает полного ведра
+    governor = RateGovernor(limit=200, reserve=0.1, safety=1.0)
+    assert timed(lambda: governor.acquire(250, priority=True)) < 0.05
+    assert governor.tokens == pytest.approx(0, abs=0.5)
+
+
+# Счётчик ордеров у лимита окна: ордера ждут следующего окна, остальные запросы - нет
+def test_order_count_blocks_orders(client, monkeypatch):
+    # До конца 10-секундного окна - 0.2 с
+    monkeypatch.setattr(time, 'time', lambda: 1000009.8)
+    governor = install(client, RateGovernor(limit=60000, safety=1.0, order_limits={'10S': 300, '1M': 1200}))
+    client.headers = {'X-MBX-ORDER-COUNT-10S': '300', 'X-MBX-ORDER-COUNT-1M': '300'}
+    client._request('post', FUTURES_URL + '/fapi/v1/order', True)
+    client.headers = {}
+
+    assert governor.order_count_10s == 300
+    assert governor.utilisation()['orders_blocked'] > 0
+    assert timed(lambda: client._request('get', FUTURES_URL + '/fapi/v1/premiumIndex', False)) < 0.05
+    assert timed(lambda: client._request('delete', FUTURES_URL + '/fapi/v1/order', True)) < 0.05
+    waited = timed(lambda: client._request('post', FUTURES_URL + '/fapi/v1/batchOrders', True))
+    assert 0.15 <= waited < 1.0
+
+
+# Счётчик ниже лимита и окна без лимита (1D у фьючерсов) не блокируют ордера
+def test_order_count_below_limit(client):
+    governor = install(client, RateGovernor(limit=60000, safety=0.9, order_limits={'10S': 300, '1M': 1200}))
+    client.headers = {'X-MBX-ORDER-COUNT-10S': '269', 'X-MBX-ORDER-COUNT-1D': '100000'}
+    client._request('post', FUTURES_URL + '/fapi/v1/order', True)
+
+    assert governor.utilisation()['order_counts'] == {'10S': 269, '1D': 100000}
+    assert governor.orders_blocked_until == 0.0
@@ -0,0 +1,58 @@
+import time
+import threading
+
+from conftest import wait_for
+from symbols import SymbolCache
+
+
+def exchange_info(*symbols) -> dict:
+    return {'symbols': [{'symbol': symbol, 'quoteAsset': 'USDT', 'filters': [{'filterType': 'PRICE_FILTER', 'tickSize': '0.1'}]}
+                        for symbol in symbols]}
+
+
+# Загрузка exchange info по запросу: считает вызовы, release - разрешение ответить
+class SlowLoader:
+    def __init__(self, *symbols):
+        self.symbols = symbols
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self) -> dict:
+        self.calls += 1
+        self.release.wait(5)
+        return exchange_info(*self.symbols)
+
+
+# Потоки без символа в кэше ждут одну загрузку на всех
+def test_missing_symbol_loads_once(tmp_path):
+    loader = SlowLoader('BTCUSDT')
+    cache = SymbolCache(loader, str(tmp_path / 'symbols.json'))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('BTCUSDT'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    loader.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert loader.calls == 1
+    assert len(results) == 8 and results[0]['tickSize'] == 0.1
+
+
+# Истёкший TTL: прежняя запись отдаётся сразу, обновление - одно, в фоне
+def test_expired_entry_refreshes_in_background(tmp_path):
+    loader = SlowLoader('BTCUSDT', 'ETHUSDT')
+    loader.release.set()
+    cache = SymbolCache(loader, str(tmp_path / 'symbols.json'), ttl=60)
+    cache.get('BTCUSDT')
+    loader.release.clear()
+    cache.updated -= 120
+
+    started = time.monotonic()
+    for _ in range(5):
+        assert cache.get('BTCUSDT')['quoteAsset'] == 'USDT'
+    assert time.monotonic() - started < 0.5
+    loader.release.set()
+    assert wait_for(lambda: not cache.expired)
+    assert loader.calls == 2
@@ -0,0 +1,166 @@
+import time
+import asyncio
+import bisect
+import threading
+from urllib.parse import urlparse
+
+from requests.adapters import HTTPAdapter
+
+from rate_limit import endpoint_weight, is_priority, is_order
+
+
+# Границы корзин гистограммы задержек, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+# Гистограмма задержек с фиксированными корзинами: O(log k) на замер, постоянная память
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    # Оценка перцентиля по верхней границе корзины
+    def percentile(self, q) -> float:
+        if not self.count:
+            return None
+        target = q * self.count
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else None
+
+
+# Гистограммы задержек по эндпоинтам
+class EndpointLatency:
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method, path, seconds) -> None:
+        key = f'{method.upper()} {path}'
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def report(self) -> None:
+        with self._lock:
+            items = sorted(self.histograms.items())
+        for key, histogram in items:
+            print(key, 'запросов', histogram.count, 'p50 %.3f' % histogram.percentile(0.5), 'p99 %.3f' % histogram.percentile(0.99), 'max %.3f' % histogram.max)
+
+
+# Пул keep-alive соединений для синхронного клиента: по умолчанию requests держит
+# 10 соединений на хост, и параллельные потоки LONG/SHORT/Tk открывают новые.
+def configure_session(client, latency=None, pool_size=32) -> EndpointLatency:
+    latency = latency or EndpointLatency()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=False)
+    client.session.mount('https://', adapter)
+    client.session.mount('http://', adapter)
+
+    def on_response(response, *args, **kwargs):
+        latency.observe(response.request.method, urlparse(response.url).path, response.elapsed.total_seconds())
+
+    client.session.hooks['response'].append(on_response)
+    return latency
+
+
+# Асинхронный транспорт на AsyncClient (aiohttp, keep-alive) в отдельном цикле событий.
+# Синхронный код отправляет вызовы через submit()/gather() и получает concurrent.futures.Future.
+class AsyncTransport:
+    def __init__(self, api_key, api_secret, testnet=False, governor=None, latency=None):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.testnet = testnet
+        self.governor = governor
+        self.latency = latency or EndpointLatency()
+        self.client = None
+
+        self._loop = None
+        self._ready = threading.Event()
+        self._error = None
+        self._thread = None
+
+    # Ошибка создания клиента (ключи, DNS, недоступная тестовая сеть) пробрасывается отсюда
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            error, self._error = self._error, None
+            self._thread.join(timeout=5)
+            self._thread = None
+            self._loop = None
+            raise error
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._create_client())
+        except Exception as ex:
+            self._error = ex
+            self._loop.close()
+            return
+        finally:
+            self._ready.set()
+        self._loop.run_forever()
+
+    async def _create_client(self) -> None:
+        from binance import AsyncClient
+
+        self.client = await AsyncClient.create(self.api_key, self.api_secret, testnet=self.testnet)
+        request = self.client._request
+
+        async def measured_request(method, uri, signed, force_params=False, **kwargs):
+            path = urlparse(uri).path
+            if self.governor is not None:
+                await asyncio.to_thread(self.governor.acquire, endpoint_weight(method, path, kwargs.get('data')), is_priority(method, path), is_order(method, path))
+            started = time.perf_counter()
+            try:
+                return await request(method, uri, signed, force_params, **kwargs)
+            finally:
+                self.latency.observe(method, path, time.perf_counter() - started)
+                response = self.client.response
+                if self.governor is not None and response is not None:
+                    self.governor.on_response(response.status, response.headers)
+
+        self.client._request = measured_request
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.client.close_connection(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    # Вызов метода AsyncClient по имени, например submit('futures_mark_price', symbol='BTCUSDT')
+    def submit(self, name, **params):
+        return asyncio.run_coroutine_threadsafe(getattr(self.client, name)(**params), self._loop)
+
+    def call(self, name, **params):
+        return self.submit(name, **params).result()
+
+    # Несколько вызовов одновременно: [(имя, параметры), ...] -> результаты в том же порядке
+    def gather(self, calls) -> list:
+        return [future.result() for future in [self.submit(name, **params) for name, params in calls]]